@@ -6,6 +6,20 @@ ALLELE_FREQ=""
 BED_FILE=""
 VISUALIZE=false
 EXTRACT_ETY=false
+PROFILE_REPORT=""
+STREAM=false
+KEEP_FILTERED=false
+GENOME=""
+SIGNATURES=""
+FIT_ARGS=()
+QC=false
+MIN_SNVS=""
+PLOT_SAMPLES=""
+
+# Python toolkit; each subcommand imports only the libraries it needs
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+export PYTHONPATH="$SCRIPT_DIR${PYTHONPATH:+:$PYTHONPATH}"
+ONCOSIGNTRACK="python3 -m oncosigntrack"
 
 # Function to display help message
 show_help() {
@@ -19,6 +33,16 @@ show_help() {
     echo "  -b, -B, --bed-file <file>          Specify the BED file to exclude shared variants. (Optional)"
     echo "  -v, -V, --visualize                Generate graphs to compare mutational signatures among samples. (Optional)"
     echo "  -e, -E, --etiology                 Extract mutational signature etiology from the COSMIC database. (Optional)"
+    echo "  -p, -P, --profile <report.jsonl>   Record time, CPU, peak memory and records of every stage and sample. (Optional)"
+    echo "  -s, -S, --stream                   Filter, count and fit each VCF in one pass without intermediate VCFs. (Optional)"
+    echo "  -g, -G, --genome <fasta>           Reference FASTA with a .fai index. (Required with --stream)"
+    echo "  -m, -M, --signatures <file>        Reference signature matrix, e.g. COSMIC_v3.4_SBS_GRCh38.txt. (Required with --stream)"
+    echo "      --keep-filtered                With --stream, also write the filtered VCFs. (Optional)"
+    echo "  -q, -Q, --qc                       With --stream, write per-sample QC metrics; aggregated into qc_metrics.csv. (Optional)"
+    echo "      --min-snvs <n>                 With --stream, flag samples with fewer SNVs and do not fit them. (Optional)"
+    echo "      --no-sample-plots              Skip the per-sample contribution plot while fitting. (Optional)"
+    echo "      --plot-samples <S1,S2,...>     After fitting, draw contribution plots for these samples only. (Optional)"
+    echo "                                     Sample names (S1) or filtered names (AF_0.3_S1_non_common)."
     echo "  -h, -H, --help                     Display this help message."
     echo ""
     echo "Description:"
@@ -38,6 +62,15 @@ while [[ "$#" -gt 0 ]]; do
         -b|--bed-file|-B) BED_FILE="$2"; shift 2;;
         -v|--visualize|-V) VISUALIZE=true; shift 1;;
         -e|--etiology|-E) EXTRACT_ETY=true; shift 1;;
+        -p|--profile|-P) PROFILE_REPORT="$2"; shift 2;;
+        -s|--stream|-S) STREAM=true; shift 1;;
+        -g|--genome|-G) GENOME="$2"; shift 2;;
+        -m|--signatures|-M) SIGNATURES="$2"; shift 2;;
+        --keep-filtered) KEEP_FILTERED=true; shift 1;;
+        -q|--qc|-Q) QC=true; shift 1;;
+        --min-snvs) MIN_SNVS="$2"; shift 2;;
+        --no-sample-plots) FIT_ARGS+=(--no-sample-plots); shift 1;;
+        --plot-samples) PLOT_SAMPLES="$2"; shift 2;;
         -h|--help|-H) show_help;;
         *) echo "Error: Unknown option: $1"; exit 1;;
     esac
@@ -50,6 +83,24 @@ if [[ -z "$DEST_DIR" ]]; then
     exit 1
 fi
 
+if [[ "$STREAM" == true && ( -z "$GENOME" || -z "$SIGNATURES" ) ]]; then
+    echo "Error: --stream needs a reference FASTA (-g) and a signature matrix (-m)."
+    exit 1
+fi
+
+# Run one stage of the pipeline, measured when profiling is enabled
+# Usage: run_stage <stage> <input_file> <command> [args...]
+run_stage() {
+    local stage="$1" input="$2"
+    shift 2
+    if [[ -n "$PROFILE_REPORT" ]]; then
+        $ONCOSIGNTRACK profile run --report "$PROFILE_REPORT" --stage "$stage" \
+            --sample "$(basename "$input")" --input "$input" --count-records "$input" -- "$@"
+    else
+        "$@"
+    fi
+}
+
 # Display pipeline start message
 echo "Starting OncoSignTrack Pipeline..."
 echo "Processing VCF files in: $DEST_DIR"
@@ -59,24 +110,43 @@ echo "Processing VCF files in: $DEST_DIR"
 [[ -n "$BED_FILE" ]] && echo "Excluding shared variants using BED file: $BED_FILE"
 [[ "$VISUALIZE" == true ]] && echo "Visualization enabled: Generating comparison graphs for mutational signatures."
 [[ "$EXTRACT_ETY" == true ]] && echo "Etiology extraction enabled: Fetching COSMIC mutation signature details."
+[[ -n "$PROFILE_REPORT" ]] && echo "Profiling enabled: Stage timings are appended to $PROFILE_REPORT"
+[[ "$STREAM" == true ]] && echo "Streaming enabled: VCFs are filtered, counted and fitted in one pass."
+
+# Steps 1-2 in one pass: records flow from each VCF through the filters into the
+# SBS96 counter; only the counts and contributions are written
+if [[ "$STREAM" == true ]]; then
+    echo "Calculating mutational signatures (streaming)..."
+    stream_args=(-g "$GENOME" -s "$SIGNATURES")
+    [[ -n "$ALLELE_FREQ" ]] && stream_args+=(-f "$ALLELE_FREQ")
+    [[ -n "$BED_FILE" ]] && stream_args+=(-b "$BED_FILE")
+    [[ "$KEEP_FILTERED" == true ]] && stream_args+=(--write-filtered)
+    [[ "$QC" == true ]] && stream_args+=(--qc)
+    [[ -n "$MIN_SNVS" ]] && stream_args+=(--min-snvs "$MIN_SNVS")
+    for file in "$DEST_DIR"/*.gz; do
+        case "$(basename "$file")" in AF_*|*non_common*|filtered_*) continue;; esac
+        echo "Processing: $file"
+        run_stage fit "$file" $ONCOSIGNTRACK fit "$file" "${stream_args[@]}"
+    done
+fi
 
 # Step 1: Filtering variants
-if [[ -n "$BED_FILE" ]]; then
+if [[ "$STREAM" == false && -n "$BED_FILE" ]]; then
     echo "Filtering variants..."
     for file in "$DEST_DIR"/*.gz;
     do
         echo "$file"
-        bash Plot_analysis_generator/filter_vcf_non_common.sh "$file" "$BED_FILE"
+        run_stage filter_bed "$file" bash Plot_analysis_generator/filter_vcf_non_common.sh "$file" "$BED_FILE"
     done
 fi
 
-if [[ -n "$ALLELE_FREQ" ]]; then
+if [[ "$STREAM" == false && -n "$ALLELE_FREQ" ]]; then
     if [[ -z "$BED_FILE" ]]
     then
     echo "Filtering variants by AF..."
     for file in "$DEST_DIR"/*.gz;
     do
-        bash Plot_analysis_generator/filter_vcf_by_af.sh "$file" "$ALLELE_FREQ"
+        run_stage filter_af "$file" bash Plot_analysis_generator/filter_vcf_by_af.sh "$file" "$ALLELE_FREQ"
     done
     fi
     if [[ -n "$BED_FILE" ]]
@@ -84,7 +154,7 @@ if [[ -n "$ALLELE_FREQ" ]]; then
     echo "Filtering variants by AF..."
     for file in "$DEST_DIR"/*non_common*.gz;
     do
-        bash Plot_analysis_generator/filter_vcf_by_af.sh "$file" "$ALLELE_FREQ"
+        run_stage filter_af "$file" bash Plot_analysis_generator/filter_vcf_by_af.sh "$file" "$ALLELE_FREQ"
     done
     fi
     
@@ -92,12 +162,13 @@ fi
 
 # Step 2: Calculating mutational signatures
 
+if [[ "$STREAM" == false ]]; then
 echo "Calculating mutational signatures..."
 if [[ -z "$ALLELE_FREQ" && -z "$BED_FILE" ]]
 then 
 for file in "$DEST_DIR"/*.gz; do
     echo "Processing: $file"
-    Rscript Plot_analysis_generator/mutational_analysis_single_file.R "$file"
+    run_stage fit "$file" Rscript Plot_analysis_generator/mutational_analysis_single_file.R "$file" "${FIT_ARGS[@]}"
 done
 fi
 
@@ -105,7 +176,7 @@ if [[ -n "$ALLELE_FREQ" && -z "$BED_FILE" ]]
 then
 for file in "$DEST_DIR"/AF*.gz; do
  echo "Processing: $file"
-    Rscript Plot_analysis_generator/mutational_analysis_single_file.R "$file"
+    run_stage fit "$file" Rscript Plot_analysis_generator/mutational_analysis_single_file.R "$file" "${FIT_ARGS[@]}"
 done
 fi
 
@@ -113,7 +184,7 @@ if [[ -z "$ALLELE_FREQ" && -n "$BED_FILE" ]]
 then
 for file in "$DEST_DIR"/*non_common*.gz; do
  echo "Processing: $file"
-    Rscript Plot_analysis_generator/mutational_analysis_single_file.R "$file"
+    run_stage fit "$file" Rscript Plot_analysis_generator/mutational_analysis_single_file.R "$file" "${FIT_ARGS[@]}"
 done
 fi
 
@@ -121,56 +192,47 @@ if [[ -n "$ALLELE_FREQ" && -n "$BED_FILE" ]]
 then
 for file in "$DEST_DIR"/AF*non_common*.gz; do
  echo "Processing: $file"
-    Rscript Plot_analysis_generator/mutational_analysis_single_file.R "$file"
+    run_stage fit "$file" Rscript Plot_analysis_generator/mutational_analysis_single_file.R "$file" "${FIT_ARGS[@]}"
 done
 fi
+fi
 
 echo "Mutational signature calculation completed."
 
+# Per-sample contribution plots, drawn from the saved contributions in parallel
+if [[ -n "$PLOT_SAMPLES" ]]; then
+    echo "Drawing contribution plots for: $PLOT_SAMPLES"
+    run_stage sampleplot "$DEST_DIR" $ONCOSIGNTRACK sampleplot "$DEST_DIR" --samples "$PLOT_SAMPLES"
+fi
+
 # Step 3: Extracting mutational signature etiology
 if [[ "$EXTRACT_ETY" == true ]]; then
     echo "Step 3: Extracting etiology from COSMIC..."
     # Add command to extract etiology from COSMIC
 fi
 # Step 4: Generating visualizations
-# Step 4: Generating visualizations
 if [[ "$VISUALIZE" == true ]]; then
     tmpfile="$DEST_DIR/all.csv"
     tmp_file_group="$DEST_DIR/group.csv"
-    echo "File,Signature,Contribution" > "$tmpfile"
     echo "Step 4: Generating visualizations..."
-    
-    shopt -s nullglob
-    for file in "$DEST_DIR"/*.csv; do
-        [[ "$file" == "$tmpfile" ]] && continue  # Skip the output file
-        grep -v -e "File" -e ",0" "$file" >> "$tmpfile"
-    done
-    shopt -u nullglob  # Restore default behavior
-    
-    if [[ -s "$tmpfile" ]]; then
-        python3 Plot_analysis_generator/generate_box_plot.py "$tmpfile"
-        python3 Plot_analysis_generator/bar_plot_generator.py "$tmpfile"
-        python3 Plot_analysis_generator/sbs_scaled_barplot_10_top.py  "$tmpfile"
-        sed -i 's/"//g' "$tmpfile"
-        bash Plot_analysis_generator/generate_report_grouped_by_SBS.sh "$tmpfile"> "$tmp_file_group"
-        python3 Plot_analysis_generator/heat_map_table_generator.py "$tmp_file_group"
+
+    if run_stage aggregate "$DEST_DIR" $ONCOSIGNTRACK aggregate "$DEST_DIR" -o "$tmpfile" --grouped "$tmp_file_group"; then
+        run_stage boxplot "$tmpfile" $ONCOSIGNTRACK boxplot "$tmpfile"
+        run_stage barplot "$tmpfile" $ONCOSIGNTRACK stackedbar "$tmpfile" --pdf
+        run_stage barplot_top10 "$tmpfile" $ONCOSIGNTRACK stackedbar "$tmpfile" --top 10 --pdf
+        run_stage heatmap "$tmp_file_group" $ONCOSIGNTRACK heatmap "$tmp_file_group"
     else
         echo "No data to visualize. Skipping plot generation."
     fi
-    #rm $tmpfile
-    #rm "$tmp_file_group"
 fi
 
 if [[ "$EXTRACT_ETY" == true ]]; then
     tmpfile="$DEST_DIR/all.csv"
-    tmp_sbs_list="$DEST_DIR/sbs.txt"
     sbs_log="$DEST_DIR/sbs_ety.log"
-    shopt -s nullglob
 
-    for file in "$DEST_DIR"/*.csv; do
-        [[ "$file" == "$tmpfile" ]] && continue  # Skip the output file
-        grep -v -e "File" -e ",0" "$file" >> "$tmpfile"
-    done
+    if [[ ! -f "$tmpfile" ]]; then
+        $ONCOSIGNTRACK aggregate "$DEST_DIR" -o "$tmpfile" --grouped "$DEST_DIR/group.csv"
+    fi
 
     # Debugging step: Check if the file exists before processing
     if [[ ! -f "$tmpfile" ]]; then
@@ -178,15 +240,13 @@ if [[ "$EXTRACT_ETY" == true ]]; then
         exit 1
     fi
 
-    cat "$tmpfile" | cut -d , -f 2 | tr -d '\"' | sort | uniq > "$tmp_sbs_list"
-    shopt -u nullglob  # Restore default behavior
-
-    # Run the Python script and save the log
-    python3 Plot_analysis_generator/Proposed_Aetiology_extractor.py -l "$tmp_sbs_list" > "$sbs_log"
+    # Fetch the aetiology of every signature with a non-zero contribution and save the log
+    run_stage aetiology "$tmpfile" $ONCOSIGNTRACK aetiology -t "$tmpfile" > "$sbs_log"
+fi
 
-    # Clean up temporary files safely
-    #rm "$tmpfile"
-    #rm "$tmp_sbs_list"
+if [[ -n "$PROFILE_REPORT" && -s "$PROFILE_REPORT" ]]; then
+    report_base="${PROFILE_REPORT%.jsonl}"
+    $ONCOSIGNTRACK profile summary "$PROFILE_REPORT" --json "${report_base}_summary.json" --csv "${report_base}.csv"
 fi
 
 echo "Pipeline completed successfully! Results are stored in: $DEST_DIR"
@@ -1,26 +1,19 @@
 #!/bin/bash
 
-# Loop through all CSV files starting with '7316' and ending in '.csv'
-for file in 7316*.csv; do
-    
-    base=$(echo $file| cut -d '.' -f 1 )
-    
-    echo -n "$base,"
-    
-    # Extract the base name (remove everything after the first dot)
-    base=$(echo "$file" | cut -d '.' -f 1)
-    
-    # Construct the filtered file name
-    filtered="filtered_${base}_mutational_signatures.csv"
-    
-    # Check if the filtered file exists
-    if [[ -f "$filtered" ]]; then
-        # Run the Python script to calculate cosine similarity
-        python3 generate_cosine_sim.py "$file" "$filtered"
-    else
-        echo "Filtered file not found: $filtered. Skipping..."
-    fi
-done
+# Cosine similarity of every 7316*.csv sample with its filtered_* counterpart,
+# computed for all samples in one run of the Python toolkit
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+export PYTHONPATH="$SCRIPT_DIR/..${PYTHONPATH:+:$PYTHONPATH}"
 
-echo "Processing completed for all files."
+shopt -s nullglob
+before=(7316*.csv)
+after=(filtered_7316*_mutational_signatures.csv)
+
+if [[ ${#before[@]} -eq 0 || ${#after[@]} -eq 0 ]]; then
+    echo "No 7316*.csv / filtered_7316*_mutational_signatures.csv pairs found. Skipping..."
+    exit 0
+fi
 
+python3 -m oncosigntrack compare -b "${before[@]}" -a "${after[@]}" -o cosine_report.csv
+
+echo "Processing completed for all files."
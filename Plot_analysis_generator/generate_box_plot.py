@@ -28,7 +28,7 @@ data['Contribution'] = pd.to_numeric(data['Contribution'], errors='coerce')
 data.dropna(subset=['Contribution'], inplace=True)
 
 # --- ✅ Remove signatures with all-zero contributions ---
-data = data.groupby('Signature').filter(lambda x: (x['Contribution'] > 0).any())
+data = data[data.groupby('Signature')['Contribution'].transform('max') > 0]
 
 # --- Sort signatures by mean contribution ---
 data['Signature'] = pd.Categorical(
@@ -0,0 +1,294 @@
+"""Benchmark cases run by run_benchmarks.py.
+
+Each case receives a Cohort (paths of a synthetic cohort) and returns the
+number of items it processed, so results can be reported as throughput.
+Register new cases with ``@case(name, unit)``.
+"""
+import glob
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+CASES = {}
+
+
+class SkipCase(Exception):
+    """Raised by a case that cannot run at the current scale or in this environment."""
+
+
+class Cohort:
+    """Paths of a cohort written by synthetic.py."""
+
+    def __init__(self, root):
+        self.root = root
+        self.reference = os.path.join(root, "reference.fa")
+        self.signatures = os.path.join(root, "signatures.txt")
+        self.bed = os.path.join(root, "common.bed")
+        self.vcfs = sorted(glob.glob(os.path.join(root, "vcfs", "*.vcf.gz")))
+        self.contributions = os.path.join(root, "contributions")
+        self.all_csv = os.path.join(root, "all.csv")
+        self.group_csv = os.path.join(root, "group.csv")
+        self.truth_counts = os.path.join(root, "truth_counts.txt")
+        self.scratch = os.path.join(root, "scratch")
+        os.makedirs(self.scratch, exist_ok=True)
+
+
+def case(name, unit):
+    """Registers a benchmark case."""
+    def register(func):
+        CASES[name] = (func, unit)
+        return func
+    return register
+
+
+@case("filter", "records")
+def bench_filter(cohort):
+    from oncosigntrack.bed import BedIndex
+    from oncosigntrack.filtering import filter_vcf
+
+    bed = BedIndex.from_file(cohort.bed)
+    records = 0
+    for vcf in cohort.vcfs:
+        records_in, _ = filter_vcf(vcf, os.path.join(cohort.scratch, "filtered.vcf.gz"), 0.3, bed)
+        records += records_in
+    return records
+
+
+@case("filter_qc", "records")
+def bench_filter_qc(cohort):
+    from oncosigntrack.bed import BedIndex
+    from oncosigntrack.filtering import filter_vcf
+    from oncosigntrack.qc import QcMetrics
+
+    bed = BedIndex.from_file(cohort.bed)
+    total = 0
+    for vcf in cohort.vcfs:
+        qc = QcMetrics(["bed", "af"])
+        total += filter_vcf(vcf, os.path.join(cohort.scratch, "filtered.vcf.gz"), 0.3, bed, qc=qc)[0]
+    return total
+
+
+@case("contexts", "records")
+def bench_contexts(cohort):
+    from oncosigntrack.contexts import count_sbs96
+    from oncosigntrack.reference import FastaIndex
+
+    fasta = FastaIndex(cohort.reference)
+    snvs = sum(sum(count_sbs96(vcf, fasta)) for vcf in cohort.vcfs)
+    fasta.close()
+    return snvs
+
+
+@case("panel", "samples")
+def bench_panel(cohort):
+    from oncosigntrack.panel import build_panel, read_contigs
+
+    contigs = read_contigs(cohort.vcfs, cohort.reference)
+    _, _, n_samples, _ = build_panel(cohort.vcfs, contigs, jobs=1, scratch=cohort.scratch)
+    return n_samples
+
+
+@case("count_matrix", "records")
+def bench_count_matrix(cohort):
+    from oncosigntrack.counting import count_matrix
+    from oncosigntrack.reference import FastaIndex
+
+    fasta = FastaIndex(cohort.reference)
+    matrix = count_matrix(cohort.vcfs, fasta, af_threshold=0.3)
+    fasta.close()
+    return int(matrix.values.sum())
+
+
+@case("fit_af_bins", "records")
+def bench_fit_af_bins(cohort):
+    from oncosigntrack.fitting import af_bin_counts, fit_to_signatures, load_signatures
+    from oncosigntrack.reference import FastaIndex
+
+    fasta = FastaIndex(cohort.reference)
+    counts, _ = af_bin_counts(cohort.vcfs, fasta, [0, 0.1, 0.25, 0.5, 1])
+    fasta.close()
+    fit_to_signatures(counts, load_signatures(cohort.signatures).values)
+    return int(counts.sum())
+
+
+@case("kataegis", "records")
+def bench_kataegis(cohort):
+    from oncosigntrack.kataegis import detect
+
+    return sum(detect(vcf)[-1] for vcf in cohort.vcfs)
+
+
+@case("catalogs", "records")
+def bench_catalogs(cohort):
+    from oncosigntrack.catalogs import catalog_matrices
+    from oncosigntrack.reference import FastaIndex
+
+    fasta = FastaIndex(cohort.reference)
+    matrices = catalog_matrices(cohort.vcfs, fasta)
+    fasta.close()
+    return sum(int(matrix.values.sum()) for matrix in matrices.values())
+
+
+@case("fit", "samples")
+def bench_fit(cohort):
+    import pandas as pd
+    from oncosigntrack.fitting import fit_to_signatures, load_signatures
+
+    counts = pd.read_csv(cohort.truth_counts, sep="\t", index_col=0)
+    signatures = load_signatures(cohort.signatures)
+    fit_to_signatures(counts.loc[signatures.index].values, signatures.values)
+    return counts.shape[1]
+
+
+@case("refit", "samples")
+def bench_refit(cohort):
+    from oncosigntrack.counting import read_matrix, write_matrix
+    from oncosigntrack.fitting import load_signatures
+    from oncosigntrack.refit import refit
+
+    path = os.path.join(cohort.scratch, "refit_counts.txt")
+    write_matrix(read_matrix(cohort.truth_counts), path)
+    counts = read_matrix(path)
+    refit(counts, {"reference": load_signatures(cohort.signatures)})
+    return counts.shape[1]
+
+
+@case("refit_strict", "samples")
+def bench_refit_strict(cohort):
+    from oncosigntrack.counting import read_matrix
+    from oncosigntrack.fitting import load_signatures
+    from oncosigntrack.refit import strict_refit
+
+    counts = read_matrix(cohort.truth_counts)
+    strict_refit(counts, {"reference": load_signatures(cohort.signatures)})
+    return counts.shape[1]
+
+
+@case("groupstats", "samples")
+def bench_groupstats(cohort):
+    import pandas as pd
+    from oncosigntrack.groupstats import group_statistics
+
+    data = pd.read_csv(cohort.group_csv, index_col=0)
+    group_statistics(data, list(data.columns[:data.shape[1] // 2]), permutations=2000, jobs=1)
+    return data.shape[1]
+
+
+@case("extract", "samples")
+def bench_extract(cohort):
+    import pandas as pd
+    from oncosigntrack.extraction import extract
+
+    counts = pd.read_csv(cohort.truth_counts, sep="\t", index_col=0)
+    extract(counts.values, [3, 4, 5], restarts=4, max_iter=500)
+    return counts.shape[1]
+
+
+@case("aggregate", "samples")
+def bench_aggregate(cohort):
+    from oncosigntrack.aggregate import find_contribution_files, grouped_table, read_long_tables
+
+    paths = find_contribution_files(cohort.contributions)
+    grouped_table(read_long_tables(paths))
+    return len(paths)
+
+
+@case("similarity", "samples")
+def bench_similarity(cohort):
+    from oncosigntrack.sparse import read_table
+
+    table = read_table(cohort.group_csv)
+    table.cosine("samples")
+    return table.shape[1]
+
+
+@case("plot_boxplot", "samples")
+def bench_plot_boxplot(cohort):
+    from oncosigntrack.boxplot import load_long_table, plot_box
+
+    data = load_long_table(cohort.all_csv)
+    plot_box(data, cohort.scratch, dpi=200)
+    return data["File"].nunique()
+
+
+@case("plot_boxplot_fast", "samples")
+def bench_plot_boxplot_fast(cohort):
+    from oncosigntrack.boxplot import load_long_table, plot_box
+
+    data = load_long_table(cohort.all_csv)
+    plot_box(data, cohort.scratch, dpi=200, fast=True, max_points=5000)
+    return data["File"].nunique()
+
+
+@case("plot_sampleplot", "samples")
+def bench_plot_sampleplot(cohort):
+    from oncosigntrack.sampleplot import load_samples, render
+
+    samples = load_samples([cohort.all_csv])[:200]
+    render(samples, cohort.scratch, dpi=100)
+    return len(samples)
+
+
+@case("plot_stackedbar", "samples")
+def bench_plot_stackedbar(cohort):
+    import pandas as pd
+    from oncosigntrack.stackedbar import percentage_table, render_pages
+
+    table = percentage_table(pd.read_csv(cohort.all_csv, usecols=[0, 1, 2]), top=10)
+    render_pages(table, cohort.scratch, "top_10_sbs_with_percentages", "Top 10", per_page=50, label_min=5.0,
+                 dpi=100)
+    return len(table)
+
+
+@case("plot_heatmap", "samples")
+def bench_plot_heatmap(cohort):
+    import pandas as pd
+    from oncosigntrack.heatmap import plot_circle_heatmap, prepare_table
+
+    data = prepare_table(pd.read_csv(cohort.group_csv, index_col=0), max_columns=0)
+    plot_circle_heatmap(data, cohort.scratch)
+    return data.shape[1]
+
+
+@case("plot_similarity", "samples")
+def bench_plot_similarity(cohort):
+    import pandas as pd
+    from oncosigntrack.similarity import cosine_similarity, plot_clustered_heatmap
+
+    data = pd.read_csv(cohort.group_csv, index_col=0).T
+    if len(data) > 2000:
+        raise SkipCase("clustered heatmap is limited to 2,000 samples")
+    similarity = pd.DataFrame(cosine_similarity(data), index=data.index, columns=data.index)
+    plot_clustered_heatmap(similarity, os.path.join(cohort.scratch, "similarity.png"))
+    return len(data)
+
+
+@case("consensus", "replicates")
+def bench_consensus(cohort):
+    import pandas as pd
+    from oncosigntrack.consensus import consensus_counts
+
+    data = pd.read_csv(cohort.group_csv, index_col=0).T
+    if len(data) < 6:
+        raise SkipCase("consensus clustering needs at least 6 samples")
+    consensus_counts(data.to_numpy(), [2, 3, 4], replicates=50, jobs=1)
+    return 50
+
+
+@case("plot_barplots", "samples")
+def bench_plot_barplots(cohort):
+    all_csv = os.path.join(cohort.scratch, "all.csv")
+    with open(cohort.all_csv, "r") as source, open(all_csv, "w") as target:
+        target.write(source.read())
+    for script in ("bar_plot_generator.py", "sbs_scaled_barplot_10_top.py"):
+        result = subprocess.run(
+            [sys.executable, os.path.join(REPO_ROOT, "Plot_analysis_generator", script), all_csv],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        if result.returncode != 0:
+            raise SkipCase(f"{script} failed: {result.stderr.strip().splitlines()[-1]}")
+    with open(all_csv, "r") as handle:
+        return len({line.split(",", 1)[0] for line in handle}) - 1
@@ -0,0 +1,84 @@
+"""Scaling of de novo NMF extraction with worker processes and cohort size.
+
+Draws Poisson count matrices from planted signatures (synthetic.py) and times
+``oncosigntrack.extraction.extract`` for every (samples, jobs) combination:
+
+    python3 benchmarks/extraction_scaling.py --samples 100,1000,5000 --jobs 1,2,4,8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+from oncosigntrack.extraction import extract, parse_ranks  # noqa: E402
+from run_benchmarks import git_commit  # noqa: E402
+
+
+def count_matrix(n_samples, n_signatures, variants, seed):
+    rng = np.random.default_rng(seed)
+    signatures = synthetic.make_signatures(n_signatures, rng)
+    exposures = synthetic.make_exposures(signatures, n_samples, variants, rng)
+    return rng.poisson(signatures.values @ exposures).astype(float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NMF extraction scaling.")
+    parser.add_argument("--samples", default="100,1000", help="Comma-separated cohort sizes")
+    parser.add_argument("--jobs", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--signatures", type=int, default=5, help="Planted signatures")
+    parser.add_argument("--ranks", default="4-6", help="Ranks extracted in every run")
+    parser.add_argument("--restarts", type=int, default=16, help="Restarts per rank")
+    parser.add_argument("--variants", type=int, default=5000, help="Mean SNVs per sample")
+    parser.add_argument("--max-iter", type=int, default=2000, help="Iteration cap per restart")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default=None, help="JSON report (default: results/<commit>_extraction.json)")
+    args = parser.parse_args()
+
+    ranks = parse_ranks(args.ranks)
+    rows = []
+    for n_samples in (int(n) for n in args.samples.split(",")):
+        V = count_matrix(n_samples, args.signatures, args.variants, args.seed)
+        serial = None
+        for jobs in (int(j) for j in args.jobs.split(",")):
+            start = time.perf_counter()
+            extract(V, ranks, args.restarts, jobs, args.seed, args.max_iter)
+            seconds = time.perf_counter() - start
+            serial = serial or (seconds if jobs == 1 else None)
+            speedup = serial / seconds if serial else None
+            rows.append({
+                "samples": n_samples,
+                "jobs": jobs,
+                "seconds": round(seconds, 3),
+                "speedup": round(speedup, 2) if speedup else None,
+                "efficiency": round(speedup / jobs, 2) if speedup else None,
+            })
+            print(f"samples={n_samples:<7} jobs={jobs:<3} {seconds:>9.2f}s"
+                  + (f"  speedup={speedup:.2f}x" if speedup else ""))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpu_count": os.cpu_count(),
+        "ranks": ranks,
+        "restarts": args.restarts,
+        "max_iter": args.max_iter,
+        "runs": rows,
+    }
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{report['commit']}_extraction.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"✅ Results saved to: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Track CLI start-up cost with ``python -X importtime``.
+
+Runs ``python3 -X importtime -m oncosigntrack <command> --help`` for every
+subcommand, sums the reported import time and lists any heavy library that
+was imported before the command ran. Results can be appended to a JSON
+history file so regressions show up between commits.
+
+Usage: python3 benchmarks/importtime.py [--output importtime.json] [--check]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+HEAVY_MODULES = ("numpy", "pandas", "scipy", "matplotlib", "seaborn", "requests", "bs4")
+
+
+def git_commit():
+    """Short commit hash of the working tree, or 'unknown'."""
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_importtime(stderr):
+    """Returns {module: cumulative microseconds} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def measure(argv):
+    """Imports and wall time of one CLI invocation."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "oncosigntrack"] + argv,
+                            capture_output=True, text=True, env=env, cwd=REPO_ROOT)
+    wall = time.perf_counter() - start
+    modules = parse_importtime(result.stderr)
+    heavy = sorted({name.split(".")[0] for name in modules if name.split(".")[0] in HEAVY_MODULES})
+    return {
+        "argv": argv,
+        "wall_seconds": round(wall, 4),
+        "import_seconds": round(modules.get("oncosigntrack.cli", 0) / 1e6, 4),
+        "modules_imported": len(modules),
+        "heavy_modules": heavy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure oncosigntrack CLI start-up with -X importtime.")
+    parser.add_argument("--output", default=None, help="Append results to this JSON history file")
+    parser.add_argument("--check", action="store_true",
+                        help="Exit with status 1 if any heavy library is imported for --help")
+    args = parser.parse_args()
+
+    from oncosigntrack.cli import build_parser
+    subparsers = next(a for a in build_parser()._actions if isinstance(a, argparse._SubParsersAction))
+    commands = sorted(subparsers.choices)
+
+    results = [measure(["--help"])] + [measure([command, "--help"]) for command in commands]
+    for r in results:
+        heavy = ",".join(r["heavy_modules"]) or "-"
+        print(f"{' '.join(r['argv']):<24} wall={r['wall_seconds']:.3f}s "
+              f"imports={r['import_seconds']:.3f}s modules={r['modules_imported']:<4} heavy={heavy}")
+
+    if args.output:
+        history = []
+        if os.path.exists(args.output):
+            with open(args.output, "r") as handle:
+                history = json.load(handle)
+        history.append({"commit": git_commit(), "timestamp": time.time(), "results": results})
+        with open(args.output, "w") as handle:
+            json.dump(history, handle, indent=2)
+        print(f"✅ Results appended to: {args.output}")
+
+    if args.check and any(r["heavy_modules"] for r in results):
+        print("❌ Heavy libraries are imported at start-up.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Regression checks of the fast paths against straightforward reference implementations.
+
+Each check builds a small random problem, solves it with the optimized code
+in oncosigntrack and with a slow, obviously correct version, and compares
+the results. Exits non-zero if any check fails.
+
+Usage: python3 benchmarks/regression.py [--checks strict,...] [--seed 0]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+CHECKS = {}
+
+
+def check(name):
+    """Registers a check: a function of a numpy Generator returning (passed, detail)."""
+    def register(func):
+        CHECKS[name] = func
+        return func
+    return register
+
+
+# --- Strict refitting (fitting.strict_fit) ---
+
+def naive_strict(basis, counts, max_delta):
+    """Backward elimination with a fresh scipy NNLS for every candidate removal."""
+    from scipy.optimize import nnls
+
+    def fit(kept):
+        x = np.zeros(basis.shape[1])
+        x[kept] = nnls(basis[:, kept], counts)[0]
+        reconstructed = basis @ x
+        return x, reconstructed @ counts / (np.linalg.norm(reconstructed) * np.linalg.norm(counts))
+
+    x, current = fit(np.arange(basis.shape[1]))
+    kept = np.flatnonzero(x > 0)
+    while len(kept) > 1:
+        trials = [fit(np.delete(kept, i)) for i in range(len(kept))]
+        best = int(np.argmax([cosine for _, cosine in trials]))
+        if current - trials[best][1] > max_delta:
+            break
+        x, current = trials[best]
+        kept = np.flatnonzero(x > 0)
+    return x, current
+
+
+@check("strict")
+def check_strict(rng, samples=40, signatures=30, max_delta=0.004):
+    from oncosigntrack.fitting import fit_to_signatures, strict_fit
+
+    basis = rng.dirichlet(np.full(96, 0.3), size=signatures).T
+    exposures = rng.gamma(1.0, 200.0, (signatures, samples)) * (rng.random((signatures, samples)) < 0.2)
+    counts = rng.poisson(basis @ exposures + 1.0).astype(float)
+    contributions, cosines, _ = strict_fit(counts, basis, max_delta, jobs=1)
+    naive = [naive_strict(basis, counts[:, j], max_delta) for j in range(samples)]
+    same_sets = all(np.array_equal(contributions[:, j] > 0, x > 0) for j, (x, _) in enumerate(naive))
+    error = max(np.abs(contributions[:, j] - x).max() / max(x.max(), 1.0) for j, (x, _) in enumerate(naive))
+    cosine_error = max(abs(cosines[j] - cosine) for j, (_, cosine) in enumerate(naive))
+    dropped = int((fit_to_signatures(counts, basis) > 0).sum() - (contributions > 0).sum())
+    passed = same_sets and error < 1e-6 and cosine_error < 1e-9 and dropped > 0
+    return passed, (f"{samples} samples, {dropped} signatures dropped: same kept sets {same_sets}, "
+                    f"max relative contribution error {error:.1e}, max cosine error {cosine_error:.1e}")
+
+
+# --- Kataegis clusters (kataegis.find_clusters) ---
+
+def naive_clusters(codes, positions, min_mutations, max_mean_distance):
+    """Scans every window of min_mutations consecutive SNVs; merges hit windows that share an SNV."""
+    k = min_mutations
+    clusters = []
+    for i in range(len(positions) - k + 1):
+        same_chromosome = codes[i] == codes[i + k - 1]
+        if not same_chromosome or positions[i + k - 1] - positions[i] > (k - 1) * max_mean_distance:
+            continue
+        if clusters and i <= clusters[-1][1]:
+            clusters[-1][1] = i + k - 1
+        else:
+            clusters.append([i, i + k - 1])
+    return clusters
+
+
+@check("kataegis")
+def check_kataegis(rng, cases=300):
+    from oncosigntrack.kataegis import find_clusters, intermutation_distances
+
+    mismatches = found = 0
+    for _ in range(cases):
+        n = int(rng.integers(0, 200))
+        codes = rng.integers(0, 3, n)
+        # sparse background with a few dense bursts
+        positions = rng.integers(1, 200_000, n)
+        burst = rng.random(n) < 0.3
+        positions[burst] = 50_000 + rng.integers(0, 3_000, burst.sum())
+        order, _ = intermutation_distances(codes, positions)
+        codes, positions = codes[order], positions[order]
+        k, distance = int(rng.integers(2, 9)), float(rng.choice([100, 500, 1000]))
+        first, last = find_clusters(codes, positions, k, distance)
+        expected = naive_clusters(codes, positions, k, distance)
+        found += len(expected)
+        mismatches += [[int(a), int(b)] for a, b in zip(first, last)] != expected
+    return not mismatches and found > 0, f"{cases} random cases, {found} clusters, {mismatches} mismatch(es)"
+
+
+# --- Consensus clustering (consensus.consensus_counts) ---
+
+def naive_consensus(values, ks, replicates, fraction, seed, batch):
+    """Replays the seeded replicates one by one, adding every co-sampled and co-clustered pair."""
+    from oncosigntrack.consensus import ward_clusters
+
+    n, m = values.shape
+    sizes = [min(batch, replicates - start) for start in range(0, replicates, batch)]
+    cosampled = np.zeros((n, n), dtype=np.int64)
+    coclustered = {k: np.zeros((n, n), dtype=np.int64) for k in ks}
+    for seed_sequence, size in zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes):
+        rng = np.random.default_rng(seed_sequence)
+        for _ in range(size):
+            rows = np.sort(rng.choice(n, size=max(int(round(fraction * n)), max(ks)), replace=False))
+            columns = rng.integers(0, m, m)
+            cosampled[np.ix_(rows, rows)] += 1
+            for k, labels in zip(ks, ward_clusters(values[np.ix_(rows, columns)], ks)):
+                coclustered[k][np.ix_(rows, rows)] += labels[:, None] == labels[None, :]
+    return cosampled, coclustered
+
+
+@check("consensus")
+def check_consensus(rng, samples=40, signatures=12, replicates=30, batch=7):
+    import pandas as pd
+
+    from oncosigntrack.consensus import consensus_counts, spearman
+
+    values = rng.gamma(1.0, 1.0, (samples, signatures))
+    values[:, 0] = values[:, 1]  # ties in the ranks
+    ks = [2, 3]
+    cosampled, coclustered = consensus_counts(values, ks, replicates, "both", 0.8, jobs=1, seed=5, batch=batch)
+    expected_sampled, expected_clustered = naive_consensus(values, ks, replicates, 0.8, 5, batch)
+    same = np.array_equal(cosampled, expected_sampled) and all(
+        np.array_equal(coclustered[k], expected_clustered[k]) for k in ks)
+    correlation_error = np.abs(spearman(values) - pd.DataFrame(values.T).corr("spearman").to_numpy()).max()
+    passed = same and correlation_error < 1e-12
+    return passed, (f"{samples} samples x {replicates} replicates: identical counts {same}, "
+                    f"Spearman error vs pandas {correlation_error:.1e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check oncosigntrack fast paths against reference implementations.")
+    parser.add_argument("--checks", default=",".join(CHECKS), help=f"Comma-separated checks ({', '.join(CHECKS)})")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the generated problems")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.checks.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CHECKS]
+    if unknown:
+        print(f"Error: unknown check(s) {unknown}; choose from {', '.join(CHECKS)}")
+        return 1
+    failed = 0
+    for name in names:
+        passed, detail = CHECKS[name](np.random.default_rng(args.seed))
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+        failed += not passed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
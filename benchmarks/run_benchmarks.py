@@ -0,0 +1,193 @@
+"""Reproducible benchmark runner.
+
+Generates (or reuses) a synthetic cohort at the requested scale, times every
+benchmark case and stores the results as JSON so runs can be compared
+across commits:
+
+    python3 benchmarks/run_benchmarks.py run --scale small
+    python3 benchmarks/run_benchmarks.py run --samples 500 --variants 50000 --cases filter,fit
+    python3 benchmarks/run_benchmarks.py compare results/old.json results/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import cases  # noqa: E402
+import synthetic  # noqa: E402
+
+# samples in the tables, samples that get a VCF, somatic SNVs per sample
+SCALES = {
+    "tiny": (10, 10, 1_000),
+    "small": (100, 20, 10_000),
+    "medium": (1_000, 50, 100_000),
+    "large": (10_000, 100, 1_000_000),
+    "wgs": (10, 2, 5_000_000),
+}
+
+
+def git_commit():
+    """Short commit hash of the working tree, or 'unknown'."""
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def prepare_cohort(args):
+    """Generates the cohort unless one with the same parameters already exists."""
+    samples, vcf_samples, variants = SCALES[args.scale]
+    samples = args.samples or samples
+    vcf_samples = min(args.vcf_samples or vcf_samples, samples)
+    variants = args.variants or variants
+    root = args.cohort_dir or os.path.join(BENCH_DIR, "data", f"s{samples}_v{vcf_samples}_n{variants}_seed{args.seed}")
+
+    params_path = os.path.join(root, "cohort.json")
+    if os.path.exists(params_path):
+        with open(params_path, "r") as handle:
+            params = json.load(handle)
+        if (params["samples"], params["vcf_samples"], params["variants"], params["seed"]) == \
+                (samples, vcf_samples, variants, args.seed):
+            print(f"ℹ️ Reusing cohort: {root}")
+            return cases.Cohort(root), params
+
+    generator_args = synthetic.build_parser().parse_args([
+        "--out", root, "--samples", str(samples), "--vcf-samples", str(vcf_samples),
+        "--variants", str(variants), "--seed", str(args.seed),
+    ])
+    start = time.perf_counter()
+    params = synthetic.generate(generator_args)
+    params["generation_seconds"] = round(time.perf_counter() - start, 2)
+    return cases.Cohort(root), params
+
+
+def run_case(name, cohort, repeat, memory):
+    """Times one case `repeat` times; optionally measures peak traced memory in an extra run."""
+    func, unit = cases.CASES[name]
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = func(cohort)
+        timings.append(time.perf_counter() - start)
+
+    result = {
+        "unit": unit,
+        "items": items,
+        "runs": [round(t, 4) for t in timings],
+        "min_seconds": round(min(timings), 4),
+        "median_seconds": round(statistics.median(timings), 4),
+        "items_per_second": round(items / statistics.median(timings), 2) if items else 0.0,
+    }
+    if memory:
+        tracemalloc.start()
+        func(cohort)
+        result["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    return result
+
+
+def run(args):
+    selected = args.cases.split(",") if args.cases else list(cases.CASES)
+    unknown = [name for name in selected if name not in cases.CASES]
+    if unknown:
+        print(f"Error: unknown case(s) {unknown}; available: {', '.join(cases.CASES)}")
+        return 1
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    cohort, params = prepare_cohort(args)
+    results = {}
+    for name in selected:
+        try:
+            results[name] = run_case(name, cohort, args.repeat, args.memory)
+            r = results[name]
+            print(f"{name:<18} median={r['median_seconds']:>9.3f}s  min={r['min_seconds']:>9.3f}s  "
+                  f"{r['items_per_second']:>12.1f} {r['unit']}/s")
+        except cases.SkipCase as e:
+            results[name] = {"skipped": str(e)}
+            print(f"{name:<18} skipped: {e}")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": args.scale,
+        "cohort": params,
+        "cases": results,
+    }
+    output = args.output or os.path.join(BENCH_DIR, "results", f"{report['commit']}_{args.scale}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"✅ Results saved to: {output}")
+    return 0
+
+
+def compare(args):
+    with open(args.baseline, "r") as handle:
+        baseline = json.load(handle)
+    with open(args.candidate, "r") as handle:
+        candidate = json.load(handle)
+
+    print(f"{'Case':<18}{baseline['commit']:>12}{candidate['commit']:>12}{'Ratio':>9}")
+    regressions = []
+    for name, new in candidate["cases"].items():
+        old = baseline["cases"].get(name)
+        if not old or "median_seconds" not in old or "median_seconds" not in new:
+            continue
+        ratio = new["median_seconds"] / old["median_seconds"] if old["median_seconds"] else float("inf")
+        flag = " ⚠️" if ratio > args.fail_above else ""
+        print(f"{name:<18}{old['median_seconds']:>11.3f}s{new['median_seconds']:>11.3f}s{ratio:>9.2f}{flag}")
+        if ratio > args.fail_above:
+            regressions.append(name)
+    if regressions:
+        print(f"❌ Slower than {args.fail_above}x baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OncoSignTrack benchmark suite.")
+    actions = parser.add_subparsers(dest="action", metavar="<action>")
+    actions.required = True
+
+    run_parser = actions.add_parser("run", help="Run benchmark cases and save a JSON report.")
+    run_parser.add_argument("--scale", choices=sorted(SCALES), default="tiny", help="Cohort size preset")
+    run_parser.add_argument("--samples", type=int, default=None, help="Override samples in the tables")
+    run_parser.add_argument("--vcf-samples", type=int, default=None, help="Override samples with a VCF")
+    run_parser.add_argument("--variants", type=int, default=None, help="Override somatic SNVs per sample")
+    run_parser.add_argument("--seed", type=int, default=0, help="Cohort random seed")
+    run_parser.add_argument("--cohort-dir", default=None, help="Where to generate/reuse the cohort")
+    run_parser.add_argument("--cases", default=None, help=f"Comma-separated subset of: {', '.join(cases.CASES)}")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per case")
+    run_parser.add_argument("--memory", action="store_true", help="Also record peak traced memory per case")
+    run_parser.add_argument("--output", default=None, help="Report path (default: results/<commit>_<scale>.json)")
+
+    compare_parser = actions.add_parser("compare", help="Compare two JSON reports case by case.")
+    compare_parser.add_argument("baseline", help="Baseline report")
+    compare_parser.add_argument("candidate", help="Candidate report")
+    compare_parser.add_argument("--fail-above", type=float, default=1.2,
+                                help="Exit with status 1 if a case is this many times slower")
+
+    args = parser.parse_args()
+    return run(args) if args.action == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
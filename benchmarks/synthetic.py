@@ -0,0 +1,287 @@
+"""Synthetic cohort generator for benchmarks.
+
+Writes a random reference genome, signature-driven bgzipped VCFs with
+GT:AD:DP sample fields, a BED of shared (common) variants, and the
+matching contribution tables the fitting stage would produce:
+
+    <out>/reference.fa(.fai)        random genome split into contigs
+    <out>/signatures.txt            reference signatures (channels x signatures)
+    <out>/common.bed                shared germline-like variants
+    <out>/vcfs/<sample>.vcf.gz      one VCF per sample
+    <out>/contributions/<sample>_mutational_signatures.csv
+    <out>/all.csv, <out>/group.csv  cohort long and grouped tables
+    <out>/truth_counts.txt          true SBS96 counts of the signature-driven SNVs
+                                    (SigProfiler layout; excludes doublets and common variants)
+    <out>/truth_exposures.csv       true signature exposures
+    <out>/cohort.json               generation parameters
+
+Mutations are placed at genome positions whose trinucleotide matches the
+sampled SBS96 channel, so context extraction recovers the true counts.
+
+Usage: python3 benchmarks/synthetic.py --out cohort/ --samples 100 --variants 10000
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from oncosigntrack.contexts import SBS96_CHANNELS  # noqa: E402
+from oncosigntrack.vcf import BgzfWriter  # noqa: E402
+
+BASES = np.array(list("ACGT"))
+# alt base of each substitution type, on the pyrimidine strand (A=0, C=1, G=2, T=3)
+SUBSTITUTION_ALT = np.array([0, 2, 3, 0, 1, 2])
+VCF_HEADER = (
+    "##fileformat=VCFv4.2\n"
+    "##source=oncosigntrack-synthetic\n"
+    "##FILTER=<ID=PASS,Description=\"All filters passed\">\n"
+    "##FILTER=<ID=LowQual,Description=\"Low quality\">\n"
+    "##FORMAT=<ID=GT,Number=1,Type=String,Description=\"Genotype\">\n"
+    "##FORMAT=<ID=AD,Number=R,Type=Integer,Description=\"Allelic depths\">\n"
+    "##FORMAT=<ID=DP,Number=1,Type=Integer,Description=\"Read depth\">\n"
+)
+
+
+def make_signatures(n_signatures, rng, cosmic_path=None):
+    """Reference signatures: a random subset of a COSMIC table, or peaked Dirichlet spectra."""
+    if cosmic_path:
+        table = pd.read_csv(cosmic_path, sep=None, engine="python", index_col=0).loc[SBS96_CHANNELS]
+        columns = rng.choice(table.columns, size=min(n_signatures, table.shape[1]), replace=False)
+        return table[sorted(columns)].astype(float)
+    spectra = rng.dirichlet(np.full(96, 0.15), size=n_signatures).T
+    return pd.DataFrame(spectra, index=SBS96_CHANNELS,
+                        columns=[f"SBS{i + 1}" for i in range(n_signatures)])
+
+
+def make_exposures(signatures, n_samples, variants, rng):
+    """Sparse per-sample exposures: two ubiquitous signatures plus 1-3 sample-specific ones."""
+    n_signatures = signatures.shape[1]
+    exposures = np.zeros((n_signatures, n_samples))
+    for j in range(n_samples):
+        extra = rng.choice(np.arange(2, n_signatures), size=min(rng.integers(1, 4), n_signatures - 2),
+                           replace=False) if n_signatures > 2 else []
+        active = np.concatenate([np.arange(min(2, n_signatures)), extra]).astype(int)
+        total = rng.lognormal(np.log(variants), 0.3)
+        exposures[active, j] = rng.dirichlet(np.ones(len(active))) * total
+    return exposures
+
+
+def write_reference(path, genome, n_contigs):
+    """Writes the genome as n_contigs FASTA records with a matching .fai; returns the contig length."""
+    length = len(genome) // n_contigs
+    line_bases = 60
+    with open(path, "wb") as fasta, open(path + ".fai", "w") as fai:
+        for c in range(n_contigs):
+            name = f"chr{c + 1}"
+            sequence = BASES[genome[c * length:(c + 1) * length]].astype("S1").tobytes()
+            fasta.write(f">{name}\n".encode())
+            offset = fasta.tell()
+            for i in range(0, len(sequence), line_bases):
+                fasta.write(sequence[i:i + line_bases] + b"\n")
+            fai.write(f"{name}\t{len(sequence)}\t{offset}\t{line_bases}\t{line_bases + 1}\n")
+    return length
+
+
+def context_index(genome, contig_length):
+    """Positions of the genome grouped by pyrimidine-strand trinucleotide (32 groups)."""
+    left, mid, right = genome[:-2], genome[1:-1], genome[2:]
+    purine = (mid == 0) | (mid == 2)
+    # reverse complement purine-centred trinucleotides (complement of x is 3 - x)
+    l = np.where(purine, 3 - right, left)
+    m = np.where(purine, 3 - mid, mid)
+    r = np.where(purine, 3 - left, right)
+    codes = (m == 3).astype(np.int64) * 16 + l * 4 + r
+    # the first and last base of a contig have no full trinucleotide
+    local = np.arange(1, len(genome) - 1) % contig_length
+    codes[(local == 0) | (local == contig_length - 1)] = 32
+    order = np.argsort(codes, kind="stable") + 1  # genome position of the middle base
+    bounds = np.searchsorted(codes[order - 1], np.arange(33))
+    return order, bounds
+
+
+def sample_snvs(counts, genome, order, bounds, rng):
+    """Draws positions and alt bases for per-channel SNV counts."""
+    positions, alts = [], []
+    for channel in np.nonzero(counts)[0]:
+        substitution, flank = divmod(channel, 16)
+        group = (substitution >= 3) * 16 + flank
+        start, end = bounds[group], bounds[group + 1]
+        if end <= start:
+            continue
+        picked = order[rng.integers(start, end, size=counts[channel])]
+        alt = SUBSTITUTION_ALT[substitution]
+        purine = (genome[picked] == 0) | (genome[picked] == 2)
+        positions.append(picked)
+        alts.append(np.where(purine, 3 - alt, alt))
+    if not positions:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    return np.concatenate(positions), np.concatenate(alts)
+
+
+def sample_records(snv_pos, snv_alt, common_pos, common_alt, genome, rng, args):
+    """Combines somatic SNVs, doublets, indels and common variants into sorted VCF columns."""
+    n = len(snv_pos)
+    # doublets: a second SNV right after a somatic one
+    n_dbs = int(n * args.dbs_fraction)
+    dbs_pos = rng.choice(snv_pos, size=n_dbs, replace=False) + 1 if n_dbs else np.array([], dtype=np.int64)
+    dbs_pos = dbs_pos[dbs_pos < len(genome) - 1]
+    dbs_alt = (genome[dbs_pos] + rng.integers(1, 4, size=len(dbs_pos))) % 4
+
+    n_indel = int(n * args.indel_fraction)
+    indel_pos = rng.integers(2, len(genome) - 2, size=n_indel)
+    is_deletion = rng.random(n_indel) < 0.5
+
+    pos = np.concatenate([snv_pos, dbs_pos, common_pos, indel_pos])
+    refs = np.concatenate([BASES[genome[snv_pos]], BASES[genome[dbs_pos]], BASES[genome[common_pos]],
+                           np.where(is_deletion,
+                                    np.char.add(BASES[genome[indel_pos]], BASES[genome[indel_pos + 1]]),
+                                    BASES[genome[indel_pos]])])
+    alts = np.concatenate([BASES[snv_alt], BASES[dbs_alt], BASES[common_alt],
+                           np.where(is_deletion, BASES[genome[indel_pos]],
+                                    np.char.add(BASES[genome[indel_pos]], BASES[rng.integers(0, 4, n_indel)]))])
+
+    n_somatic = len(snv_pos) + len(dbs_pos)
+    somatic_af = np.where(rng.random(n_somatic) < 0.7, rng.beta(20, 30, n_somatic), rng.beta(2, 18, n_somatic))
+    af = np.concatenate([somatic_af, np.where(rng.random(len(common_pos)) < 0.8, 0.5, 1.0),
+                         rng.beta(20, 30, n_indel)])
+    depth = rng.poisson(args.depth, size=len(pos)) + 1
+    alt_count = np.maximum(rng.binomial(depth, af), 1)
+    known = np.concatenate([rng.random(n_somatic) < args.known_fraction,
+                            np.ones(len(common_pos), dtype=bool), np.zeros(n_indel, dtype=bool)])
+    filters = np.where(rng.random(len(pos)) < args.lowqual_fraction, "LowQual", "PASS")
+
+    order = np.argsort(pos, kind="stable")
+    return {
+        "pos": pos[order], "ref": refs[order], "alt": alts[order], "known": known[order],
+        "filter": filters[order], "ref_count": (depth - alt_count)[order].clip(min=0),
+        "alt_count": alt_count[order], "depth": depth[order],
+    }
+
+
+def write_vcf(path, sample, records, contig_length):
+    """Writes one single-sample VCF with GT:AD:DP fields."""
+    contig = records["pos"] // contig_length
+    local = records["pos"] % contig_length + 1
+    keep = local < contig_length  # drop indels spilling over the end of a contig
+    n_contigs = int(contig.max()) + 1 if len(contig) else 0
+    header = VCF_HEADER + "".join(
+        f"##contig=<ID=chr{c + 1},length={contig_length}>\n" for c in range(n_contigs)
+    ) + f"#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t{sample}\n"
+
+    lines = [
+        f"chr{c + 1}\t{p}\t{f'rs{p}' if known else '.'}\t{ref}\t{alt}\t50\t{flt}\t.\tGT:AD:DP\t"
+        f"{'1/1' if rc == 0 else '0/1'}:{rc},{ac}:{dp}\n"
+        for c, p, known, ref, alt, flt, rc, ac, dp in zip(
+            contig[keep], local[keep], records["known"][keep], records["ref"][keep], records["alt"][keep],
+            records["filter"][keep], records["ref_count"][keep], records["alt_count"][keep],
+            records["depth"][keep])
+    ]
+    with BgzfWriter(path) as writer:
+        writer.write(header)
+        writer.write("".join(lines))
+    return int(keep.sum())
+
+
+def write_bed(path, positions, contig_length):
+    """Writes the common variants as a sorted BED."""
+    positions = np.sort(positions)
+    with open(path, "w") as handle:
+        for p in positions:
+            c, local = divmod(int(p), contig_length)
+            handle.write(f"chr{c + 1}\t{local}\t{local + 1}\n")
+
+
+def write_contributions(out, sample_names, signatures, exposures):
+    """Per-sample contribution CSVs plus the cohort long and grouped tables."""
+    contrib_dir = os.path.join(out, "contributions")
+    os.makedirs(contrib_dir, exist_ok=True)
+    long_frames = []
+    for j, sample in enumerate(sample_names):
+        frame = pd.DataFrame({"File": f"{sample}.vcf.gz", "Signature": signatures.columns,
+                              "Contribution": exposures[:, j]})
+        frame.to_csv(os.path.join(contrib_dir, f"{sample}_mutational_signatures.csv"), index=False)
+        long_frames.append(frame[frame["Contribution"] > 0])
+    pd.concat(long_frames).to_csv(os.path.join(out, "all.csv"), index=False)
+    grouped = pd.DataFrame(exposures.astype(int), index=signatures.columns,
+                           columns=[f"{s}.vcf.gz" for s in sample_names])
+    grouped.to_csv(os.path.join(out, "group.csv"), index_label="Signature")
+
+
+def generate(args):
+    rng = np.random.default_rng(args.seed)
+    os.makedirs(os.path.join(args.out, "vcfs"), exist_ok=True)
+
+    signatures = make_signatures(args.signatures_count, rng, args.cosmic)
+    signatures.to_csv(os.path.join(args.out, "signatures.txt"), sep="\t", index_label="Type")
+    sample_names = [f"SAMPLE{j + 1:05d}" for j in range(args.samples)]
+    exposures = make_exposures(signatures, args.samples, args.variants, rng)
+    write_contributions(args.out, sample_names, signatures, exposures)
+
+    genome_length = args.genome_length or max(1_000_000, 4 * args.variants)
+    genome = rng.integers(0, 4, size=genome_length).astype(np.int64)
+    contig_length = write_reference(os.path.join(args.out, "reference.fa"), genome, args.contigs)
+    genome = genome[:contig_length * args.contigs]
+    order, bounds = context_index(genome, contig_length)
+
+    n_common = int(args.variants * args.common_fraction)
+    common_pos = np.unique(rng.integers(1, len(genome) - 1, size=n_common))
+    common_alt = (genome[common_pos] + rng.integers(1, 4, size=len(common_pos))) % 4
+    write_bed(os.path.join(args.out, "common.bed"), common_pos, contig_length)
+
+    vcf_samples = min(args.vcf_samples if args.vcf_samples is not None else args.samples, args.samples)
+    truth = np.zeros((96, vcf_samples), dtype=np.int64)
+    n_records = 0
+    for j in range(vcf_samples):
+        spectrum = signatures.values @ exposures[:, j]
+        counts = rng.multinomial(int(round(spectrum.sum())), spectrum / spectrum.sum())
+        snv_pos, snv_alt = sample_snvs(counts, genome, order, bounds, rng)
+        records = sample_records(snv_pos, snv_alt, common_pos, common_alt, genome, rng, args)
+        n_records += write_vcf(os.path.join(args.out, "vcfs", f"{sample_names[j]}.vcf.gz"),
+                               sample_names[j], records, contig_length)
+        truth[:, j] = counts
+
+    truth_counts = pd.DataFrame(truth, index=SBS96_CHANNELS, columns=sample_names[:vcf_samples])
+    truth_counts.to_csv(os.path.join(args.out, "truth_counts.txt"), sep="\t", index_label="MutationType")
+    pd.DataFrame(exposures, index=signatures.columns, columns=sample_names).to_csv(
+        os.path.join(args.out, "truth_exposures.csv"), index_label="Signature")
+
+    params = {k: v for k, v in vars(args).items()}
+    params.update({"genome_length": int(len(genome)), "vcf_samples": vcf_samples, "vcf_records": n_records})
+    with open(os.path.join(args.out, "cohort.json"), "w") as handle:
+        json.dump(params, handle, indent=2)
+    print(f"✅ Synthetic cohort written to: {args.out} "
+          f"({args.samples} samples, {vcf_samples} VCFs, {n_records} VCF records)")
+    return params
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate a synthetic, signature-driven VCF cohort.")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--samples", type=int, default=10, help="Samples in the contribution tables")
+    parser.add_argument("--vcf-samples", type=int, default=None,
+                        help="Samples that also get a VCF (default: all)")
+    parser.add_argument("--variants", type=int, default=1000, help="Mean somatic SNVs per sample")
+    parser.add_argument("--signatures-count", type=int, default=20, help="Number of reference signatures")
+    parser.add_argument("--cosmic", default=None, help="Draw signatures from this COSMIC table instead")
+    parser.add_argument("--genome-length", type=int, default=None,
+                        help="Genome size (default: max(1 Mb, 4 x variants))")
+    parser.add_argument("--contigs", type=int, default=4, help="Number of contigs")
+    parser.add_argument("--common-fraction", type=float, default=0.05,
+                        help="Shared common variants per sample, as a fraction of --variants")
+    parser.add_argument("--dbs-fraction", type=float, default=0.01, help="Adjacent SNV pairs per SNV")
+    parser.add_argument("--indel-fraction", type=float, default=0.05, help="Indels per SNV")
+    parser.add_argument("--known-fraction", type=float, default=0.1, help="Somatic records with an rs ID")
+    parser.add_argument("--lowqual-fraction", type=float, default=0.05, help="Records with FILTER=LowQual")
+    parser.add_argument("--depth", type=float, default=60, help="Mean read depth")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    return parser
+
+
+if __name__ == "__main__":
+    generate(build_parser().parse_args())
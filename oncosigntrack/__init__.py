@@ -0,0 +1,8 @@
+"""OncoSignTrack Python toolkit.
+
+The package only imports the standard library at start-up; pandas, numpy,
+matplotlib, seaborn and scipy are imported inside the subcommand that needs
+them (see ``oncosigntrack.cli``).
+"""
+
+__version__ = "0.2.0"
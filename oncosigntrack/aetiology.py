@@ -0,0 +1,74 @@
+"""COSMIC aetiology lookup (Proposed_Aetiology_extractor.py) for the cohort's signatures."""
+import requests
+from bs4 import BeautifulSoup
+
+BASE_URL = "https://cancer.sanger.ac.uk/signatures/sbs/{}"
+
+
+def load_sbs_list(file_path):
+    """Reads the SBS list from a file (one per line)."""
+    with open(file_path, "r") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def signatures_from_table(file_path):
+    """Unique signatures with a non-zero contribution in a File,Signature,Contribution table."""
+    signatures = set()
+    with open(file_path, "r") as file:
+        next(file, None)
+        for line in file:
+            fields = line.rstrip("\n").replace('"', "").split(",")
+            if len(fields) >= 3:
+                try:
+                    if float(fields[2]) > 0:
+                        signatures.add(fields[1])
+                except ValueError:
+                    continue
+    return sorted(signatures)
+
+
+def _section_text(soup, start_title, end_title):
+    """Text between two h2/h3 headings, or 'Unknown'."""
+    start = soup.find(lambda tag: tag.name in ["h3", "h2"] and start_title in tag.text)
+    end = soup.find(lambda tag: tag.name in ["h3", "h2"] and end_title in tag.text)
+    if not (start and end):
+        return "Unknown"
+    content = []
+    for elem in start.find_next_siblings():
+        if elem == end:
+            break
+        if elem.name not in ["script", "style"]:
+            content.append(elem.get_text(separator=" ", strip=True))
+    return " ".join(content) if content else "Unknown"
+
+
+def fetch_aetiology(sbs, session):
+    """Prints the proposed aetiology, short aetiology and associated signatures of one SBS."""
+    url = BASE_URL.format(sbs.lower())
+    response = session.get(url)
+
+    if response.status_code == 200:
+        print(f"✅ Found {sbs} at {url}")
+        soup = BeautifulSoup(response.text, "html.parser")
+
+        aetiology = _section_text(soup, "Proposed aetiology", "Acceptance criteria")
+        if "Comments" in aetiology:
+            aetiology = aetiology.replace("Comments", "\n***Comments:")
+        associated_signatures = _section_text(soup, "Associated signatures", "Replication timing")
+        aetiology_td = soup.find("td", {"headers": "aet1"})
+        associated_aetiology = aetiology_td.get_text(separator=" ", strip=True) if aetiology_td else "Unknown"
+
+        print(f"{sbs} Aetiology: {aetiology}\n")
+        print(f"{sbs} Second Aetiology: {associated_aetiology}\n")
+        print(f"{sbs} Associated Signatures: {associated_signatures}\n")
+    else:
+        print(f"❌ Could not retrieve {sbs}. Status code: {response.status_code}")
+    print("-" * 120)
+
+
+def main(args):
+    sbs_list = load_sbs_list(args.list) if args.list else signatures_from_table(args.table)
+    with requests.Session() as session:
+        for sbs in sbs_list:
+            fetch_aetiology(sbs, session)
+    return 0
@@ -0,0 +1,75 @@
+"""Cohort aggregation of per-sample contribution CSVs.
+
+Replaces the ``grep >> all.csv`` loop of OncoSignTrack_pipeline.sh and
+generate_report_grouped_by_SBS.sh with one pandas pass.
+"""
+import glob
+import os
+
+import pandas as pd
+
+LONG_COLUMNS = ["File", "Signature", "Contribution"]
+
+
+def find_contribution_files(directory, pattern="*_mutational_signatures.csv"):
+    """Per-sample contribution CSVs written by the fitting stage."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def read_long_tables(paths):
+    """Concatenates File,Signature,Contribution tables, dropping zero contributions."""
+    frames = []
+    for path in paths:
+        frame = pd.read_csv(path, usecols=[0, 1, 2])
+        frame.columns = LONG_COLUMNS
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+    data = pd.concat(frames, ignore_index=True)
+    data["Contribution"] = pd.to_numeric(data["Contribution"], errors="coerce")
+    return data[data["Contribution"] > 0].reset_index(drop=True)
+
+
+def grouped_sparse(data, as_int=True):
+    """Signature x sample SparseTable of the long table's non-zero contributions."""
+    from oncosigntrack.sparse import SparseTable
+
+    table = SparseTable.from_long(data)
+    return table.truncate() if as_int else table
+
+
+def grouped_table(data, as_int=True):
+    """Signature x sample table (generate_report_grouped_by_SBS.sh layout)."""
+    return grouped_sparse(data, as_int).to_frame(as_int)
+
+
+def main(args):
+    paths = find_contribution_files(args.directory, args.pattern)
+    data = read_long_tables(paths)
+    if data.empty:
+        print("No data to aggregate.")
+        return 1
+
+    long_output = args.output or os.path.join(args.directory, "all.csv")
+    data.to_csv(long_output, index=False)
+    print(f"✅ Cohort table ({len(paths)} files) saved to: {long_output}")
+
+    from oncosigntrack.sparse import grouped_path
+
+    grouped_output = args.grouped or os.path.join(args.directory, "group.csv")
+    table = grouped_sparse(data, as_int=not args.keep_float)
+    table.to_frame(as_int=not args.keep_float).to_csv(grouped_output, index_label="Signature")
+    table.write(grouped_path(grouped_output))
+    density = table.nnz / max(table.shape[0] * table.shape[1], 1)
+    print(f"✅ Grouped table ({table.shape[0]} x {table.shape[1]}, {density:.1%} non-zero) saved to: "
+          f"{grouped_output}")
+
+    # per-VCF QC rows written by 'filter --qc' / 'fit --qc'
+    qc_paths = find_contribution_files(args.directory, "*_qc.csv")
+    if qc_paths:
+        qc_output = os.path.join(os.path.dirname(long_output), "qc_metrics.csv")
+        qc_table = pd.concat([pd.read_csv(path) for path in qc_paths], ignore_index=True)
+        qc_table.to_csv(qc_output, index=False)
+        flagged = int(qc_table["Low_Count"].sum()) if "Low_Count" in qc_table else 0
+        print(f"✅ QC table ({len(qc_table)} VCFs, {flagged} low-count) saved to: {qc_output}")
+    return 0
@@ -0,0 +1,68 @@
+"""In-memory BED interval index used instead of a bedtools subtract pass."""
+from bisect import bisect_right
+
+import numpy as np
+
+
+class BedIndex:
+    """Sorted, merged intervals per chromosome answering overlap queries."""
+
+    def __init__(self, intervals=None):
+        self.starts = {}
+        self.ends = {}
+        self._arrays = {}
+        if intervals:
+            self._build(intervals)
+
+    @classmethod
+    def from_file(cls, path):
+        """Reads a BED file (0-based, half-open) into an index."""
+        intervals = {}
+        with open(path, "r") as handle:
+            for line in handle:
+                if not line.strip() or line.startswith(("#", "track", "browser")):
+                    continue
+                chrom, start, end = line.split("\t", 3)[:3]
+                intervals.setdefault(chrom, []).append((int(start), int(end)))
+        return cls(intervals)
+
+    def _build(self, intervals):
+        for chrom, spans in intervals.items():
+            starts, ends = [], []
+            for start, end in sorted(spans):
+                if ends and start <= ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self.starts[chrom] = starts
+            self.ends[chrom] = ends
+
+    def overlaps(self, chrom, start, end):
+        """True if [start, end) overlaps any interval (bedtools subtract -A semantics)."""
+        starts = self.starts.get(chrom)
+        if not starts:
+            return False
+        i = bisect_right(starts, end - 1) - 1
+        return i >= 0 and self.ends[chrom][i] > start
+
+    def overlaps_record(self, chrom, pos, ref):
+        """Overlap test for a VCF record (1-based POS spanning the REF allele)."""
+        return self.overlaps(chrom, pos - 1, pos - 1 + len(ref))
+
+    def overlaps_many(self, chroms, starts, ends):
+        """Vectorized overlaps() for arrays of records; returns a boolean mask."""
+        chroms = np.asarray(chroms, dtype=object)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        result = np.zeros(len(chroms), dtype=bool)
+        for chrom in np.unique(chroms):
+            if not self.starts.get(chrom):
+                continue
+            if chrom not in self._arrays:
+                self._arrays[chrom] = (np.asarray(self.starts[chrom]), np.asarray(self.ends[chrom]))
+            interval_starts, interval_ends = self._arrays[chrom]
+            rows = np.flatnonzero(chroms == chrom)
+            i = np.searchsorted(interval_starts, ends[rows] - 1, side="right") - 1
+            result[rows] = (i >= 0) & (interval_ends[np.maximum(i, 0)] > starts[rows])
+        return result
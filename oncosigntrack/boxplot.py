@@ -0,0 +1,143 @@
+"""Box plot of contributions per signature (generate_box_plot.py)."""
+import os
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.ticker import ScalarFormatter
+
+# Box statistics in the layout of matplotlib.cbook.boxplot_stats
+STAT_KEYS = ["q1", "med", "q3", "whislo", "whishi", "mean"]
+
+
+def load_long_table(file_path):
+    """Reads File,Signature,Contribution and keeps signatures with any non-zero value."""
+    data = pd.read_csv(file_path, usecols=[0, 1, 2])
+    data.columns = ['File', 'Signature', 'Contribution']
+    data['Contribution'] = pd.to_numeric(data['Contribution'], errors='coerce')
+    data.dropna(subset=['Contribution'], inplace=True)
+
+    has_nonzero = data.groupby('Signature')['Contribution'].transform('max') > 0
+    return data[has_nonzero]
+
+
+def box_stats(data, order, whis=1.5):
+    """Quartiles and 1.5 IQR whiskers of every signature, computed in one grouped pass.
+
+    Matches matplotlib's boxplot_stats (linear percentiles, whiskers at the
+    most extreme points within whis * IQR of the box), so boxes drawn from
+    these statistics have the same geometry as sns.boxplot.
+    """
+    grouped = data.groupby('Signature', observed=True)['Contribution']
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats = pd.DataFrame({"q1": quartiles[0.25], "med": quartiles[0.5], "q3": quartiles[0.75],
+                          "mean": grouped.mean()})
+
+    iqr = stats["q3"] - stats["q1"]
+    low = data['Signature'].map(stats["q1"] - whis * iqr).astype(float)
+    high = data['Signature'].map(stats["q3"] + whis * iqr).astype(float)
+    values = data['Contribution']
+    stats["whislo"] = values.where(values >= low).groupby(data['Signature'], observed=True).min()
+    stats["whishi"] = values.where(values <= high).groupby(data['Signature'], observed=True).max()
+    stats["whislo"] = np.fmin(stats["whislo"].fillna(stats["q1"]), stats["q1"])
+    stats["whishi"] = np.fmax(stats["whishi"].fillna(stats["q3"]), stats["q3"])
+    return stats.reindex(order)[STAT_KEYS]
+
+
+def overlay_points(data, order, max_points=None, seed=0):
+    """x (box position + jitter) and y of the points drawn over the boxes.
+
+    With `max_points`, about that many points per signature are kept,
+    sampled uniformly so the spread stays representative.
+    """
+    rng = np.random.default_rng(seed)
+    if max_points:
+        keep = rng.random(len(data)) * data.groupby('Signature', observed=True)['Contribution'].transform('size')
+        data = data[keep < max_points]
+    position = pd.Series(np.arange(len(order)), index=order)
+    x = data['Signature'].map(position).to_numpy(dtype=float)
+    return x + rng.uniform(-0.2, 0.2, len(x)), data['Contribution'].to_numpy()
+
+
+def _draw_fast(ax, data, order, max_points):
+    stats = box_stats(data, order)
+    records = [dict(row, label=name) for name, row in stats.iterrows()]
+    colors = plt.get_cmap('Set2')(np.arange(len(order)) % 8)[:, :3]
+    # seaborn's default saturation=0.75 and dark-gray lines
+    gray = colors.mean(axis=1, keepdims=True)
+    colors = gray + 0.75 * (colors - gray)
+    line = {"color": "0.26"}
+    boxes = ax.bxp(records, positions=np.arange(len(order)), widths=0.8, showfliers=False,
+                   patch_artist=True, boxprops={"edgecolor": "0.26"}, medianprops=line,
+                   whiskerprops=line, capprops=line)
+    for patch, color in zip(boxes["boxes"], colors):
+        patch.set_facecolor(color)
+    ax.set_xlim(-0.5, len(order) - 0.5)
+
+    x, y = overlay_points(data, order, max_points)
+    ax.scatter(x, y, s=1.5 ** 2, color='black', linewidths=0, rasterized=True, zorder=3)
+
+
+def plot_box(data, output_dir, data_set_name="", dpi=800, order=None, fast=False, max_points=None):
+    """Box plot sorted by mean contribution with per-signature sample counts.
+
+    `order` is an already sorted signature list (e.g. from cohort statistics).
+    With `fast`, boxes are drawn from precomputed statistics and the points
+    are rasterized (and subsampled to `max_points` per signature if given)
+    instead of going through sns.boxplot/sns.stripplot.
+    """
+    if order is None:
+        order = data.groupby('Signature')['Contribution'].mean().sort_values(ascending=False).index
+    data = data.assign(Signature=pd.Categorical(data['Signature'], categories=order))
+    data = data.sort_values('Signature')
+
+    fig = plt.figure(figsize=(14, 7))
+
+    if fast:
+        _draw_fast(plt.gca(), data, list(order), max_points)
+    else:
+        import seaborn as sns
+        sns.boxplot(x='Signature', y='Contribution', data=data, hue='Signature',
+                    palette='Set2', showfliers=False, legend=False, dodge=False)
+        sns.stripplot(x='Signature', y='Contribution', data=data, color='black', size=1.5, jitter=True)
+
+    # --- Count unique samples with nonzero contribution per signature ---
+    nonzero_data = data[data['Contribution'] > 0]
+    sample_counts = nonzero_data.groupby('Signature', observed=False)['File'].nunique()
+
+    y_offset = data['Contribution'].max() * 1.05
+    for pos, count in enumerate(sample_counts):
+        plt.text(pos, y_offset, f'n={count}', ha='center', va='bottom', fontsize=8, color='blue', rotation=90)
+
+    plt.title(f'Box Plot of Contributions by Mutational Signature ({data_set_name} Samples)\n', fontsize=16)
+    plt.xlabel('Mutational Signatures (Sorted by Mean Contribution)', fontsize=12)
+    plt.ylabel('Contribution', fontsize=12)
+    plt.grid(axis='both', linestyle='--', linewidth=0.7, alpha=0.7)
+    plt.xticks(rotation=90)
+
+    overall_median = data['Contribution'].median()
+    plt.axhline(overall_median, color='green', linestyle='--', linewidth=1, label=f'Median: {overall_median:.2f}')
+    plt.legend()
+
+    plt.gca().yaxis.set_major_formatter(ScalarFormatter(useMathText=True))
+    plt.ticklabel_format(axis='y', style='plain')
+    plt.tight_layout()
+
+    output_file = os.path.join(output_dir, f'box_plot_{data_set_name.replace(" ", "_")}.png')
+    fig.savefig(output_file, dpi=dpi)
+    plt.close(fig)
+    print(f"✅ Plot saved at: {output_file}")
+    return output_file
+
+
+def main(args):
+    try:
+        data = load_long_table(args.input_file)
+    except Exception as e:
+        print(f"Error reading the file: {e}")
+        return 1
+    output_dir = args.output_dir or os.path.dirname(args.input_file)
+    plot_box(data, output_dir, args.name, args.dpi, fast=args.fast, max_points=args.max_points)
+    return 0
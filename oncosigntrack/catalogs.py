@@ -0,0 +1,181 @@
+"""SBS96, DBS78 and ID83 count matrices from one pass over each VCF.
+
+Every record is classified once: SNVs go to SBS96, except that SNVs on
+adjacent positions carried by the same sample are merged into one DBS78
+doublet for that sample (runs of three or more are multi-base substitutions
+and are left out, as in MutationalPatterns). Two-base records go straight to
+DBS78 and anchored indels to ID83, classified by length and by the repeat or
+microhomology context read from the reference. The three matrices are then
+fitted against their reference signatures in one call.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from oncosigntrack import profiling
+from oncosigntrack.contexts import (
+    DBS78_CHANNELS, ID83_CHANNELS, SBS96_CHANNELS, dbs78_index, id83_index, is_dbs, is_indel,
+    is_snv, sbs96_index,
+)
+from oncosigntrack.counting import SampleCounter, write_matrix
+from oncosigntrack.reference import FastaIndex
+from oncosigntrack.vcf import ALT, CHROM, POS, REF, VcfReader
+
+CATALOGS = {"sbs96": SBS96_CHANNELS, "dbs78": DBS78_CHANNELS, "id83": ID83_CHANNELS}
+
+
+class SnvRuns:
+    """SBS96 counts with per-sample merging of adjacent SNVs into DBS78 doublets.
+
+    SNVs are buffered; a row is decided once the two rows after it are known,
+    so runs are found with whole-batch boolean operations. One decided row is
+    kept as left context for the next batch.
+    """
+
+    def __init__(self, samples, sbs, dbs):
+        self.samples = samples  # SampleCounter deciding carriage
+        self.sbs = sbs
+        self.dbs = dbs
+        self.rows = []  # (chrom, pos, channel, ref, alt)
+        self.values = []
+        self.context = 0
+
+    def add(self, fields, channel):
+        self.rows.append((fields[CHROM], int(fields[POS]), channel, fields[REF], fields[ALT]))
+        self.values.append(self.samples.sample_values(fields))
+        if len(self.rows) >= self.samples.batch_size:
+            self.flush()
+
+    def flush(self, final=False):
+        n = len(self.rows)
+        if n <= self.context:
+            return
+        carried = self.samples.carried(self.values)
+        chrom = np.array([row[0] for row in self.rows], dtype=object)
+        pos = np.array([row[1] for row in self.rows], dtype=np.int64)
+        adjacent = (chrom[1:] == chrom[:-1]) & (pos[1:] == pos[:-1] + 1)
+
+        # linked[k]: the sample carries both row k - 1 and row k, which are adjacent
+        linked = np.zeros((n + 2, carried.shape[1]), dtype=bool)
+        linked[1:n] = adjacent[:, None] & carried[:-1] & carried[1:]
+
+        end = n if final else n - 2
+        if end > self.context:
+            rows = np.arange(self.context, end)
+            single = carried[rows] & ~linked[rows] & ~linked[rows + 1]
+            channels = np.array([self.rows[i][2] for i in rows], dtype=np.int64)
+            np.add.at(self.sbs, channels, single.astype(np.int64))
+
+            doublet = linked[rows + 1] & ~linked[rows] & ~linked[rows + 2]
+            for i in rows[doublet.any(axis=1)]:
+                channel = dbs78_index(self.rows[i][3] + self.rows[i + 1][3],
+                                      self.rows[i][4] + self.rows[i + 1][4])
+                if channel >= 0:
+                    self.dbs[channel] += doublet[i - self.context]
+
+            keep = end - 1
+            self.rows = self.rows[keep:]
+            self.values = self.values[keep:]
+            self.context = 1
+
+
+def count_catalogs(vcf_path, fasta, af_threshold=None, batch_size=4096):
+    """Returns ({catalog: channels x N counts}, sample names, records read) for one VCF."""
+    records = 0
+    with VcfReader(vcf_path) as reader:
+        samples = reader.samples
+        dbs = SampleCounter(len(samples), af_threshold, batch_size, len(DBS78_CHANNELS))
+        indels = SampleCounter(len(samples), af_threshold, batch_size, len(ID83_CHANNELS))
+        sbs = np.zeros((len(SBS96_CHANNELS), max(len(samples), 1)), dtype=np.int64)
+        snvs = SnvRuns(SampleCounter(len(samples), af_threshold, batch_size), sbs, dbs.counts)
+
+        for fields in reader:
+            records += 1
+            if is_snv(fields):
+                channel = sbs96_index(fasta, fields[CHROM], int(fields[POS]), fields[ALT])
+                if channel >= 0:
+                    snvs.add(fields, channel)
+            elif is_dbs(fields):
+                channel = dbs78_index(fields[REF], fields[ALT])
+                if channel >= 0:
+                    dbs.add(channel, fields)
+            elif is_indel(fields):
+                channel = id83_index(fasta, fields[CHROM], int(fields[POS]), fields[REF], fields[ALT])
+                if channel >= 0:
+                    indels.add(channel, fields)
+        snvs.flush(final=True)
+        dbs.flush()
+        indels.flush()
+    names = samples or [os.path.basename(vcf_path)]
+    return {"sbs96": sbs, "dbs78": dbs.counts, "id83": indels.counts}, names, records
+
+
+def catalog_matrices(vcf_paths, fasta, af_threshold=None, batch_size=4096):
+    """All three catalogs of every sample of every VCF as channels x samples DataFrames."""
+    blocks = {name: [] for name in CATALOGS}
+    columns, seen = [], set()
+    for vcf_path in vcf_paths:
+        counts, names, records = count_catalogs(vcf_path, fasta, af_threshold, batch_size)
+        profiling.add_records(records)
+        base = os.path.basename(vcf_path).split(".vcf")[0]
+        for name in names:
+            unique = name if name not in seen else f"{base}_{name}"
+            seen.add(unique)
+            columns.append(unique)
+        for catalog in CATALOGS:
+            blocks[catalog].append(counts[catalog])
+        print(f"Classified {records} records of {len(names)} sample(s) from {vcf_path}")
+    return {catalog: pd.DataFrame(np.hstack(blocks[catalog]), index=channels, columns=columns)
+            for catalog, channels in CATALOGS.items()}
+
+
+def fit_catalogs(matrices, references):
+    """Fits every catalog that has a reference; returns {catalog: signatures x samples DataFrame}."""
+    from oncosigntrack.fitting import fit_to_signatures
+
+    fits = {}
+    for catalog, reference in references.items():
+        counts = matrices[catalog]
+        contribution = fit_to_signatures(counts.values, reference.values)
+        fits[catalog] = pd.DataFrame(contribution, index=reference.columns, columns=counts.columns)
+    return fits
+
+
+def long_table(fit):
+    """File,Signature,Contribution rows (all.csv layout) of a signatures x samples fit."""
+    table = fit.T.stack().reset_index()
+    table.columns = ["File", "Signature", "Contribution"]
+    return table
+
+
+def main(args):
+    from oncosigntrack.fitting import load_signatures
+
+    references = {}
+    for catalog, path in (("sbs96", args.sbs_signatures), ("dbs78", args.dbs_signatures),
+                          ("id83", args.id_signatures)):
+        if path:
+            try:
+                references[catalog] = load_signatures(path, CATALOGS[catalog])
+            except ValueError as e:
+                print(f"Error: {e}")
+                return 1
+
+    fasta = FastaIndex(args.genome)
+    af_threshold = float(args.allele_frequency) if args.allele_frequency is not None else None
+    matrices = catalog_matrices(args.vcf, fasta, af_threshold, args.batch_size)
+    fasta.close()
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.vcf[0]))
+    os.makedirs(output_dir, exist_ok=True)
+    for catalog, matrix in matrices.items():
+        path = os.path.join(output_dir, f"{catalog}_counts.txt")
+        write_matrix(matrix, path)
+        print(f"✅ {catalog.upper()} matrix ({int(matrix.values.sum())} mutations) saved to: {path}")
+
+    for catalog, fit in fit_catalogs(matrices, references).items():
+        path = os.path.join(output_dir, f"{catalog}_contributions.csv")
+        long_table(fit).to_csv(path, index=False)
+        print(f"✅ {catalog.upper()} contributions saved to: {path}")
+    return 0
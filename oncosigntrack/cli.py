@@ -0,0 +1,560 @@
+"""Single command-line entry point for the OncoSignTrack Python toolkit.
+
+Usage: python3 -m oncosigntrack <command> [options]
+
+Only argparse is imported here. Each subcommand names the module that
+implements it, and that module (with its pandas/matplotlib/scipy imports)
+is loaded after argument parsing, so ``--help`` and the light commands
+start in milliseconds. Check start-up cost with
+``python3 benchmarks/importtime.py``.
+"""
+import argparse
+import importlib
+import sys
+
+from oncosigntrack import __version__
+
+
+def _add_filter_options(parser):
+    """Record filters shared by 'filter' and the streaming mode of 'fit'."""
+    parser.add_argument("-f", "--allele-frequency", default=None,
+                        help="Keep records with 0 < AF <= threshold in any sample")
+    parser.add_argument("--min-af", default=None, help="Raise the lower AF bound: keep min < AF (<= -f) in any sample")
+    parser.add_argument("--min-depth", type=int, default=None,
+                        help="Keep records with at least this many AD reads (ref + alt) in any sample")
+    parser.add_argument("--novel", action="store_true", help="Keep records whose ID is '.' (keep_id_with_dots.sh)")
+    parser.add_argument("--pass-only", action="store_true", help="Keep records with FILTER == PASS")
+    parser.add_argument("--snv-only", action="store_true", help="Keep single-base substitutions only")
+    parser.add_argument("--regions", default=None, help="BED of target regions; keep overlapping records only")
+    parser.add_argument("-b", "--bed-file", default=None, help="BED of common variants to exclude")
+    parser.add_argument("-p", "--panel", default=None,
+                        help="Panel-of-normals index (.npz from 'panel'); drops matching alleles")
+    parser.add_argument("--qc", action="store_true",
+                        help="Also write <name>_qc.csv: records left after each filter, SNV/DBS/indel counts, "
+                             "Ti/Tv, median depth and AF, gathered in the same pass")
+
+
+def _add_filter(subparsers):
+    parser = subparsers.add_parser(
+        "filter", help="Filter VCFs by AD-derived AF and/or a BED of common variants in one pass."
+    )
+    parser.add_argument("vcf", nargs="+", help="Input VCF(s), plain or bgzipped")
+    _add_filter_options(parser)
+    parser.add_argument("--batch-size", type=int, default=4096, help="Records evaluated per NumPy batch")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Output VCF (single input only; default mirrors the shell filters' naming)")
+    parser.set_defaults(module="filtering")
+
+
+def _add_panel(subparsers):
+    parser = subparsers.add_parser(
+        "panel", help="Cohort panel of normals: variants recurrent across samples, as BED and binary index."
+    )
+    parser.add_argument("vcf", nargs="*", help="Cohort VCF(s)")
+    parser.add_argument("--vcf-list", default=None, help="File with one VCF path per line (for large cohorts)")
+    parser.add_argument("-g", "--genome", default=None,
+                        help="Reference FASTA whose .fai lists the contigs (default: VCF ##contig lines)")
+    parser.add_argument("-m", "--min-samples", type=int, default=2, help="Carriers needed to flag a variant")
+    parser.add_argument("--min-fraction", type=float, default=None,
+                        help="Also require this fraction of all samples to carry it")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--partitions", type=int, default=16, help="Hash partitions merged one at a time")
+    parser.add_argument("--max-keys", type=int, default=4_000_000,
+                        help="Variant keys a worker buffers before spilling to disk")
+    parser.add_argument("--scratch", default=None, help="Directory for spill files (default: system temp)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Output prefix for .npz and .bed (default: panel_of_normals next to the first VCF)")
+    parser.set_defaults(module="panel")
+
+
+def _add_catalogs(subparsers):
+    parser = subparsers.add_parser(
+        "catalogs", help="SBS96, DBS78 and ID83 matrices in one pass, fitted to their references together."
+    )
+    parser.add_argument("vcf", nargs="+", help="Input VCF(s); every sample column becomes a matrix column")
+    parser.add_argument("-g", "--genome", required=True, help="Reference FASTA with a .fai index")
+    parser.add_argument("-f", "--allele-frequency", default=None,
+                        help="Count a variant for a sample only if its AD-derived AF is in (0, threshold]")
+    parser.add_argument("--sbs-signatures", default=None, help="SBS96 reference (e.g. COSMIC_v3.4_SBS_GRCh38.txt)")
+    parser.add_argument("--dbs-signatures", default=None, help="DBS78 reference (e.g. COSMIC_v3.4_DBS_GRCh38.txt)")
+    parser.add_argument("--id-signatures", default=None, help="ID83 reference (e.g. COSMIC_v3.4_ID_GRCh37.txt)")
+    parser.add_argument("--batch-size", type=int, default=4096, help="Records classified per NumPy batch")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: next to the first VCF)")
+    parser.set_defaults(module="catalogs")
+
+
+def _add_strict_options(parser):
+    """Backward-elimination refitting shared by 'fit' and 'refit'."""
+    parser.add_argument("--strict", action="store_true",
+                        help="Drop signatures while the reconstruction cosine falls by at most --max-delta")
+    parser.add_argument("--max-delta", type=float, default=0.004,
+                        help="Largest cosine drop allowed per removed signature (default: 0.004)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Worker processes for --strict (default: all cores)")
+
+
+def _add_fit(subparsers):
+    parser = subparsers.add_parser(
+        "fit", help="Count SBS96 contexts and fit them to reference signatures (NNLS)."
+    )
+    parser.add_argument("vcf", nargs="+", help="Input VCF(s)")
+    parser.add_argument("-g", "--genome", required=True, help="Reference FASTA with a .fai index")
+    parser.add_argument("-s", "--signatures", required=True,
+                        help="Reference signature matrix, channels as rows (e.g. COSMIC_v3.4_SBS_GRCh38.txt)")
+    _add_filter_options(parser)
+    parser.add_argument("--write-filtered", action="store_true",
+                        help="Also write the filtered VCF (named as 'filter' would name it)")
+    parser.add_argument("--min-snvs", type=int, default=None,
+                        help="Flag samples with fewer SBS96 SNVs than this and do not fit them")
+    parser.add_argument("--af-bins", default=None,
+                        help="AF bin edges, e.g. 0,0.1,0.25,0.5,1: count and fit every sample per AD-derived "
+                             "AF bin (low, high] in one pass")
+    parser.add_argument("-o", "--output", default=None,
+                        help="With --af-bins, the sample x bin x signature table "
+                             "(default: af_bins_mutational_signatures.csv next to the first VCF)")
+    _add_strict_options(parser)
+    parser.add_argument("--batch-size", type=int, default=4096, help="Records filtered and counted per NumPy batch")
+    parser.set_defaults(module="fitting")
+
+
+def _add_count(subparsers):
+    parser = subparsers.add_parser(
+        "count", help="SBS96 x sample count matrix of (multi-sample) VCFs, read in one pass."
+    )
+    parser.add_argument("vcf", nargs="+", help="Input VCF(s); every sample column becomes a matrix column")
+    parser.add_argument("-g", "--genome", required=True, help="Reference FASTA with a .fai index")
+    parser.add_argument("-f", "--allele-frequency", default=None,
+                        help="Count a variant for a sample only if its AD-derived AF is in (0, threshold]")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Matrix path (default: sbs96_counts.txt next to the first VCF)")
+    parser.add_argument("--batch-size", type=int, default=4096, help="Records classified per NumPy batch")
+    parser.set_defaults(module="counting")
+
+
+def _add_refit(subparsers):
+    parser = subparsers.add_parser(
+        "refit", help="Refit stored count matrices to one or more reference signature sets."
+    )
+    parser.add_argument("matrix", nargs="+",
+                        help="Count matrices (.txt, .npz or .parquet from 'count', 'fit' or the R stage)")
+    parser.add_argument("-s", "--signatures", action="append", required=True,
+                        help="Reference signature matrix; repeat to fit several sets in one run")
+    parser.add_argument("--include", default=None, help="Only fit these signatures, e.g. 'SBS1,SBS5,SBS40'")
+    parser.add_argument("--exclude", default=None, help="Signatures to leave out, e.g. '5,40' or 'SBS5,SBS40'")
+    parser.add_argument("--per-sample", action="store_true",
+                        help="Also write <sample>_mutational_signatures.csv per sample and reference set")
+    parser.add_argument("--keep-float", action="store_true", help="Keep fractional values in the grouped tables")
+    _add_strict_options(parser)
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: next to the first matrix)")
+    parser.set_defaults(module="refit")
+
+
+def _add_extract(subparsers):
+    parser = subparsers.add_parser(
+        "extract", help="De novo signature extraction (NMF, parallel restarts over a range of ranks)."
+    )
+    parser.add_argument("matrix", help="Channels x samples count matrix (.txt, .npz or .parquet, e.g. from 'count')")
+    parser.add_argument("-k", "--ranks", default="2-10", help="Ranks to try, e.g. '2-10' or '3,5,8'")
+    parser.add_argument("-r", "--restarts", type=int, default=20, help="Random restarts per rank")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--max-iter", type=int, default=10000, help="Maximum iterations per restart")
+    parser.add_argument("--tol", type=float, default=1e-6, help="Relative divergence change that stops a restart")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("-s", "--signatures", default=None,
+                        help="Reference signatures (e.g. COSMIC) to match the extracted ones to")
+    parser.add_argument("--min-stability", type=float, default=0.8,
+                        help="Stability every signature needs at the suggested rank")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: next to the matrix)")
+    parser.set_defaults(module="extraction")
+
+
+def _add_aggregate(subparsers):
+    parser = subparsers.add_parser(
+        "aggregate", help="Merge per-sample contribution CSVs into all.csv and a grouped table."
+    )
+    parser.add_argument("directory", help="Directory with *_mutational_signatures.csv files")
+    parser.add_argument("--pattern", default="*_mutational_signatures.csv", help="Glob for per-sample CSVs")
+    parser.add_argument("-o", "--output", default=None, help="Long table (default: <directory>/all.csv)")
+    parser.add_argument("--grouped", default=None, help="Grouped table (default: <directory>/group.csv)")
+    parser.add_argument("--keep-float", action="store_true",
+                        help="Keep float contributions in the grouped table instead of truncating to int")
+    parser.set_defaults(module="aggregate")
+
+
+def _add_heatmap(subparsers):
+    parser = subparsers.add_parser("heatmap", help="Circle heatmap of a signature x sample table.")
+    parser.add_argument("input_file", help="Grouped CSV (signatures as rows, samples as columns)")
+    parser.add_argument("--threshold", type=float, default=0.0, help="Minimum value to include (default: 0)")
+    parser.add_argument("--cell_size", type=float, default=5, help="Circle Size 1-10")
+    parser.add_argument("--sbs", type=str, default=None, help="Signature row to sort samples (columns) by")
+    parser.add_argument("--sep", type=int, default=0,
+                        help="Column index to separate two groups (1-based, 0 = no split)")
+    parser.add_argument("--scheme", type=str, default="plasma", help="Matplotlib colormap name")
+    parser.add_argument("--exclude", type=str, default="", help="Comma-separated SBS names to exclude")
+    parser.add_argument("--log", action="store_true", help="Apply log10(value+1) before plotting")
+    parser.add_argument("--report", type=int, default=0, help="Report the SBS count per sample (0/1)")
+    parser.add_argument("--max-columns", type=int, default=88, help="Maximum samples to draw (0 = all)")
+    parser.add_argument("--stats", default=None,
+                        help="group_stats.csv from 'groupstats'; shows q-values and effect sizes per row")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: next to the input)")
+    parser.set_defaults(module="heatmap")
+
+
+def _add_groupstats(subparsers):
+    parser = subparsers.add_parser(
+        "groupstats", help="Mann-Whitney and permutation tests of every signature between two sample groups."
+    )
+    parser.add_argument("input_file", help="Grouped CSV (signatures as rows, samples as columns)")
+    parser.add_argument("--sep", type=int, default=0,
+                        help="Split after this many columns, as in 'heatmap --sep' (use the same --sbs/--max-columns)")
+    parser.add_argument("--groups", default=None, help="Sample,Group CSV with two groups (first listed = group A)")
+    parser.add_argument("--threshold", type=float, default=0.0, help="Values below this count as 0")
+    parser.add_argument("--sbs", type=str, default=None, help="Signature row the columns are sorted by")
+    parser.add_argument("--exclude", type=str, default="", help="Comma-separated SBS names to exclude")
+    parser.add_argument("--max-columns", type=int, default=0, help="Only use the first N samples (0 = all)")
+    parser.add_argument("-n", "--permutations", type=int, default=10000,
+                        help="Permutation replicates (0 = Mann-Whitney only)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--alpha", type=float, default=0.05, help="q-value cut-off for the summary line")
+    parser.add_argument("-o", "--output", default=None, help="Output CSV (default: group_stats.csv next to the input)")
+    parser.set_defaults(module="groupstats")
+
+
+def _add_boxplot(subparsers):
+    parser = subparsers.add_parser("boxplot", help="Box plot of contributions per signature.")
+    parser.add_argument("input_file", help="File,Signature,Contribution CSV (e.g. all.csv)")
+    parser.add_argument("--name", default="", help="Data set name used in the title and file name")
+    parser.add_argument("--dpi", type=int, default=800, help="Output resolution")
+    parser.add_argument("--fast", action="store_true",
+                        help="Large-cohort mode: boxes from precomputed quantiles, one rasterized point layer")
+    parser.add_argument("--max-points", type=int, default=None,
+                        help="With --fast, overlay about this many points per signature")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: next to the input)")
+    parser.set_defaults(module="boxplot")
+
+
+def _add_sampleplot(subparsers):
+    parser = subparsers.add_parser(
+        "sampleplot", help="Horizontal signature bar plot of every sample, rendered in parallel."
+    )
+    parser.add_argument("input_file", nargs="+",
+                        help="Long tables: File,Signature,Contribution (e.g. all.csv) or MutaGene "
+                             "signature/mutations/mutations_low/mutations_high tables; a directory stands for "
+                             "its *_mutational_signatures.csv files")
+    parser.add_argument("--samples", default=None,
+                        help="Comma-separated subset of samples to draw: sample names (S1) or "
+                             "filtered names (AF_0.3_S1_non_common)")
+    parser.add_argument("--dpi", type=int, default=300, help="Output resolution")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: next to the first input)")
+    parser.set_defaults(module="sampleplot")
+
+
+def _add_stackedbar(subparsers):
+    parser = subparsers.add_parser(
+        "stackedbar", help="100%% stacked bar plots of the cohort, in pages rendered in parallel."
+    )
+    parser.add_argument("input_file", help="File,Signature,Contribution CSV (e.g. all.csv)")
+    parser.add_argument("--top", type=int, default=None,
+                        help="Keep each sample's N largest signatures, rescaled to 100%% and labelled")
+    parser.add_argument("--per-page", type=int, default=50, help="Samples per page")
+    parser.add_argument("--label-min", type=float, default=None,
+                        help="Label segments above this percentage (default: 5 with --top, none otherwise)")
+    parser.add_argument("--pdf", action="store_true", help="Also combine the pages into one multi-page PDF")
+    parser.add_argument("--dpi", type=int, default=300, help="Output resolution")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: next to the input)")
+    parser.set_defaults(module="stackedbar")
+
+
+def _add_kataegis(subparsers):
+    parser = subparsers.add_parser(
+        "kataegis", help="Clustered mutations (kataegis) per VCF with rainfall plots, in parallel."
+    )
+    parser.add_argument("vcf", nargs="+", help="(Filtered) VCFs, one sample each")
+    parser.add_argument("--min-mutations", type=int, default=6, help="SNVs in a cluster (default: 6)")
+    parser.add_argument("--max-distance", type=float, default=1000,
+                        help="Largest mean inter-mutation distance in a cluster, bp (default: 1000)")
+    parser.add_argument("--no-plots", action="store_true", help="Skip the rainfall plots")
+    parser.add_argument("--dpi", type=int, default=300, help="Rainfall plot resolution")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Cohort summary CSV (default: kataegis_summary.csv next to the first VCF)")
+    parser.set_defaults(module="kataegis")
+
+
+def _add_similarity(subparsers):
+    parser = subparsers.add_parser("similarity", help="Cosine similarity between signatures or samples.")
+    parser.add_argument("input_file", help="Grouped CSV, or a per-sample CSV with --compare")
+    parser.add_argument("--by", choices=["signatures", "samples"], default="samples",
+                        help="Compare rows (signatures) or columns (samples)")
+    parser.add_argument("--normalize", action="store_true", help="L2-normalize before comparing")
+    parser.add_argument("--annotate", action="store_true", help="Print values in the heatmap cells")
+    parser.add_argument("--pairs", action="store_true", help="Also write all pairwise scores as CSV")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the clustered heatmap")
+    parser.add_argument("--compare", default=None, metavar="CSV",
+                        help="Print the cosine similarity of input_file and this per-sample CSV")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: next to the input)")
+    parser.set_defaults(module="similarity")
+
+
+def _add_consensus(subparsers):
+    parser = subparsers.add_parser(
+        "consensus", help="Bootstrap consensus clustering of samples (Ward on Spearman), in parallel."
+    )
+    parser.add_argument("input_file", help="Grouped CSV or .npz (signatures x samples)")
+    parser.add_argument("-k", "--clusters", default="2,3,4,5", help="Cluster counts to test (default: 2,3,4,5)")
+    parser.add_argument("-r", "--replicates", type=int, default=1000, help="Bootstrap replicates (default: 1000)")
+    parser.add_argument("--resample", choices=["signatures", "samples", "both"], default="both",
+                        help="Bootstrap the signatures, subsample the samples, or both (default)")
+    parser.add_argument("--fraction", type=float, default=0.8,
+                        help="Share of the samples drawn per replicate (default: 0.8)")
+    parser.add_argument("--batch", type=int, default=25, help="Replicates per worker task (default: 25)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--no-plot", action="store_true", help="Skip the consensus heatmaps")
+    parser.add_argument("--output-dir", default=None, help="Output directory (default: next to the input)")
+    parser.set_defaults(module="consensus")
+
+
+def _add_compare(subparsers):
+    parser = subparsers.add_parser(
+        "compare", help="Per-sample before/after and reconstruction cosine similarities in one table."
+    )
+    parser.add_argument("-b", "--before", nargs="+", required=True,
+                        help="Contribution CSVs (per-sample or all.csv) of the reference run")
+    parser.add_argument("-a", "--after", nargs="+", default=None,
+                        help="Contribution CSVs of the run to compare, e.g. filtered_*_mutational_signatures.csv")
+    parser.add_argument("--before-prefix", default="", help="File-name prefix to drop when matching samples")
+    parser.add_argument("--after-prefix", default="filtered_",
+                        help="File-name prefix to drop when matching samples (default: filtered_)")
+    parser.add_argument("--counts", nargs="+", default=None,
+                        help="Observed count matrices of the 'before' run, for reconstruction cosine")
+    parser.add_argument("--after-counts", nargs="+", default=None,
+                        help="Observed count matrices of the 'after' run, for reconstruction cosine")
+    parser.add_argument("-s", "--signatures", default=None, help="Reference signatures the runs were fitted to")
+    parser.add_argument("--decimals", type=int, default=4, help="Rounding of the reported values")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Report path (default: cosine_report.csv next to the first 'before' CSV)")
+    parser.set_defaults(module="comparison")
+
+
+def _add_cohort(subparsers):
+    parser = subparsers.add_parser(
+        "cohort", help="Incrementally add samples to a persisted cohort and re-render changed figures."
+    )
+    actions = parser.add_subparsers(dest="action", metavar="<action>")
+    actions.required = True
+
+    add = actions.add_parser("add", help="Append (or replace) samples from per-sample contribution CSVs.")
+    add.add_argument("directory", help="Cohort directory (seeded from its all.csv on first use)")
+    add.add_argument("csv", nargs="+", help="File,Signature,Contribution CSV(s) of the new samples")
+    add.add_argument("--render", action="store_true", help="Re-render changed figures after adding")
+
+    render = actions.add_parser("render", help="Re-render the figures whose inputs changed.")
+    render.add_argument("directory", help="Cohort directory")
+    render.add_argument("--force", action="store_true", help="Render even if the inputs are unchanged")
+
+    for action in (add, render):
+        action.add_argument("--figures", default="boxplot,heatmap",
+                            help="Comma-separated figures: boxplot, heatmap, similarity")
+        action.add_argument("--name", default="", help="Box plot data set name")
+        action.add_argument("--dpi", type=int, default=800, help="Box plot resolution")
+        action.add_argument("--threshold", type=float, default=0.0, help="Heatmap minimum value")
+        action.add_argument("--sbs", default=None, help="Heatmap: signature row to sort samples by")
+        action.add_argument("--exclude", default="", help="Heatmap: comma-separated SBS names to exclude")
+        action.add_argument("--max-columns", type=int, default=88, help="Heatmap: maximum samples (0 = all)")
+        action.add_argument("--log", action="store_true", help="Heatmap: apply log10(value+1)")
+    add.set_defaults(force=False)
+    parser.set_defaults(module="cohort")
+
+
+def _add_queue(subparsers):
+    parser = subparsers.add_parser(
+        "queue", help="Shared-filesystem work queue: per-sample tasks on many nodes, then one reduce step."
+    )
+    actions = parser.add_subparsers(dest="action", metavar="<action>")
+    actions.required = True
+
+    init = actions.add_parser("init", help="Create a queue with one task per input.")
+    init.add_argument("queue_dir", help="Queue directory on the shared filesystem")
+    init.add_argument("inputs", nargs="+", help="Per-sample inputs (e.g. VCFs)")
+    init.add_argument("-c", "--command", action="append", required=True,
+                      help="Per-sample shell command; {input}, {name} and {dir} are filled in (repeatable)")
+    init.add_argument("-r", "--reduce", action="append", default=[],
+                      help="Command run once after all tasks are done, e.g. aggregation and plots (repeatable)")
+    init.add_argument("--max-attempts", type=int, default=3, help="Attempts per task before it fails")
+
+    worker = actions.add_parser("worker", help="Claim and run tasks until the queue is drained.")
+    worker.add_argument("queue_dir", help="Queue directory")
+    worker.add_argument("--worker-id", default=None,
+                        help="Worker name (default: <host>-<pid>); with -n, the prefix of <id>-<i>")
+    worker.add_argument("-n", "--processes", type=int, default=1, help="Start this many workers on this node")
+    worker.add_argument("--heartbeat", type=float, default=30.0, help="Seconds between heartbeats")
+    worker.add_argument("--poll", type=float, default=10.0, help="Seconds between checks while others run")
+    worker.add_argument("--max-tasks", type=int, default=None,
+                        help="Stop after this many tasks (per worker process with -n)")
+    worker.add_argument("--no-reduce", action="store_true", help="Never run the reduce step")
+
+    status = actions.add_parser("status", help="Task counts and heartbeat age of running tasks.")
+    status.add_argument("queue_dir", help="Queue directory")
+
+    requeue = actions.add_parser("requeue", help="Requeue stale running tasks (or failed ones with --failed).")
+    requeue.add_argument("queue_dir", help="Queue directory")
+    requeue.add_argument("--failed", action="store_true", help="Requeue failed tasks with a fresh attempt budget")
+
+    reducer = actions.add_parser("reduce", help="Run the reduce step now.")
+    reducer.add_argument("queue_dir", help="Queue directory")
+    reducer.add_argument("--force", action="store_true", help="Run even if tasks remain or it already ran")
+
+    for action in (worker, status, requeue):
+        action.add_argument("--timeout", type=float, default=300.0,
+                            help="Seconds without a heartbeat after which a running task is requeued")
+    parser.set_defaults(module="workqueue")
+
+
+def _add_service(subparsers):
+    parser = subparsers.add_parser(
+        "service", help="Warm fitting daemon (localhost HTTP or Unix socket) and its client."
+    )
+    actions = parser.add_subparsers(dest="action", metavar="<action>")
+    actions.required = True
+
+    start = actions.add_parser("start", help="Load the references once and serve fit requests.")
+    start.add_argument("-g", "--genome", required=True, help="Reference FASTA with a .fai index")
+    start.add_argument("-s", "--signatures", required=True, help="Reference signature matrix, channels as rows")
+    start.add_argument("-b", "--bed-file", default=None, help="BED of common variants to exclude")
+    start.add_argument("-p", "--panel", default=None, help="Panel-of-normals index (.npz from 'panel')")
+    start.add_argument("-f", "--allele-frequency", default=None,
+                       help="Default AF threshold: count a variant only if its AF is in (0, threshold]")
+    start.add_argument("--batch-window", type=float, default=0.05,
+                       help="Seconds to wait for more requests before fitting a batch")
+    start.add_argument("--max-batch", type=int, default=32, help="Requests fitted together at most")
+
+    submit = actions.add_parser("submit", help="Send VCFs to a running service and print the JSON results.")
+    submit.add_argument("vcf", nargs="+", help="VCF(s); sent concurrently so they share a batch")
+    submit.add_argument("--upload", action="store_true",
+                        help="Send the file contents instead of the path (service on another filesystem)")
+    submit.add_argument("-f", "--allele-frequency", default=None, help="AF threshold for these requests")
+    submit.add_argument("-o", "--output", default=None, help="Write the JSON here instead of printing it")
+
+    status = actions.add_parser("status", help="Health and counters of a running service.")
+
+    for action in (start, submit, status):
+        action.add_argument("--socket", default=None, help="Unix socket path (instead of TCP)")
+        action.add_argument("--host", default="127.0.0.1", help="Host to bind/connect (default: 127.0.0.1)")
+        action.add_argument("--port", type=int, default=8765, help="TCP port (default: 8765)")
+        action.add_argument("--timeout", type=float, default=600.0, help="Seconds to wait for a result")
+    parser.set_defaults(module="service")
+
+
+def _add_aetiology(subparsers):
+    parser = subparsers.add_parser("aetiology", help="Fetch COSMIC aetiologies for a list of signatures.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("-l", "--list", help="Text file with one signature per line")
+    source.add_argument("-t", "--table", help="File,Signature,Contribution CSV; uses its non-zero signatures")
+    parser.set_defaults(module="aetiology")
+
+
+def _add_profile(subparsers):
+    parser = subparsers.add_parser("profile", help="Measure pipeline stages and summarize run reports.")
+    actions = parser.add_subparsers(dest="action", metavar="<action>")
+    actions.required = True
+
+    run = actions.add_parser("run", help="Run a command and append its timings to a run report.")
+    run.add_argument("--report", required=True, help="JSON-lines run report to append to")
+    run.add_argument("--stage", required=True, help="Stage name (e.g. filter_bed, filter_af, fit, plots)")
+    run.add_argument("--sample", default="", help="Sample the command processes")
+    run.add_argument("--input", action="append", default=[], help="Input file counted in input bytes (repeatable)")
+    run.add_argument("--count-records", default=None, metavar="VCF",
+                     help="Count the records of this VCF after the command finishes")
+    run.add_argument("--py-spy", default=None, metavar="OUT",
+                     help="Record a py-spy flame graph of the command (Python stages)")
+    run.add_argument("command", nargs=argparse.REMAINDER, help="-- command [args...]")
+
+    summary = actions.add_parser("summary", help="Print the per-stage summary of a run report.")
+    summary.add_argument("report", help="JSON-lines run report")
+    summary.add_argument("--json", default=None, help="Write summary and records as JSON")
+    summary.add_argument("--csv", default=None, help="Write per-stage, per-sample records as CSV")
+    parser.set_defaults(module="profiling")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="oncosigntrack",
+        description="OncoSignTrack: mutational signature filtering, fitting and visualization."
+    )
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    parser.add_argument("--profile-report", default=None, metavar="JSONL",
+                        help="Append wall/CPU time, peak RSS, input bytes and records of this command")
+    parser.add_argument("--profile-sample", default="", help="Sample name recorded with --profile-report")
+    parser.add_argument("--cprofile", default=None, metavar="OUT", help="Write a cProfile dump of the command")
+    subparsers = parser.add_subparsers(dest="command", metavar="<command>")
+    subparsers.required = True
+
+    _add_filter(subparsers)
+    _add_panel(subparsers)
+    _add_count(subparsers)
+    _add_catalogs(subparsers)
+    _add_fit(subparsers)
+    _add_refit(subparsers)
+    _add_extract(subparsers)
+    _add_aggregate(subparsers)
+    _add_heatmap(subparsers)
+    _add_groupstats(subparsers)
+    _add_boxplot(subparsers)
+    _add_sampleplot(subparsers)
+    _add_stackedbar(subparsers)
+    _add_kataegis(subparsers)
+    _add_similarity(subparsers)
+    _add_consensus(subparsers)
+    _add_compare(subparsers)
+    _add_cohort(subparsers)
+    _add_queue(subparsers)
+    _add_service(subparsers)
+    _add_aetiology(subparsers)
+    _add_profile(subparsers)
+    return parser
+
+
+def _input_paths(args):
+    """Input files of a subcommand, for the input-bytes column of the run report."""
+    paths = list(getattr(args, "vcf", None) or [])
+    input_file = getattr(args, "input_file", None)
+    if isinstance(input_file, list):  # sampleplot takes several
+        paths.extend(input_file)
+    elif input_file:
+        paths.append(input_file)
+    return paths
+
+
+def _run(args):
+    module = importlib.import_module(f"oncosigntrack.{args.module}")
+    if not args.cprofile:
+        return module.main(args)
+
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(module.main, args)
+    finally:
+        profiler.dump_stats(args.cprofile)
+        print(f"✅ cProfile stats saved to: {args.cprofile}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.profile_report or args.command == "profile":
+        return _run(args)
+
+    from oncosigntrack import profiling
+    with profiling.stage(args.command, args.profile_sample, _input_paths(args), args.profile_report) as record:
+        code = _run(args)
+        # stage() only sees exceptions; an error returned by the subcommand is recorded here
+        record["exit_code"] = code or 0
+        return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""Incremental cohort: append samples to a persisted signature x sample matrix.
+
+A cohort directory holds
+
+    cohort_matrix.npz   float contributions (signatures x samples)
+    cohort_stats.csv    per-signature occurrences, total, mean, median, min, max
+    cohort.json         fingerprints of the figures last rendered
+    all.csv, group.csv  the long and grouped tables the other commands read
+
+Adding a sample only fills its own column and recomputes the statistics of
+the signatures it touches. Figures are re-rendered only when the data they
+draw has changed since the last render.
+"""
+import hashlib
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from oncosigntrack.aggregate import LONG_COLUMNS, read_long_tables
+
+MATRIX_FILE = "cohort_matrix.npz"
+STATS_FILE = "cohort_stats.csv"
+STATE_FILE = "cohort.json"
+STATS_COLUMNS = ["Occurrences", "Total", "Mean", "Median", "Min", "Max"]
+FIGURES = ["boxplot", "heatmap", "similarity"]
+
+
+def _replace(path, write):
+    """Writes through a temporary file so an interrupted update never leaves half a table."""
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def fingerprint(*parts):
+    """Short digest of DataFrames, arrays and plain values."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            digest.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+            digest.update("\t".join(map(str, part.columns)).encode())
+        elif isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+class Cohort:
+    """Signature x sample contribution matrix with per-signature statistics."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.signatures = []
+        self.samples = []
+        self.values = np.zeros((0, 0))
+        self.stats = pd.DataFrame(columns=STATS_COLUMNS, dtype=float)
+        self.figures = {}
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    @classmethod
+    def load(cls, directory):
+        """Opens a cohort directory, seeding it from an existing all.csv if it has no matrix yet."""
+        cohort = cls(directory)
+        if os.path.exists(cohort.path(MATRIX_FILE)):
+            with np.load(cohort.path(MATRIX_FILE)) as stored:
+                cohort.values = stored["values"]
+                cohort.signatures = stored["signatures"].tolist()
+                cohort.samples = stored["samples"].tolist()
+            cohort.stats = pd.read_csv(cohort.path(STATS_FILE), index_col=0)
+            if os.path.exists(cohort.path(STATE_FILE)):
+                with open(cohort.path(STATE_FILE), "r") as handle:
+                    cohort.figures = json.load(handle).get("figures", {})
+        elif os.path.exists(cohort.path("all.csv")):
+            print(f"ℹ️ Seeding cohort from {cohort.path('all.csv')}")
+            cohort.add(read_long_tables([cohort.path("all.csv")]))
+        return cohort
+
+    def _signature_rows(self, names):
+        """Row indices of the given signatures, adding zero rows for unseen ones."""
+        index = {name: i for i, name in enumerate(self.signatures)}
+        new = [name for name in names if name not in index]
+        if new:
+            self.values = np.vstack([self.values.reshape(len(self.signatures), len(self.samples)),
+                                     np.zeros((len(new), len(self.samples)))])
+            for name in new:
+                index[name] = len(self.signatures)
+                self.signatures.append(name)
+        return np.array([index[name] for name in names], dtype=int)
+
+    def add(self, data):
+        """Adds (or replaces) the samples of a long File,Signature,Contribution table.
+
+        Returns (added samples, replaced samples).
+        """
+        table = data.pivot_table(index="Signature", columns="File", values="Contribution",
+                                 aggfunc="last", fill_value=0).astype(float)
+        rows = self._signature_rows(list(table.index))
+        sample_index = {name: j for j, name in enumerate(self.samples)}
+        added = [name for name in table.columns if name not in sample_index]
+        replaced = [name for name in table.columns if name in sample_index]
+
+        touched = set(rows[(table.to_numpy() > 0).any(axis=1)].tolist())
+        if replaced:
+            columns = [sample_index[name] for name in replaced]
+            touched.update(np.nonzero((self.values[:, columns] > 0).any(axis=1))[0].tolist())
+            self.values[:, columns] = 0
+            self.values[np.ix_(rows, columns)] = table[replaced].to_numpy()
+        if added:
+            block = np.zeros((len(self.signatures), len(added)))
+            block[rows] = table[added].to_numpy()
+            self.values = np.hstack([self.values, block])
+            self.samples.extend(added)
+
+        self.update_stats(sorted(touched))
+        return added, replaced
+
+    def update_stats(self, rows):
+        """Recomputes the statistics of the given signature rows over their non-zero samples."""
+        if not rows:
+            return
+        block = self.values[rows]
+        present = block > 0
+        occurrences = present.sum(axis=1)
+        total = np.where(present, block, 0).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows of absent signatures
+            mean = np.where(occurrences > 0, total / occurrences, 0.0)
+            median = np.nan_to_num(np.nanmedian(np.where(present, block, np.nan), axis=1))
+        minimum = np.where(occurrences > 0, np.where(present, block, np.inf).min(axis=1), 0.0)
+        maximum = block.max(axis=1, initial=0.0)
+
+        updates = pd.DataFrame(
+            np.column_stack([occurrences, total, mean, median, minimum, maximum]),
+            index=[self.signatures[i] for i in rows], columns=STATS_COLUMNS
+        )
+        stats = pd.concat([self.stats.drop(updates.index, errors="ignore"), updates])
+        stats["Occurrences"] = stats["Occurrences"].astype(int)
+        self.stats = stats[stats["Occurrences"] > 0].sort_index()
+
+    def grouped(self, as_int=True):
+        """group.csv layout: signatures with any contribution as rows, samples sorted."""
+        table = pd.DataFrame(self.values, index=self.signatures, columns=self.samples)
+        table = table.loc[(table > 0).any(axis=1)].sort_index().sort_index(axis=1)
+        return table.astype(int) if as_int else table
+
+    def long_table(self):
+        """all.csv layout: one row per non-zero contribution."""
+        rows, cols = np.nonzero(self.values.T > 0)
+        return pd.DataFrame({
+            LONG_COLUMNS[0]: np.asarray(self.samples, dtype=object)[rows],
+            LONG_COLUMNS[1]: np.asarray(self.signatures, dtype=object)[cols],
+            LONG_COLUMNS[2]: self.values.T[rows, cols],
+        })
+
+    def save(self, appended=None):
+        """Persists the matrix, statistics and tables.
+
+        `appended` is the long table of newly added samples; when given (and no
+        sample was replaced) it is appended to all.csv instead of rewriting it.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        _replace(self.path(MATRIX_FILE), self._write_matrix)
+        _replace(self.path(STATS_FILE), lambda p: self.stats.to_csv(p, index_label="Signature"))
+        _replace(self.path(STATE_FILE), self._write_state)
+        _replace(self.path("group.csv"), lambda p: self.grouped().to_csv(p, index_label="Signature"))
+
+        all_csv = self.path("all.csv")
+        if appended is not None and os.path.exists(all_csv):
+            appended[LONG_COLUMNS].to_csv(all_csv, mode="a", header=False, index=False)
+        else:
+            _replace(all_csv, lambda p: self.long_table().to_csv(p, index=False))
+
+    def _write_matrix(self, path):
+        with open(path, "wb") as handle:
+            np.savez(handle, values=self.values, signatures=np.asarray(self.signatures, dtype=str),
+                     samples=np.asarray(self.samples, dtype=str))
+
+    def _write_state(self, path):
+        with open(path, "w") as handle:
+            json.dump({"samples": len(self.samples), "signatures": len(self.signatures),
+                       "figures": self.figures}, handle, indent=2)
+
+    def render(self, figures, force=False, options=None):
+        """Re-renders the requested figures whose inputs changed; returns the rendered names."""
+        options = options or {}
+        rendered = []
+        for name in figures:
+            inputs = getattr(self, f"_{name}_inputs")(options)
+            if inputs is None:
+                print(f"⚠️ Nothing to draw for {name}.")
+                continue
+            key = fingerprint(*inputs)
+            if not force and self.figures.get(name) == key:
+                print(f"ℹ️ {name} is up to date.")
+                continue
+            getattr(self, f"_draw_{name}")(inputs[0], options)
+            self.figures[name] = key
+            rendered.append(name)
+        _replace(self.path(STATE_FILE), self._write_state)
+        return rendered
+
+    # --- Figure inputs and renderers ---
+
+    def _boxplot_inputs(self, options):
+        data = self.long_table()
+        if data.empty:
+            return None
+        return data, options.get("name", ""), options.get("dpi", 800)
+
+    def _draw_boxplot(self, data, options):
+        from oncosigntrack.boxplot import plot_box
+        order = self.stats.sort_values("Mean", ascending=False).index
+        plot_box(data, self.directory, options.get("name", ""), options.get("dpi", 800), order=order)
+
+    def _heatmap_inputs(self, options):
+        from oncosigntrack.heatmap import prepare_table
+        keys = ("threshold", "sbs", "exclude", "max_columns", "log")
+        settings = {key: options.get(key) for key in keys}
+        table = prepare_table(self.grouped(), settings["threshold"] or 0.0, settings["sbs"],
+                              settings["exclude"] or "", settings["max_columns"], bool(settings["log"]))
+        if not table.occurrences().any():
+            return None
+        return table.to_frame(), settings
+
+    def _draw_heatmap(self, table, options):
+        from oncosigntrack.heatmap import plot_circle_heatmap
+        # scaled to the drawn cells: the persisted Min/Max also cover truncated and undrawn values
+        plot_circle_heatmap(table, self.directory, log=bool(options.get("log")))
+
+    def _similarity_inputs(self, options):
+        table = self.grouped()
+        if table.shape[1] < 2:
+            return None
+        return (table,)
+
+    def _draw_similarity(self, table, options):
+        from oncosigntrack.similarity import cosine_similarity, plot_clustered_heatmap
+        data = table.T
+        similarity = pd.DataFrame(cosine_similarity(data), index=data.index, columns=data.index)
+        plot_clustered_heatmap(similarity, self.path("clustered_cosine_similarity_heatmap_samples.png"))
+
+
+def _render_options(args):
+    return {
+        "name": args.name, "dpi": args.dpi, "threshold": args.threshold, "sbs": args.sbs,
+        "exclude": args.exclude, "max_columns": args.max_columns, "log": args.log,
+    }
+
+
+def _figures(args):
+    figures = [name.strip() for name in args.figures.split(",") if name.strip()]
+    unknown = [name for name in figures if name not in FIGURES]
+    if unknown:
+        raise ValueError(f"unknown figure(s) {unknown}; choose from {', '.join(FIGURES)}")
+    return figures
+
+
+def main(args):
+    try:
+        figures = _figures(args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    cohort = Cohort.load(args.directory)
+    if args.action == "add":
+        data = read_long_tables(args.csv)
+        if data.empty:
+            print("No contributions to add.")
+            return 1
+        added, replaced = cohort.add(data)
+        cohort.save(appended=data if not replaced else None)
+        print(f"✅ Cohort updated: +{len(added)} sample(s), {len(replaced)} replaced, "
+              f"{len(cohort.samples)} in total ({args.directory})")
+        if not args.render:
+            return 0
+    elif not cohort.samples:
+        print(f"❌ No cohort found in {args.directory}")
+        return 1
+
+    rendered = cohort.render(figures, args.force, _render_options(args))
+    print(f"✅ Rendered: {', '.join(rendered) if rendered else 'nothing (all figures up to date)'}")
+    return 0
@@ -0,0 +1,227 @@
+"""Bootstrap consensus clustering of samples (sample_clustering_spearman.py).
+
+Every replicate resamples the signatures (bootstrap) and/or subsamples the
+samples, then clusters the drawn samples as the original script does: Ward
+linkage on 1 - Spearman correlation, cut into k clusters for each requested
+k. Replicates run in batches on a process pool. A batch's assignments become
+one-hot sample x cluster matrices, so its co-sampling and co-clustering counts
+are one matrix product each, summed into compact integer matrices. The
+consensus of two samples is co-clustered / co-sampled. Reported per k: the
+consensus clusters, each cluster's stability (mean within-cluster consensus),
+every sample's item consensus, the PAC score and a consensus heatmap.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# samples x signatures values shared with the pool workers
+_values = None
+
+# Consensus values between these bounds count as ambiguous for PAC
+PAC_BOUNDS = (0.1, 0.9)
+
+
+def _init_worker(values):
+    global _values
+    _values = values
+
+
+def spearman(values):
+    """Spearman correlation between the rows of a samples x features matrix (0 for constant rows)."""
+    from scipy.stats import rankdata
+
+    ranks = rankdata(values, axis=1)
+    ranks -= ranks.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(ranks, axis=1, keepdims=True)
+    ranks = np.divide(ranks, norms, out=np.zeros_like(ranks), where=norms > 0)
+    return ranks @ ranks.T
+
+
+def ward_clusters(values, ks):
+    """0-based cluster labels of the rows for every k: Ward linkage on 1 - Spearman, as the original script."""
+    from scipy.cluster.hierarchy import fcluster, linkage
+    from scipy.spatial.distance import squareform
+
+    distance = np.clip(1.0 - spearman(values), 0.0, None)
+    np.fill_diagonal(distance, 0.0)
+    tree = linkage(squareform(distance, checks=False), method="ward")
+    return [fcluster(tree, k, criterion="maxclust") - 1 for k in ks]
+
+
+def _consensus_chunk(task):
+    """Co-sampling and per-k co-clustering counts of one batch of replicates."""
+    seed, replicates, ks, resample, fraction = task
+    rng = np.random.default_rng(seed)
+    n, m = _values.shape
+    drawn = max(int(round(fraction * n)), max(ks)) if resample in ("samples", "both") else n
+    sampled = np.zeros((n, replicates), dtype=np.float32)
+    members = [np.zeros((n, replicates * k), dtype=np.float32) for k in ks]
+    for r in range(replicates):
+        rows = np.sort(rng.choice(n, size=drawn, replace=False)) if drawn < n else np.arange(n)
+        columns = rng.integers(0, m, m) if resample in ("signatures", "both") else np.arange(m)
+        sampled[rows, r] = 1
+        for k, labels, one_hot in zip(ks, ward_clusters(_values[np.ix_(rows, columns)], ks), members):
+            one_hot[rows, r * k + labels] = 1
+    # exact in float32 below 2**24 replicates
+    return (np.rint(sampled @ sampled.T).astype(np.uint32),
+            [np.rint(one_hot @ one_hot.T).astype(np.uint32) for one_hot in members])
+
+
+def consensus_counts(values, ks, replicates=1000, resample="both", fraction=0.8, jobs=None, seed=0, batch=25):
+    """(co-sampled, {k: co-clustered}) integer n x n count matrices over all replicates."""
+    values = np.ascontiguousarray(values, dtype=float)
+    n = len(values)
+    dtype = np.uint16 if replicates < 2 ** 16 else np.uint32
+    sizes = [min(batch, replicates - start) for start in range(0, replicates, batch)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(seeds[i], size, list(ks), resample, fraction) for i, size in enumerate(sizes)]
+
+    cosampled = np.zeros((n, n), dtype=dtype)
+    coclustered = {k: np.zeros((n, n), dtype=dtype) for k in ks}
+
+    def accumulate(results):
+        for sampled, clustered in results:
+            cosampled[...] += sampled.astype(dtype)
+            for k, counts in zip(ks, clustered):
+                coclustered[k] += counts.astype(dtype)
+
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs == 1:
+        _init_worker(values)
+        accumulate(map(_consensus_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(values,)) as pool:
+            accumulate(pool.map(_consensus_chunk, tasks))
+    return cosampled, coclustered
+
+
+def consensus_matrix(cosampled, coclustered):
+    """Fraction of the replicates drawing both samples in which they share a cluster."""
+    consensus = np.divide(coclustered, cosampled, out=np.zeros(cosampled.shape, dtype=np.float32),
+                          where=cosampled > 0, dtype=np.float32)
+    np.fill_diagonal(consensus, 1.0)
+    return consensus
+
+
+def consensus_clusters(consensus, k):
+    """(0-based labels, leaf order) of average linkage on 1 - consensus, cut into at most k clusters."""
+    from scipy.cluster.hierarchy import fcluster, leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    tree = linkage(squareform(1.0 - consensus, checks=False), method="average")
+    return fcluster(tree, k, criterion="maxclust") - 1, leaves_list(tree)
+
+
+def stability(consensus, labels):
+    """(per-cluster mean within-cluster consensus, per-sample item consensus); NaN for singletons."""
+    n_clusters = labels.max() + 1
+    one_hot = np.eye(n_clusters, dtype=np.float32)[labels]
+    sizes = one_hot.sum(axis=0)
+    # row sums of consensus within the own cluster, without the diagonal 1
+    within = (consensus @ one_hot)[np.arange(len(labels)), labels] - 1.0
+    # singletons have no pairs: NaN
+    with np.errstate(invalid="ignore", divide="ignore"):
+        clusters = np.bincount(labels, weights=within, minlength=n_clusters) / (sizes * (sizes - 1))
+        items = within / (sizes[labels] - 1)
+    return clusters, items
+
+
+def pac(consensus, bounds=PAC_BOUNDS):
+    """Proportion of ambiguous clustering: share of sample pairs with a consensus inside `bounds`."""
+    upper = consensus[np.triu_indices(len(consensus), k=1)]
+    return float(((upper > bounds[0]) & (upper < bounds[1])).mean()) if len(upper) else 0.0
+
+
+def plot_consensus(consensus, labels, order, samples, filename):
+    """Consensus heatmap in consensus-tree order with a cluster colour strip."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    n = len(samples)
+    size = 8 if n <= 60 else 14
+    fig, (strip, ax) = plt.subplots(2, 1, figsize=(size, size + 0.4), height_ratios=[0.03, 1],
+                                    sharex=True, gridspec_kw={"hspace": 0.01})
+    strip.imshow(labels[order][None, :], aspect="auto", cmap="tab10", vmin=0, vmax=9, interpolation="nearest")
+    strip.set_yticks([])
+    image = ax.imshow(consensus[np.ix_(order, order)], cmap="Blues", vmin=0, vmax=1, aspect="auto",
+                      interpolation="nearest", rasterized=True)
+    if n <= 100:
+        ax.set_xticks(range(n), np.asarray(samples)[order], rotation=90, fontsize=7)
+        ax.set_yticks(range(n), np.asarray(samples)[order], fontsize=7)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+    fig.colorbar(image, ax=[strip, ax], fraction=0.03, pad=0.02, label="Consensus")
+    strip.set_title(f"Consensus clustering, k = {labels.max() + 1}")
+    fig.savefig(filename, dpi=300, bbox_inches="tight")
+    plt.close(fig)
+    print(f"✅ Consensus heatmap saved as {filename}")
+
+
+def parse_ks(value):
+    ks = sorted({int(k) for k in str(value).split(",")})
+    if not ks or ks[0] < 2:
+        raise ValueError("cluster counts must be integers of at least 2, e.g. 2,3,4")
+    return ks
+
+
+def main(args):
+    from oncosigntrack.sparse import read_table
+
+    try:
+        ks = parse_ks(args.clusters)
+        frame = read_table(args.input_file).to_frame().T  # samples as rows
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    samples = frame.index.astype(str).to_numpy()
+    if len(samples) <= max(ks):
+        print(f"Error: {len(samples)} samples cannot form {max(ks)} clusters.")
+        return 1
+    if not 0.0 < args.fraction <= 1.0:
+        print("Error: --fraction must be in (0, 1].")
+        return 1
+
+    print(f"ℹ️ {len(samples)} samples x {frame.shape[1]} signatures, {args.replicates} replicates "
+          f"(resampling {args.resample}), k = {', '.join(map(str, ks))}")
+    cosampled, coclustered = consensus_counts(frame.to_numpy(), ks, args.replicates, args.resample, args.fraction,
+                                              args.jobs, args.seed, args.batch)
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.input_file))
+    os.makedirs(output_dir, exist_ok=True)
+    counts_file = os.path.join(output_dir, "consensus_counts.npz")
+    with open(counts_file, "wb") as handle:
+        np.savez_compressed(handle, samples=samples, cosampled=cosampled,
+                            **{f"coclustered_k{k}": counts for k, counts in coclustered.items()})
+
+    cluster_rows, stability_rows = [], []
+    for k in ks:
+        consensus = consensus_matrix(cosampled, coclustered[k])
+        labels, order = consensus_clusters(consensus, k)
+        cluster_stability, item_consensus = stability(consensus, labels)
+        score = pac(consensus)
+        cluster_rows.append(pd.DataFrame({"Sample": samples, "K": k, "Cluster": labels + 1,
+                                          "Item_Consensus": np.round(item_consensus, 4)}))
+        # tied consensus distances (duplicate samples, perfectly separated groups) can give fewer than k
+        found = labels.max() + 1
+        if found < k:
+            print(f"⚠️ k = {k}: the consensus tree splits into only {found} distinct cluster(s)")
+        stability_rows.append(pd.DataFrame({"K": k, "Cluster": np.arange(1, found + 1),
+                                            "Size": np.bincount(labels, minlength=found),
+                                            "Stability": np.round(cluster_stability, 4), "PAC": round(score, 4)}))
+        print(f"ℹ️ k = {k}: PAC {score:.3f}, cluster stability "
+              f"{', '.join(f'{s:.2f}' for s in cluster_stability)}")
+        if not args.no_plot:
+            plot_consensus(consensus, labels, order, samples,
+                           os.path.join(output_dir, f"consensus_heatmap_k{k}.png"))
+
+    clusters_file = os.path.join(output_dir, "consensus_clusters.csv")
+    pd.concat(cluster_rows, ignore_index=True).to_csv(clusters_file, index=False)
+    stability_file = os.path.join(output_dir, "consensus_stability.csv")
+    pd.concat(stability_rows, ignore_index=True).to_csv(stability_file, index=False)
+    print(f"✅ Consensus clusters saved to: {clusters_file}")
+    print(f"✅ Cluster stability saved to: {stability_file} (co-assignment counts: {counts_file})")
+    return 0
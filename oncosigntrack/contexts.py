@@ -0,0 +1,154 @@
+"""Context classification of VCF records: SBS96, DBS78 and ID83.
+
+SBS96 channel order and labels follow MutationalPatterns' ``mut_matrix``:
+substitution type, then 5' base, then 3' base, e.g. ``A[C>A]A``. DBS78 and
+ID83 channels use the COSMIC labels (``AC>CA``, ``1:Del:C:0``) so the
+COSMIC reference tables can be used as they are.
+"""
+from oncosigntrack.vcf import ALT, CHROM, POS, REF, VcfReader
+
+SUBSTITUTIONS = ("C>A", "C>G", "C>T", "T>A", "T>C", "T>G")
+BASES = "ACGT"
+SBS96_CHANNELS = [f"{left}[{sub}]{right}" for sub in SUBSTITUTIONS for left in BASES for right in BASES]
+
+_COMPLEMENT = str.maketrans("ACGT", "TGCA")
+
+
+def _build_lookup():
+    """Maps 'trinucleotide>alt' on either strand to its pyrimidine-based channel index."""
+    lookup = {}
+    for index, label in enumerate(SBS96_CHANNELS):
+        left, ref, alt, right = label[0], label[2], label[4], label[6]
+        lookup[f"{left}{ref}{right}>{alt}"] = index
+        reverse = f"{left}{ref}{right}"[::-1].translate(_COMPLEMENT)
+        lookup[f"{reverse}>{alt.translate(_COMPLEMENT)}"] = index
+    return lookup
+
+
+SBS96_LOOKUP = _build_lookup()
+
+
+# COSMIC DBS78: 10 strand-collapsed reference dinucleotides and their alternatives
+DBS78_CHANNELS = [f"{ref}>{alt}" for ref, alts in (
+    ("AC", "CA CG CT GA GG GT TA TG TT"),
+    ("AT", "CA CC CG GA GC TA"),
+    ("CC", "AA AG AT GA GG GT TA TG TT"),
+    ("CG", "AT GC GT TA TC TT"),
+    ("CT", "AA AC AG GA GC GG TA TC TG"),
+    ("GC", "AA AG AT CA CG TA"),
+    ("TA", "AT CG CT GC GG GT"),
+    ("TC", "AA AG AT CA CG CT GA GG GT"),
+    ("TG", "AA AC AT CA CC CT GA GC GT"),
+    ("TT", "AA AC AG CA CC CG GA GC GG"),
+) for alt in alts.split()]
+
+# COSMIC ID83: 1 bp indels by base and homopolymer length, longer indels by
+# length and repeat count, and deletions with microhomology
+ID83_CHANNELS = (
+    [f"1:{kind}:{base}:{n}" for kind in ("Del", "Ins") for base in "CT" for n in range(6)]
+    + [f"{length}:{kind}:R:{n}" for kind in ("Del", "Ins") for length in range(2, 6) for n in range(6)]
+    + [f"{length}:Del:M:{mh}" for length in range(2, 6) for mh in range(1, min(length, 5) + 1)
+       if mh < length or length == 5]
+)
+ID83_INDEX = {label: index for index, label in enumerate(ID83_CHANNELS)}
+
+
+def _reverse_complement(sequence):
+    return sequence[::-1].translate(_COMPLEMENT)
+
+
+def _build_dbs_lookup():
+    """Maps 'REFALT' dinucleotide pairs on either strand to their DBS78 channel index."""
+    lookup = {}
+    for index, label in enumerate(DBS78_CHANNELS):
+        ref, alt = label.split(">")
+        lookup[ref + alt] = index
+        lookup[_reverse_complement(ref) + _reverse_complement(alt)] = index
+        if ref == _reverse_complement(ref):
+            # palindromic reference: both alt orientations are the same event
+            lookup[ref + _reverse_complement(alt)] = index
+    return lookup
+
+
+DBS78_LOOKUP = _build_dbs_lookup()
+
+
+def is_snv(fields):
+    """True for biallelic single-base substitutions."""
+    return len(fields[REF]) == 1 and len(fields[ALT]) == 1 and fields[ALT] in BASES
+
+
+def sbs96_index(fasta, chrom, pos, alt):
+    """Channel index of an SNV at 1-based pos, or -1 if the context is unusable."""
+    trinucleotide = fasta.fetch(chrom, pos - 2, pos + 1)
+    return SBS96_LOOKUP.get(f"{trinucleotide}>{alt}", -1)
+
+
+def is_dbs(fields):
+    """True for records that substitute two adjacent bases."""
+    ref, alt = fields[REF], fields[ALT]
+    return len(ref) == 2 and len(alt) == 2 and ref[0] != alt[0] and ref[1] != alt[1]
+
+
+def is_indel(fields):
+    """True for simple anchored insertions and deletions (REF or ALT is the anchor base)."""
+    ref, alt = fields[REF], fields[ALT]
+    return (len(ref) == 1) != (len(alt) == 1) and ref[0] == alt[0] and "," not in alt and alt[0] in BASES
+
+
+def dbs78_index(ref, alt):
+    """Channel index of a doublet substitution, or -1."""
+    return DBS78_LOOKUP.get(ref + alt, -1)
+
+
+def _repeat_units(unit, flank):
+    """Copies of `unit` at the start of `flank`, capped at 5."""
+    count = 0
+    while count < 5 and flank[count * len(unit):(count + 1) * len(unit)] == unit:
+        count += 1
+    return count
+
+
+def id83_index(fasta, chrom, pos, ref, alt):
+    """Channel index of an anchored indel at 1-based pos, or -1.
+
+    Repeats are counted 3' of the indel (VCFs are left-aligned), as in the
+    COSMIC/SigProfiler ID83 classification.
+    """
+    if len(ref) > 1:
+        kind, sequence = "Del", ref[1:]
+        flank_start = pos + len(ref) - 1
+    else:
+        kind, sequence = "Ins", alt[1:]
+        flank_start = pos
+    length = len(sequence)
+    right = fasta.fetch(chrom, flank_start, flank_start + 5 * length)
+
+    if length == 1:
+        base = sequence.translate(_COMPLEMENT) if sequence in "AG" else sequence
+        repeats = _repeat_units(sequence, right)
+        return ID83_INDEX.get(f"1:{kind}:{base}:{repeats}", -1)
+
+    repeats = _repeat_units(sequence, right)
+    if kind == "Del" and repeats == 0:
+        left = fasta.fetch(chrom, pos - length + 1, pos)
+        homology = max(
+            next((k for k in range(length - 1, 0, -1) if sequence[:k] == right[:k]), 0),
+            next((k for k in range(length - 1, 0, -1) if sequence[-k:] == left[-k:]), 0),
+        )
+        if homology:
+            return ID83_INDEX.get(f"{min(length, 5)}:Del:M:{min(homology, 5)}", -1)
+    return ID83_INDEX.get(f"{min(length, 5)}:{kind}:R:{repeats}", -1)
+
+
+def count_sbs96(vcf_path, fasta):
+    """Counts the SNVs of a VCF into the 96 trinucleotide channels."""
+    counts = [0] * len(SBS96_CHANNELS)
+    with VcfReader(vcf_path) as reader:
+        for fields in reader:
+            if not is_snv(fields):
+                continue
+            index = sbs96_index(fasta, fields[CHROM], int(fields[POS]), fields[ALT])
+            if index >= 0:
+                counts[index] += 1
+    return counts
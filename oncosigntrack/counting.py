@@ -0,0 +1,227 @@
+"""SBS96 x sample count matrices from single- or multi-sample VCFs in one pass.
+
+Every SNV record is classified once; the per-sample decision (does this
+column carry the variant, and does its AD-derived AF pass the threshold) is
+made for a batch of records at a time with NumPy over the whole
+record x sample block. A joint-called VCF with hundreds of samples therefore
+needs no per-sample split.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from oncosigntrack import profiling
+from oncosigntrack.contexts import SBS96_CHANNELS, is_snv, sbs96_index
+from oncosigntrack.reference import FastaIndex
+from oncosigntrack.vcf import ALT, CHROM, FORMAT, POS, VcfReader
+
+# Genotypes that do not carry an alt allele
+REF_GENOTYPES = ["0/0", "0|0", "0", ".", "./.", ".|."]
+
+
+def format_values(samples, key_index):
+    """Value at one FORMAT position for every sample column ('.' when absent)."""
+    values = []
+    for sample in samples:
+        parts = sample.split(":", key_index + 1)
+        values.append(parts[key_index] if key_index < len(parts) else ".")
+    return values
+
+
+def ad_allele_frequencies(ad_values):
+    """AD-derived alt AF of an array of 'ref,alt' strings; NaN when unusable.
+
+    Same rule as filter_vcf_by_af.sh: biallelic AD with a non-zero depth.
+    """
+    parts = np.char.partition(np.asarray(ad_values, dtype=str), ",")
+    ref, sep, alt = parts[..., 0], parts[..., 1], parts[..., 2]
+    valid = (sep == ",") & np.char.isdigit(ref) & np.char.isdigit(alt)
+    ref_count = np.where(valid, ref, "0").astype(np.int64)
+    alt_count = np.where(valid, alt, "0").astype(np.int64)
+    depth = ref_count + alt_count
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(valid & (depth > 0), alt_count / depth, np.nan)
+
+
+def af_bin_labels(edges):
+    """'(0,0.1]'-style labels of the AF bins between consecutive edges."""
+    return [f"({low:g},{high:g}]" for low, high in zip(edges[:-1], edges[1:])]
+
+
+class SampleCounter:
+    """Accumulates the channels x N count matrix of one VCF in record batches.
+
+    With `af_threshold` and/or `min_af`, a sample carries a record when its
+    AD-derived AF is in (min_af, af_threshold] (defaults 0 and 1). With
+    `af_bins` (increasing AF edges), a sample counts a record in the bin
+    (edge_k, edge_k+1] holding its AD-derived AF, and every sample has
+    len(af_bins) - 1 adjacent columns, one per bin.
+    """
+
+    def __init__(self, n_samples, af_threshold=None, batch_size=4096, n_channels=len(SBS96_CHANNELS),
+                 af_bins=None, min_af=None):
+        self.af_bins = None if af_bins is None else np.asarray(af_bins, dtype=float)
+        self.n_bins = 1 if af_bins is None else len(af_bins) - 1
+        self.counts = np.zeros((n_channels, max(n_samples, 1) * self.n_bins), dtype=np.int64)
+        self.af_threshold = af_threshold
+        self.min_af = min_af
+        self.batch_size = batch_size
+        self.n_samples = n_samples
+        self.channels = []
+        self.values = []
+
+    def sample_values(self, fields):
+        """FORMAT values (AD with an AF threshold, GT otherwise) that decide carriage per sample."""
+        if not self.n_samples:
+            return []
+        key = "AD" if self.uses_af or self.af_bins is not None else "GT"
+        keys = fields[FORMAT].split(":")
+        return format_values(fields[9:], keys.index(key)) if key in keys else ["."] * self.n_samples
+
+    @property
+    def uses_af(self):
+        return self.af_threshold is not None or self.min_af is not None
+
+    def carried(self, values):
+        """Boolean records x samples matrix of the queued value rows."""
+        if not self.n_samples:
+            return np.ones((len(values), 1), dtype=bool)
+        values = np.asarray(values, dtype=str).reshape(len(values), self.n_samples)
+        if self.uses_af:
+            af = ad_allele_frequencies(values)
+            low = self.min_af if self.min_af is not None else 0.0
+            high = self.af_threshold if self.af_threshold is not None else 1.0
+            return (af > low) & (af <= high)
+        if self.n_samples == 1:
+            # one sample: count every record, as MutationalPatterns does
+            return np.ones(values.shape, dtype=bool)
+        return ~np.isin(values, REF_GENOTYPES)
+
+    def bins(self, values):
+        """Records x samples column of each AF bin hit (-1 outside every bin)."""
+        if not self.n_samples:
+            return np.full((len(values), 1), -1)
+        af = ad_allele_frequencies(np.asarray(values, dtype=str).reshape(len(values), self.n_samples))
+        bins = np.searchsorted(self.af_bins, af, side="left") - 1
+        inside = ~np.isnan(af) & (bins >= 0) & (bins < self.n_bins)
+        return np.where(inside, np.arange(self.n_samples) * self.n_bins + bins, -1)
+
+    def add(self, channel, fields):
+        """Queues one classified record."""
+        self.channels.append(channel)
+        self.values.append(self.sample_values(fields))
+        if len(self.channels) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.channels:
+            return
+        channels = np.asarray(self.channels, dtype=np.int64)
+        if self.af_bins is not None:
+            columns = self.bins(self.values)
+            hit = columns >= 0
+            np.add.at(self.counts, (np.broadcast_to(channels[:, None], columns.shape)[hit], columns[hit]), 1)
+        else:
+            np.add.at(self.counts, channels, self.carried(self.values).astype(np.int64))
+        self.channels.clear()
+        self.values.clear()
+
+
+def count_samples(vcf_path, fasta, af_threshold=None, batch_size=4096, keep=None, predicates=(), tee=None,
+                  af_bins=None, qc=None, min_af=None):
+    """Returns (96 x N counts, sample names, records read) for one VCF.
+
+    `keep`, if given, is called with the fields of every SNV; records it rejects are not counted.
+    `predicates` (see filtering.filter_chain) filter whole batches before counting, and
+    the records they keep are also written to `tee`, an open BgzfWriter, when given.
+    With `af_bins`, the counts have one column per sample and AF bin (see SampleCounter).
+    `qc`, a qc.QcMetrics, gathers QC metrics from the same batches.
+    `min_af` raises the lower AF bound of a sample from 0 (see SampleCounter).
+    """
+    from oncosigntrack.filtering import filtered_batches, write_records
+
+    records = 0
+    with VcfReader(vcf_path) as reader:
+        samples = reader.samples
+        counter = SampleCounter(len(samples), af_threshold, batch_size, af_bins=af_bins, min_af=min_af)
+        if tee is not None:
+            tee.write("".join(reader.header))
+        for read, kept in filtered_batches(reader, predicates, batch_size, qc):
+            records += read
+            if tee is not None:
+                write_records(tee, kept)
+            for fields in kept:
+                if not is_snv(fields) or (keep is not None and not keep(fields)):
+                    continue
+                channel = sbs96_index(fasta, fields[CHROM], int(fields[POS]), fields[ALT])
+                if channel >= 0:
+                    counter.add(channel, fields)
+        counter.flush()
+    names = samples or [os.path.basename(vcf_path)]
+    return counter.counts, names, records
+
+
+def count_matrix(vcf_paths, fasta, af_threshold=None, batch_size=4096):
+    """Counts every sample of every VCF into one channels x samples DataFrame."""
+    blocks, columns = [], []
+    seen = set()
+    for vcf_path in vcf_paths:
+        counts, names, records = count_samples(vcf_path, fasta, af_threshold, batch_size)
+        profiling.add_records(records)
+        base = os.path.basename(vcf_path).split(".vcf")[0]
+        for name in names:
+            # samples repeated across files are told apart by their file name
+            unique = name if name not in seen else f"{base}_{name}"
+            seen.add(unique)
+            columns.append(unique)
+        blocks.append(counts)
+        print(f"Counted {len(names)} sample(s) from {vcf_path} ({records} records)")
+    return pd.DataFrame(np.hstack(blocks), index=SBS96_CHANNELS, columns=columns)
+
+
+def binary_path(path):
+    """The NumPy twin of a matrix file: counts.txt -> counts.npz."""
+    return os.path.splitext(path)[0] + ".npz"
+
+
+def write_matrix(matrix, path, binary=True):
+    """Writes a SigProfiler-style matrix (MutationType column, one column per sample).
+
+    A '.parquet' path is written as Parquet (needs pyarrow). With `binary`, a
+    .npz twin holding the same counts is written next to it for fast loading.
+    """
+    if path.endswith(".parquet"):
+        matrix.rename_axis("MutationType").to_parquet(path)
+    else:
+        matrix.to_csv(path, sep="\t", index_label="MutationType")
+    if binary:
+        with open(binary_path(path), "wb") as handle:
+            np.savez(handle, counts=matrix.to_numpy(), channels=np.asarray(matrix.index, dtype=str),
+                     samples=np.asarray(matrix.columns, dtype=str))
+
+
+def read_matrix(path):
+    """Reads a count matrix from .npz, .parquet or text; a text file's up-to-date .npz twin is preferred."""
+    twin = binary_path(path)
+    if not path.endswith(".npz") and os.path.exists(twin) and os.path.getmtime(twin) >= os.path.getmtime(path):
+        path = twin
+    if path.endswith(".npz"):
+        with np.load(path) as stored:
+            return pd.DataFrame(stored["counts"], index=stored["channels"].tolist(),
+                                columns=stored["samples"].tolist())
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, sep=None, engine="python", index_col=0)
+
+
+def main(args):
+    fasta = FastaIndex(args.genome)
+    af_threshold = float(args.allele_frequency) if args.allele_frequency is not None else None
+    matrix = count_matrix(args.vcf, fasta, af_threshold, args.batch_size)
+    fasta.close()
+
+    output = args.output or os.path.join(os.path.dirname(args.vcf[0]), "sbs96_counts.txt")
+    write_matrix(matrix, output)
+    print(f"✅ {matrix.shape[0]} x {matrix.shape[1]} count matrix saved to: {output}")
+    return 0
@@ -0,0 +1,228 @@
+"""De novo signature extraction by NMF with parallel random restarts.
+
+Factorizes a channels x samples count matrix V ~ W H under the KL divergence
+(Lee & Seung multiplicative updates, the 'brunet' objective behind
+MutationalPatterns' ``extract_signatures``). Every (rank, restart) pair is an
+independent task on a process pool. The restarts of a rank are matched to
+its best run to score stability, and the extracted signatures are matched to
+a reference set (e.g. COSMIC) by cosine similarity.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+from oncosigntrack.contexts import SBS96_CHANNELS
+from oncosigntrack.counting import read_matrix
+from oncosigntrack.similarity import cosine_between
+
+EPS = np.finfo(float).eps
+
+# count matrix shared with the pool workers (set once per worker)
+_matrix = None
+
+
+def parse_ranks(text):
+    """'2-8' or '2,3,5' -> sorted list of ranks."""
+    ranks = set()
+    for part in (p.strip() for p in text.split(",")):
+        if "-" in part:
+            low, high = part.split("-", 1)
+            ranks.update(range(int(low), int(high) + 1))
+        elif part:
+            ranks.add(int(part))
+    if not ranks or min(ranks) < 1:
+        raise ValueError(f"invalid rank range '{text}'")
+    return sorted(ranks)
+
+
+def load_matrix(path):
+    """Reads a channels x samples count matrix (SigProfiler layout), SBS96 rows in canonical order."""
+    matrix = read_matrix(path)
+    if set(SBS96_CHANNELS).issubset(matrix.index):
+        matrix = matrix.loc[SBS96_CHANNELS]
+    return matrix.astype(float)
+
+
+def kl_divergence(V, WH):
+    """Generalized Kullback-Leibler divergence D(V || WH)."""
+    return float(np.sum(V * np.log((V + EPS) / (WH + EPS)) - V + WH))
+
+
+def nmf(V, rank, rng, max_iter=10000, tol=1e-6, check_every=10):
+    """KL multiplicative-update NMF; returns (W, H, divergence, iterations).
+
+    Stops when the divergence improves by less than `tol` (relative) between
+    checks. W columns are normalized to sum to one, H carries the counts.
+    """
+    scale = np.sqrt(V.mean() / rank)
+    W = rng.random((V.shape[0], rank)) * scale + EPS
+    H = rng.random((rank, V.shape[1])) * scale + EPS
+
+    previous = np.inf
+    iteration = 0
+    for iteration in range(1, max_iter + 1):
+        H *= (W.T @ (V / (W @ H + EPS))) / (W.sum(axis=0)[:, None] + EPS)
+        W *= ((V / (W @ H + EPS)) @ H.T) / (H.sum(axis=1)[None, :] + EPS)
+        if iteration % check_every == 0:
+            error = kl_divergence(V, W @ H)
+            if previous - error < tol * error:
+                break
+            previous = error
+
+    totals = W.sum(axis=0)
+    W /= totals
+    H *= totals[:, None]
+    return W, H, kl_divergence(V, W @ H), iteration
+
+
+def _init_worker(matrix):
+    global _matrix
+    _matrix = matrix
+
+
+def _run_restart(task):
+    rank, seed, max_iter, tol = task
+    W, H, error, iterations = nmf(_matrix, rank, np.random.default_rng(seed), max_iter, tol)
+    return rank, W, H, error, iterations
+
+
+def match_restarts(best, others):
+    """Per-signature stability: mean cosine of each best-run signature to its
+    one-to-one (Hungarian) match in every other restart."""
+    if not others:
+        return np.ones(best.shape[1])
+    matched = np.zeros((len(others), best.shape[1]))
+    for i, W in enumerate(others):
+        similarity = cosine_between(best.T, W.T)
+        rows, cols = linear_sum_assignment(-similarity)
+        matched[i, rows] = similarity[rows, cols]
+    return matched.mean(axis=0)
+
+
+def extract(V, ranks, restarts=20, jobs=None, seed=0, max_iter=10000, tol=1e-6):
+    """Runs `restarts` NMF runs for every rank; returns {rank: result dict}."""
+    V = np.asarray(V, dtype=float)
+    seeds = np.random.SeedSequence(seed).spawn(len(ranks) * restarts)
+    tasks = [(rank, seeds[i * restarts + r], max_iter, tol)
+             for i, rank in enumerate(ranks) for r in range(restarts)]
+
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs == 1:
+        _init_worker(V)
+        runs = list(map(_run_restart, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(V,)) as pool:
+            runs = list(pool.map(_run_restart, tasks))
+
+    results = {}
+    for rank in ranks:
+        rank_runs = [run for run in runs if run[0] == rank]
+        errors = np.array([run[3] for run in rank_runs])
+        best = int(errors.argmin())
+        _, W, H, error, _ = rank_runs[best]
+        others = [run[1] for i, run in enumerate(rank_runs) if i != best]
+        results[rank] = {
+            "W": W,
+            "H": H,
+            "error": error,
+            "mean_error": float(errors.mean()),
+            "stability": match_restarts(W, others),
+            "iterations": float(np.mean([run[4] for run in rank_runs])),
+        }
+    return results
+
+
+def summary_table(results):
+    """One row per rank: best and mean divergence, stability and iterations."""
+    return pd.DataFrame([{
+        "Rank": rank,
+        "Best_KL": result["error"],
+        "Mean_KL": result["mean_error"],
+        "Stability": float(result["stability"].mean()),
+        "Min_Stability": float(result["stability"].min()),
+        "Mean_Iterations": result["iterations"],
+    } for rank, result in results.items()])
+
+
+def suggest_rank(summary, min_stability=0.8):
+    """Largest rank whose least stable signature reaches `min_stability` (smallest rank otherwise)."""
+    stable = summary[summary["Min_Stability"] >= min_stability]
+    return int(stable["Rank"].max()) if not stable.empty else int(summary["Rank"].min())
+
+
+def signature_names(rank):
+    """SigProfiler-style names of de novo signatures: SBS96A, SBS96B, ..."""
+    return [f"SBS96{chr(65 + i)}" if i < 26 else f"SBS96_{i + 1}" for i in range(rank)]
+
+
+def match_to_reference(signatures, reference):
+    """Best and second-best reference signature of every extracted signature by cosine."""
+    similarity = cosine_between(signatures.T.values, reference.T.values)
+    order = np.argsort(-similarity, axis=1)
+    columns = np.asarray(reference.columns)
+    rows = np.arange(len(similarity))
+    second = order[:, 1] if similarity.shape[1] > 1 else order[:, 0]
+    return pd.DataFrame({
+        "Signature": signatures.columns,
+        "Best_Match": columns[order[:, 0]],
+        "Cosine": similarity[rows, order[:, 0]],
+        "Second_Match": columns[second],
+        "Second_Cosine": similarity[rows, second],
+    })
+
+
+def main(args):
+    try:
+        ranks = parse_ranks(args.ranks)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    matrix = load_matrix(args.matrix)
+    matrix = matrix.loc[:, matrix.sum(axis=0) > 0]
+    if max(ranks) > min(matrix.shape):
+        print(f"Error: rank {max(ranks)} exceeds the matrix size {matrix.shape}")
+        return 1
+
+    reference = None
+    if args.signatures:
+        from oncosigntrack.fitting import load_signatures
+        try:
+            reference = load_signatures(args.signatures, matrix.index)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return 1
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.matrix))
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Extracting ranks {ranks[0]}-{ranks[-1]} x {args.restarts} restarts "
+          f"from {matrix.shape[0]} x {matrix.shape[1]} counts")
+    results = extract(matrix.values, ranks, args.restarts, args.jobs, args.seed, args.max_iter, args.tol)
+
+    summary = summary_table(results)
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+    summary_path = os.path.join(output_dir, "extraction_summary.csv")
+    summary.to_csv(summary_path, index=False)
+
+    for rank, result in results.items():
+        names = signature_names(rank)
+        signatures = pd.DataFrame(result["W"], index=matrix.index, columns=names)
+        signatures.to_csv(os.path.join(output_dir, f"denovo_k{rank}_signatures.txt"),
+                          sep="\t", index_label="MutationType")
+        exposures = pd.DataFrame(result["H"], index=names, columns=matrix.columns)
+        exposures.to_csv(os.path.join(output_dir, f"denovo_k{rank}_exposures.csv"), index_label="Signature")
+        if reference is not None:
+            match_to_reference(signatures, reference).to_csv(
+                os.path.join(output_dir, f"denovo_k{rank}_reference_matches.csv"), index=False
+            )
+
+    rank = suggest_rank(summary, args.min_stability)
+    print(f"ℹ️ Suggested rank: {rank} (largest with every signature's stability >= {args.min_stability})")
+    if reference is not None:
+        matches = pd.read_csv(os.path.join(output_dir, f"denovo_k{rank}_reference_matches.csv"))
+        print(matches.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"✅ Extraction results saved to: {output_dir}")
+    return 0
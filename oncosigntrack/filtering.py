@@ -0,0 +1,167 @@
+"""Composable VCF filtering in one streaming pass.
+
+Equivalent to running filter_vcf_non_common.sh, filter_vcf_by_af.sh and
+keep_id_with_dots.sh one after another, without the intermediate files in
+between. Records are read in batches and every predicate selected on the
+command line (see predicates.py) is evaluated as a NumPy mask over the batch.
+"""
+import os
+import re
+import sys
+
+from oncosigntrack import profiling
+from oncosigntrack.vcf import BgzfWriter, VcfReader
+
+
+def output_path(input_vcf, af_threshold=None, bed_file=None, other=False):
+    """Builds the output name the shell filters would produce for this combination.
+
+    Other criteria alone (`other`) give filtered_<name>.
+    """
+    directory = os.path.dirname(input_vcf)
+    name = os.path.basename(input_vcf)
+    if bed_file:
+        name = re.sub(r"\.vcf(\.gz)?$", "", name) + "_non_common.vcf.gz"
+    if af_threshold is not None:
+        name = f"AF_{af_threshold}_{name}"
+    elif other and not bed_file:
+        name = f"filtered_{name}"
+    return os.path.join(directory, name)
+
+
+def filter_chain(af_threshold=None, bed=None, panel=None, predicates=()):
+    """Predicates for `predicates` plus the BED (a BedIndex), panel (a PanelIndex) and AF filters."""
+    from oncosigntrack.predicates import AlleleFrequency, NotInPanel, OutsideRegions
+
+    chain = list(predicates)
+    if bed is not None:
+        chain.append(OutsideRegions(bed))
+    if panel is not None:
+        chain.append(NotInPanel(panel))
+    if af_threshold is not None:
+        chain.append(AlleleFrequency(0.0, af_threshold))
+    return chain
+
+
+def filtered_batches(reader, predicates=(), batch_size=4096, qc=None):
+    """Yields (records read, records kept) for every batch of a VcfReader.
+
+    `qc`, a qc.QcMetrics, observes every batch as it is filtered.
+    """
+    rows = []
+    for fields in reader:
+        rows.append(fields)
+        if len(rows) >= batch_size:
+            yield len(rows), _kept(rows, predicates, qc)
+            rows = []
+    if rows:
+        yield len(rows), _kept(rows, predicates, qc)
+
+
+def filter_vcf(input_vcf, output_vcf, af_threshold=None, bed=None, panel=None, predicates=(),
+               batch_size=4096, qc=None):
+    """Streams input_vcf into a bgzipped output_vcf; returns (records_in, records_out).
+
+    `bed` (a BedIndex) and `panel` (a PanelIndex) drop overlapping records and
+    panel-of-normals alleles; `predicates` are further predicates.py filters.
+    """
+    chain = filter_chain(af_threshold, bed, panel, predicates)
+    records_in = records_out = 0
+    with VcfReader(input_vcf) as reader, BgzfWriter(output_vcf) as writer:
+        writer.write("".join(reader.header))
+        for read, kept in filtered_batches(reader, chain, batch_size, qc):
+            write_records(writer, kept)
+            records_in += read
+            records_out += len(kept)
+    return records_in, records_out
+
+
+def keep_mask(rows, predicates, qc=None):
+    """AND of every predicate's mask over a batch of split records."""
+    import numpy as np
+
+    from oncosigntrack.predicates import RecordBatch
+
+    batch = RecordBatch(rows)
+    keep = np.ones(len(rows), dtype=bool)
+    masks = []
+    for predicate in predicates:
+        mask = predicate.mask(batch)
+        keep &= mask
+        masks.append(mask)
+    if qc is not None:
+        qc.observe(batch, masks, keep)
+    return keep
+
+
+def _kept(rows, predicates, qc=None):
+    if not predicates and qc is None:
+        return rows
+    return [rows[i] for i in keep_mask(rows, predicates, qc).nonzero()[0]]
+
+
+def write_records(writer, rows):
+    if rows:
+        writer.write("".join("\t".join(fields) + "\n" for fields in rows))
+
+
+def parse_af_threshold(value):
+    """Validates the AF threshold the same way the shell script does (0 <= AF <= 1)."""
+    if value is None:
+        return None
+    try:
+        threshold = float(value)
+    except ValueError:
+        threshold = -1.0
+    if not 0.0 <= threshold <= 1.0:
+        print("Error: AF_threshold must be a number between 0 and 1.")
+        sys.exit(1)
+    return threshold
+
+
+def parse_af_bins(value):
+    """AF bin edges from '0,0.1,0.25,1': at least two increasing values in [0, 1]."""
+    if value is None:
+        return None
+    try:
+        edges = [float(edge) for edge in value.split(",")]
+    except ValueError:
+        edges = []
+    if len(edges) < 2 or not all(0.0 <= edge <= 1.0 for edge in edges) or any(
+            low >= high for low, high in zip(edges[:-1], edges[1:])):
+        print("Error: AF bins must be at least two increasing numbers between 0 and 1, e.g. 0,0.1,0.25,1.")
+        sys.exit(1)
+    return edges
+
+
+def main(args):
+    from oncosigntrack.predicates import build_predicates
+    from oncosigntrack.qc import QcMetrics, write_row
+
+    parse_af_threshold(args.allele_frequency)
+    parse_af_threshold(args.min_af)
+    try:
+        predicates = build_predicates(args)
+    except ValueError as e:  # e.g. a panel index of an older version
+        print(f"Error: {e}")
+        return 1
+    if not predicates:
+        print("Error: nothing to filter; give at least one filter option (see --help).")
+        return 1
+    if args.output and len(args.vcf) > 1:
+        print("Error: --output can only be used with a single input VCF.")
+        return 1
+    print(f"ℹ️ Filters: {', '.join(p.name for p in predicates)}")
+
+    for input_vcf in args.vcf:
+        output_vcf = args.output if args.output else output_path(
+            input_vcf, args.allele_frequency, args.bed_file or args.panel, other=True
+        )
+        qc = QcMetrics(p.name for p in predicates) if args.qc else None
+        records_in, records_out = filter_vcf(input_vcf, output_vcf, predicates=predicates,
+                                             batch_size=args.batch_size, qc=qc)
+        profiling.add_records(records_in)
+        print(f"Filtered VCF saved as: {output_vcf} ({records_out}/{records_in} records kept)")
+        if qc is not None:
+            print(f"QC saved to: {write_row(qc.row(os.path.basename(output_vcf)), output_vcf)}")
+    return 0
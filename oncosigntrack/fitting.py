@@ -0,0 +1,351 @@
+"""Refitting 96-channel mutation counts to reference (COSMIC) signatures.
+
+The fit is the same non-negative least squares problem that
+MutationalPatterns' ``fit_to_signatures`` solves, so contributions match the
+R stage for the same counts and reference matrix.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import nnls
+
+from oncosigntrack import profiling
+from oncosigntrack.contexts import SBS96_CHANNELS
+from oncosigntrack.counting import count_samples, write_matrix
+from oncosigntrack.reference import FastaIndex
+
+
+def load_signatures(path, channels=SBS96_CHANNELS):
+    """Reads a reference signature table (channels as rows, e.g. COSMIC_v3.x_SBS_GRCh38.txt)."""
+    table = pd.read_csv(path, sep=None, engine="python", index_col=0)
+    missing = [channel for channel in channels if channel not in table.index]
+    if missing:
+        raise ValueError(f"{path} is missing {len(missing)} channels, e.g. {missing[:3]}")
+    return table.loc[list(channels)].astype(float)
+
+
+def fit_to_signatures(counts, signatures):
+    """Solves NNLS per sample; counts is channels x samples, returns signatures x samples."""
+    counts = np.asarray(counts, dtype=float)
+    if counts.ndim == 1:
+        counts = counts[:, None]
+    basis = np.asarray(signatures, dtype=float)
+    contributions = np.zeros((basis.shape[1], counts.shape[1]))
+    for j in range(counts.shape[1]):
+        contributions[:, j], _ = nnls(basis, counts[:, j])
+    return contributions
+
+
+# --- Strict refitting ---
+
+# Gram matrix of the signature basis shared with the pool workers
+_gram = None
+
+
+def nnls_gram(gram, target, x=None, tol=1e-10):
+    """NNLS from the normal equations: argmin ||Bx - y|| with x >= 0, gram = B'B, target = B'y.
+
+    Lawson-Hanson active-set iterations; a feasible start `x` warm-starts the
+    solver with the signatures it already uses.
+    """
+    x = np.zeros(len(target)) if x is None else np.array(x, dtype=float)
+    passive = x > tol
+    x = _solve_passive(gram, target, x, passive, tol)
+    for _ in range(3 * len(target)):
+        gradient = target - gram @ x
+        candidates = ~passive & (gradient > tol)
+        if not candidates.any():
+            break
+        passive[np.argmax(np.where(candidates, gradient, -np.inf))] = True
+        x = _solve_passive(gram, target, x, passive, tol)
+    return x
+
+
+def _solve_passive(gram, target, x, passive, tol):
+    """Least squares on the passive set, stepping back towards x (and shrinking the set) to stay non-negative."""
+    while passive.any():
+        index = np.flatnonzero(passive)
+        solution = np.zeros_like(x)
+        try:
+            solution[index] = np.linalg.solve(gram[np.ix_(index, index)], target[index])
+        except np.linalg.LinAlgError:
+            solution[index] = np.linalg.lstsq(gram[np.ix_(index, index)], target[index], rcond=None)[0]
+        if solution[index].min() > tol:
+            return solution
+        blocking = passive & (solution <= tol)
+        step = x[blocking] - solution[blocking]
+        alpha = np.min(np.divide(x[blocking], step, out=np.zeros_like(step), where=step > 0))
+        x = x + alpha * (solution - x)
+        passive &= x > tol
+        x[~passive] = 0.0
+    return np.zeros_like(x)
+
+
+def _cosines(candidates, gram, target, norm):
+    """Cosine of the counts y with the reconstruction B x of each row x of `candidates`, from B'B and B'y."""
+    reconstruction = np.sqrt(np.maximum(np.einsum("ij,jk,ik->i", candidates, gram, candidates), 0.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(reconstruction > 0, candidates @ target / (norm * reconstruction), 0.0)
+
+
+def strict_fit_sample(gram, target, norm, max_delta=0.004, tol=1e-10):
+    """Backward elimination for one sample; returns (contributions, strict cosine, full-fit cosine).
+
+    Starting from the full NNLS fit, the signature whose removal lowers the
+    reconstruction cosine the least is dropped while that drop stays within
+    `max_delta` (MutationalPatterns' fit_to_signatures_strict, "backwards").
+    The kept signatures all have positive contributions, so the fit is the
+    least-squares solution on them and every removal candidate follows from
+    the inverse Gram matrix in one rank-one downdate; only candidates that turn
+    negative are re-solved, warm-started from the current solution.
+    """
+    x = nnls_gram(gram, target)
+    full = current = float(_cosines(x[None, :], gram, target, norm)[0])
+    kept = np.flatnonzero(x > tol)
+    while len(kept) > 1:
+        sub_gram, sub_target = gram[np.ix_(kept, kept)], target[kept]
+        solution = x[kept]
+        inverse = np.linalg.pinv(sub_gram, hermitian=True)
+        # row i: least-squares solution without signature i
+        candidates = solution[None, :] - inverse * (solution / np.diag(inverse))[:, None]
+        np.fill_diagonal(candidates, 0.0)
+        bounds = _cosines(candidates, sub_gram, sub_target, norm)
+        # a least-squares cosine bounds the NNLS cosine of the same signatures from above,
+        # so a negative candidate is re-solved only if it could still beat the best feasible one
+        infeasible = (candidates < -tol).any(axis=1)
+        cosines = np.where(infeasible, -np.inf, bounds)
+        for i in np.flatnonzero(infeasible)[np.argsort(-bounds[infeasible])]:
+            if bounds[i] <= cosines.max():
+                break
+            others = np.arange(len(kept)) != i
+            start = np.where(others, solution, 0.0)
+            candidates[i] = 0.0
+            candidates[i, others] = nnls_gram(sub_gram[np.ix_(others, others)], sub_target[others], start[others])
+            cosines[i] = _cosines(candidates[i:i + 1], sub_gram, sub_target, norm)[0]
+        best = int(np.argmax(cosines))
+        if current - cosines[best] > max_delta:
+            break
+        x = np.zeros_like(x)
+        x[kept] = np.clip(candidates[best], 0.0, None)
+        current = float(cosines[best])
+        kept = np.flatnonzero(x > tol)
+    return x, current, full
+
+
+def _init_worker(gram):
+    global _gram
+    _gram = gram
+
+
+def _strict_chunk(task):
+    targets, norms, max_delta = task
+    results = [strict_fit_sample(_gram, targets[:, j], norms[j], max_delta) for j in range(targets.shape[1])]
+    return (np.column_stack([r[0] for r in results]), np.array([r[1] for r in results]),
+            np.array([r[2] for r in results]))
+
+
+def strict_fit(counts, signatures, max_delta=0.004, jobs=None, chunk=16):
+    """Strict refit of every sample on a process pool.
+
+    Returns (signatures x samples contributions, strict cosines, full-fit cosines).
+    """
+    counts = np.asarray(counts, dtype=float)
+    if counts.ndim == 1:
+        counts = counts[:, None]
+    basis = np.asarray(signatures, dtype=float)
+    gram = basis.T @ basis
+    targets = basis.T @ counts
+    norms = np.linalg.norm(counts, axis=0)
+    tasks = [(targets[:, start:start + chunk], norms[start:start + chunk], max_delta)
+             for start in range(0, counts.shape[1], chunk)]
+
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        _init_worker(gram)
+        results = list(map(_strict_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(gram,)) as pool:
+            results = list(pool.map(_strict_chunk, tasks))
+    return (np.hstack([r[0] for r in results]), np.concatenate([r[1] for r in results]),
+            np.concatenate([r[2] for r in results]))
+
+
+def strict_report(contributions, cosines, full_cosines):
+    """Per-sample table of the signatures a strict refit kept (a signatures x samples DataFrame)."""
+    signatures = contributions.index.to_numpy()
+    kept = [";".join(signatures[contributions[sample].to_numpy() > 0]) for sample in contributions.columns]
+    return pd.DataFrame({
+        "Sample": contributions.columns,
+        "Signatures": kept,
+        "N_Signatures": (contributions.to_numpy() > 0).sum(axis=0),
+        "Cosine_Strict": np.round(cosines, 6),
+        "Cosine_Full": np.round(full_cosines, 6),
+    })
+
+
+def contributions_frame(file_label, signature_names, contribution):
+    """Long File,Signature,Contribution table as written by the R fitting script."""
+    return pd.DataFrame({
+        "File": file_label,
+        "Signature": list(signature_names),
+        "Contribution": np.asarray(contribution, dtype=float),
+    })
+
+
+def contributions_path(vcf_path):
+    """<dir>/<name>_mutational_signatures.csv, next to the input VCF."""
+    name = re.sub(r"\.vcf(\.gz)?$", "_mutational_signatures.csv", os.path.basename(vcf_path))
+    return os.path.join(os.path.dirname(vcf_path), name)
+
+
+def counts_path(vcf_path):
+    """<dir>/<name>_sbs96_counts.txt, the per-VCF counts kept for refitting."""
+    return contributions_path(vcf_path).replace("_mutational_signatures.csv", "_sbs96_counts.txt")
+
+
+# --- Clonality-stratified fitting ---
+
+def af_bin_counts(vcf_paths, fasta, edges, predicates=(), batch_size=4096):
+    """Channels x (sample, AF bin) counts of every VCF, each read once; returns (counts, samples)."""
+    blocks, samples = [], []
+    for vcf_path in vcf_paths:
+        counts, names, records = count_samples(vcf_path, fasta, batch_size=batch_size, predicates=predicates,
+                                               af_bins=edges)
+        profiling.add_records(records)
+        blocks.append(counts)
+        samples.extend([os.path.basename(vcf_path)] if len(names) == 1 else names)
+        print(f"Counted {len(names)} sample(s) in {len(edges) - 1} AF bins from {vcf_path} ({records} records)")
+    return np.hstack(blocks), samples
+
+
+def af_bin_table(counts, contribution, samples, bins, signature_names):
+    """Long Sample,AF_Bin,Mutations,Signature,Contribution table (sample x bin x signature)."""
+    n_samples, n_bins, n_signatures = len(samples), len(bins), len(signature_names)
+    return pd.DataFrame({
+        "Sample": np.repeat(samples, n_bins * n_signatures),
+        "AF_Bin": np.tile(np.repeat(bins, n_signatures), n_samples),
+        "Mutations": np.repeat(counts.sum(axis=0), n_signatures),
+        "Signature": np.tile(list(signature_names), n_samples * n_bins),
+        "Contribution": contribution.T.ravel(),
+    })
+
+
+def af_bin_counts_path(output):
+    """Counts matrix written next to the AF-bin table: <stem>_sbs96_counts.txt, never the table itself."""
+    stem = os.path.splitext(output)[0]
+    return stem.removesuffix("_mutational_signatures") + "_sbs96_counts.txt"
+
+
+def fit_af_bins(args, edges, predicates, signatures, fasta):
+    """Counts every SNV of every VCF into its AF bin in one pass, then fits all (sample, bin) columns at once."""
+    from oncosigntrack.counting import af_bin_labels
+
+    counts, samples = af_bin_counts(args.vcf, fasta, edges, predicates, args.batch_size)
+    bins = af_bin_labels(edges)
+    # one NNLS problem per (sample, bin) column, solved as one batch
+    if args.strict:
+        contribution = strict_fit(counts, signatures.values, args.max_delta, args.jobs)[0]
+    else:
+        contribution = fit_to_signatures(counts, signatures.values)
+    table = af_bin_table(counts, contribution, samples, bins, signatures.columns)
+
+    output = args.output or os.path.join(os.path.dirname(args.vcf[0]), "af_bins_mutational_signatures.csv")
+    columns = [f"{sample}_AF{label}" for sample in samples for label in bins]
+    write_matrix(pd.DataFrame(counts, index=SBS96_CHANNELS, columns=columns),
+                 af_bin_counts_path(output), binary=False)
+    table.to_csv(output, index=False)
+    print(f"✅ {len(samples)} sample(s) x {len(bins)} AF bins x {signatures.shape[1]} signatures saved to: {output}")
+    return 0
+
+
+def main(args):
+    from oncosigntrack.filtering import output_path, parse_af_bins, parse_af_threshold
+    from oncosigntrack.predicates import build_predicates
+    from oncosigntrack.qc import QcMetrics, write_row
+    from oncosigntrack.vcf import BgzfWriter
+
+    parse_af_threshold(args.allele_frequency)
+    parse_af_threshold(args.min_af)
+    edges = parse_af_bins(args.af_bins)
+    af_threshold = float(args.allele_frequency) if args.allele_frequency is not None else None
+    min_af = float(args.min_af) if args.min_af is not None else None
+    try:
+        predicates = build_predicates(args)
+    except ValueError as e:  # e.g. a panel index of an older version
+        print(f"Error: {e}")
+        return 1
+    signatures = load_signatures(args.signatures)
+    fasta = FastaIndex(args.genome)
+    if predicates:
+        # streaming mode: filters feed the counter directly, no intermediate VCFs
+        print(f"ℹ️ Filters: {', '.join(p.name for p in predicates)}")
+    if edges is not None:
+        try:
+            return fit_af_bins(args, edges, predicates, signatures, fasta)
+        finally:
+            fasta.close()
+
+    for vcf_path in args.vcf:
+        print(f"Processing VCF file: {vcf_path}")
+        # outputs are named after the VCF the shell filters would have produced
+        named_as = output_path(vcf_path, args.allele_frequency, args.bed_file or args.panel,
+                               other=True) if predicates else vcf_path
+        # the tee is BGZF: a plain .vcf input still gives a .vcf.gz
+        filtered_vcf = named_as if named_as.endswith(".gz") else named_as + ".gz"
+        tee = BgzfWriter(filtered_vcf) if predicates and args.write_filtered else None
+        qc = QcMetrics(p.name for p in predicates) if args.qc else None
+        try:
+            # -f and --min-af also apply per sample column: the AF predicate keeps a record if any
+            # sample passes (what the tee writes), the counter only counts the samples that pass
+            counts, samples, records = count_samples(vcf_path, fasta, af_threshold, batch_size=args.batch_size,
+                                                     predicates=predicates, tee=tee, qc=qc, min_af=min_af)
+        finally:
+            if tee is not None:
+                tee.close()
+        profiling.add_records(records)
+        multi = len(samples) > 1
+        labels = samples if multi else [os.path.basename(named_as)]
+
+        # samples with too few SNVs are flagged and not fitted
+        counted = counts.sum(axis=0)
+        low = counted < args.min_snvs if args.min_snvs else np.zeros(len(labels), dtype=bool)
+        for label, n in zip(np.asarray(labels)[low], counted[low]):
+            print(f"⚠️ {label}: {n} SBS96 SNVs, below --min-snvs {args.min_snvs}; not fitted")
+        if qc is not None:
+            row = qc.row(os.path.basename(named_as))
+            row.update({"SBS96_SNVs": int(counts.sum()), "Low_Count": bool(low.any())})
+            print(f"QC saved to: {write_row(row, named_as)}")
+        if low.all():
+            continue
+        if low.any():
+            counts = counts[:, ~low]
+            samples = list(np.asarray(samples)[~low])
+            labels = list(np.asarray(labels)[~low])
+        if args.strict:
+            contribution, cosines, full = strict_fit(counts, signatures.values, args.max_delta, args.jobs)
+            report = strict_report(pd.DataFrame(contribution, index=signatures.columns, columns=labels), cosines, full)
+            for row in report.itertuples():
+                print(f"ℹ️ {row.Sample}: strict refit kept {row.N_Signatures} signature(s) {row.Signatures} "
+                      f"(cosine {row.Cosine_Strict:.4f}, full fit {row.Cosine_Full:.4f})")
+        else:
+            contribution = fit_to_signatures(counts, signatures.values)
+        write_matrix(pd.DataFrame(counts, index=SBS96_CHANNELS, columns=labels), counts_path(named_as),
+                     binary=False)
+        if not multi:
+            table = contributions_frame(os.path.basename(named_as), signatures.columns, contribution[:, 0])
+        else:
+            # multi-sample VCF: one File entry per sample column
+            table = pd.concat([
+                contributions_frame(sample, signatures.columns, contribution[:, j])
+                for j, sample in enumerate(samples)
+            ], ignore_index=True)
+        csv_output_file = contributions_path(named_as)
+        table.to_csv(csv_output_file, index=False)
+        if tee is not None:
+            print(f"Filtered VCF saved as: {filtered_vcf}")
+        print(f"CSV saved to: {csv_output_file}")
+    fasta.close()
+    return 0
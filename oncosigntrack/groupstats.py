@@ -0,0 +1,165 @@
+"""Which signatures differ between the two groups of a heatmap split.
+
+Every signature row of the grouped table is tested at once: a Mann-Whitney U
+test (rank-based, tie-corrected) and a permutation test on the difference of
+group means. Permutation replicates are indicator matrices, so each chunk of
+replicates is a single matrix product with the signature x sample table;
+chunks run on a process pool. P-values are corrected with Benjamini-Hochberg
+and reported with effect sizes, in a table ``heatmap --stats`` can overlay.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# signature x sample values and group-A size shared with the pool workers
+_values = None
+_n_a = 0
+
+
+def bh_qvalues(pvalues):
+    """Benjamini-Hochberg adjusted p-values (q-values); NaNs are kept."""
+    p = np.asarray(pvalues, dtype=float)
+    q = np.full(p.shape, np.nan)
+    valid = ~np.isnan(p)
+    ranked = p[valid]
+    order = np.argsort(ranked)
+    scaled = ranked[order] * len(ranked) / np.arange(1, len(ranked) + 1)
+    adjusted = np.minimum.accumulate(scaled[::-1])[::-1]
+    q_valid = np.empty(len(ranked))
+    q_valid[order] = np.minimum(adjusted, 1.0)
+    q[valid] = q_valid
+    return q
+
+
+def mann_whitney(a, b):
+    """Row-wise two-sided Mann-Whitney U test; returns (U of group A, p-values)."""
+    from scipy.stats import mannwhitneyu
+
+    result = mannwhitneyu(a, b, axis=1, method="asymptotic")
+    pvalues = np.where(np.isnan(result.pvalue), 1.0, result.pvalue)  # constant rows
+    return result.statistic, pvalues
+
+
+def mean_difference(values, n_a):
+    """Mean of the first n_a columns minus the mean of the rest, per row."""
+    total = values.sum(axis=1)
+    sum_a = values[:, :n_a].sum(axis=1)
+    return sum_a / n_a - (total - sum_a) / (values.shape[1] - n_a)
+
+
+def _init_worker(values, n_a):
+    global _values, _n_a
+    _values, _n_a = values, n_a
+
+
+def _permutation_chunk(task):
+    """Counts, per row, the replicates whose |mean difference| reaches the observed one."""
+    seed, replicates, observed = task
+    rng = np.random.default_rng(seed)
+    n = _values.shape[1]
+    labels = np.zeros((replicates, n), dtype=_values.dtype)
+    labels[:, :_n_a] = 1
+    labels = rng.permuted(labels, axis=1)
+    sum_a = _values @ labels.T  # signatures x replicates
+    total = _values.sum(axis=1, keepdims=True)
+    differences = sum_a / _n_a - (total - sum_a) / (n - _n_a)
+    return (np.abs(differences) >= np.abs(observed)[:, None] - 1e-12).sum(axis=1)
+
+
+def permutation_test(values, n_a, permutations=10000, jobs=None, seed=0, chunk=256):
+    """Two-sided permutation p-values of the difference in group means, one per row."""
+    values = np.ascontiguousarray(values, dtype=float)
+    observed = mean_difference(values, n_a)
+    sizes = [min(chunk, permutations - start) for start in range(0, permutations, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(seeds[i], size, observed) for i, size in enumerate(sizes)]
+
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs == 1:
+        _init_worker(values, n_a)
+        counts = list(map(_permutation_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(values, n_a)) as pool:
+            counts = list(pool.map(_permutation_chunk, tasks))
+    return (np.sum(counts, axis=0) + 1) / (permutations + 1)
+
+
+def group_statistics(data, group_a, permutations=10000, jobs=None, seed=0, pseudocount=1.0):
+    """Per-signature test table for a signature x sample DataFrame and the columns in group A."""
+    in_a = data.columns.isin(group_a)
+    a = data.loc[:, in_a].to_numpy(dtype=float)
+    b = data.loc[:, ~in_a].to_numpy(dtype=float)
+    n_a, n_b = a.shape[1], b.shape[1]
+
+    u, p_mw = mann_whitney(a, b)
+    stats = pd.DataFrame({
+        "Mean_A": a.mean(axis=1),
+        "Mean_B": b.mean(axis=1),
+        "Median_A": np.median(a, axis=1),
+        "Median_B": np.median(b, axis=1),
+        "Nonzero_A": (a > 0).mean(axis=1),
+        "Nonzero_B": (b > 0).mean(axis=1),
+    }, index=data.index)
+    stats["Log2FC"] = np.log2((stats["Mean_A"] + pseudocount) / (stats["Mean_B"] + pseudocount))
+    # rank-biserial correlation: +1 when every A value exceeds every B value
+    stats["Rank_Biserial"] = 2 * u / (n_a * n_b) - 1
+    stats["P_MannWhitney"] = p_mw
+    stats["Q_MannWhitney"] = bh_qvalues(p_mw)
+    if permutations:
+        p_perm = permutation_test(np.hstack([a, b]), n_a, permutations, jobs, seed)
+        stats["P_Permutation"] = p_perm
+        stats["Q_Permutation"] = bh_qvalues(p_perm)
+    return stats.rename_axis("Signature")
+
+
+def overlay_qvalues(stats):
+    """The q-value column the heatmap shows: permutation if it was run, Mann-Whitney otherwise."""
+    column = "Q_Permutation" if "Q_Permutation" in stats else "Q_MannWhitney"
+    return stats[column]
+
+
+def read_groups(path):
+    """Sample,Group CSV; returns (samples, samples of group A, group labels), the first group listed is A."""
+    groups = pd.read_csv(path, usecols=[0, 1], dtype=str)
+    groups.columns = ["Sample", "Group"]
+    labels = groups["Group"].unique()
+    if len(labels) != 2:
+        raise ValueError(f"{path} must define exactly two groups, found {len(labels)}")
+    return groups["Sample"].tolist(), groups.loc[groups["Group"] == labels[0], "Sample"].tolist(), labels
+
+
+def main(args):
+    from oncosigntrack.heatmap import prepare_table
+    from oncosigntrack.sparse import read_table
+
+    table = prepare_table(read_table(args.input_file), args.threshold, args.sbs, args.exclude, args.max_columns)
+    data = table.to_frame()
+
+    if args.groups:
+        try:
+            samples, group_a, labels = read_groups(args.groups)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return 1
+        data = data.loc[:, data.columns.isin(samples)]
+    elif args.sep:
+        # same split as 'heatmap --sep': the first `sep` columns after sorting
+        group_a, labels = list(data.columns[:args.sep]), ("A", "B")
+    else:
+        print("Error: give the group split with --sep or --groups.")
+        return 1
+    n_a = int(data.columns.isin(group_a).sum())
+    if n_a == 0 or n_a == data.shape[1]:
+        print("Error: both groups need at least one sample.")
+        return 1
+    print(f"ℹ️ Testing {data.shape[0]} signatures: {n_a} samples in {labels[0]} vs "
+          f"{data.shape[1] - n_a} in {labels[1]}, {args.permutations} permutations")
+
+    stats = group_statistics(data, group_a, args.permutations, args.jobs, args.seed)
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(args.input_file)), "group_stats.csv")
+    stats.to_csv(output)
+    significant = int((overlay_qvalues(stats) < args.alpha).sum())
+    print(f"✅ {significant} signature(s) with q < {args.alpha}; statistics saved to: {output}")
+    return 0
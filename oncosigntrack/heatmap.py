@@ -0,0 +1,175 @@
+"""Circle heatmap of a signature x sample table (heatmap_table_generator_sorted.py)."""
+import os
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+
+def parse_excludes(exclude):
+    """Accepts '5,40' or 'SBS5,SBS40' and returns full signature names."""
+    raw_excludes = [x.strip() for x in exclude.split(",") if x.strip()]
+    return [s if s.upper().startswith("SBS") else f"SBS{s}" for s in raw_excludes]
+
+
+def prepare_table(data, threshold=0.0, sort_sbs=None, exclude="", max_columns=88, log=False):
+    """Applies exclusions, column sorting, thresholding and the optional log transform.
+
+    `data` is a grouped DataFrame or a SparseTable; the result is a SparseTable.
+    """
+    from oncosigntrack.sparse import SparseTable
+
+    table = data if isinstance(data, SparseTable) else SparseTable.from_frame(data)
+    if exclude:
+        excluded_sbs = parse_excludes(exclude)
+        table = table.drop(excluded_sbs)
+        print(f"ℹ️ Excluded SBS rows: {excluded_sbs}")
+
+    if sort_sbs is not None and sort_sbs in table.signatures:
+        order = pd.Series(table.row(sort_sbs)).sort_values(ascending=False).index
+        table = table.columns(order.to_numpy())
+    else:
+        print("ℹ️ No SBS sorting applied." if sort_sbs is None else f"⚠️ SBS '{sort_sbs}' not found; no sorting applied.")
+
+    if max_columns:
+        table = table.columns(np.arange(min(max_columns, table.shape[1])))
+
+    table = table.sort_rows().threshold(threshold).nonempty_rows()
+
+    if log:
+        print("ℹ️ Applying log10(value + 1) transformation.")
+        table = table.log10p()
+    return table
+
+
+def significance_label(q, effect, alpha=0.05):
+    """Right-margin label of one signature: stars for q, then q and the rank-biserial effect."""
+    stars = "***" if q < alpha / 50 else "**" if q < alpha / 5 else "*" if q < alpha else ""
+    return f"{stars} q={q:.2g} r={effect:+.2f}"
+
+
+def plot_circle_heatmap(data, output_dir, cell_size=500.0, sep=None, scheme="plasma",
+                        show_report=False, log=False, stats=None):
+    """Draws the heatmap and its separate circle-size legend; returns the heatmap path.
+
+    `data` is a SparseTable (or a grouped DataFrame); only its positive cells are drawn.
+    `stats` (a 'groupstats' table) adds each signature's q-value and effect size
+    to the right of its row.
+    """
+    from oncosigntrack.sparse import SparseTable
+
+    table = data if isinstance(data, SparseTable) else SparseTable.from_frame(data)
+    n_rows, n_cols = table.shape
+    colormap = plt.get_cmap(scheme)
+    rows, cols, positive = table.positive()
+    occurrence_counts = table.occurrences()
+
+    min_value = positive.min()
+    max_value = positive.max()
+
+    size_values = np.linspace(min_value, max_value, 5)
+    size_labels = [f"{v:.2f}" for v in size_values]
+
+    fig, ax = plt.subplots(figsize=(20, 12))
+
+    if sep is not None:
+        ax.axvspan(-0.5, sep, facecolor='lightcoral', alpha=0.15)
+        ax.axvspan(sep, n_cols - 0.5, facecolor='lightblue', alpha=0.15)
+
+    ax.set_xticks(np.arange(-0.5, n_cols, 1), minor=True)
+    ax.set_yticks(np.arange(-0.5, n_rows, 1), minor=True)
+    ax.grid(which="minor", color="gray", linestyle="-", linewidth=0.5)
+    ax.tick_params(which="minor", bottom=False, left=False)
+
+    # --- All circles in one scatter call ---
+    frac = positive / max_value
+    ax.scatter(cols, rows, s=frac * cell_size, c=colormap(frac), alpha=0.8,
+               edgecolors="black", linewidths=0.3)
+
+    if sep is not None:
+        ax.axvline(x=sep, color='black', linestyle='--', linewidth=2)
+
+    ax.set_xticks(range(n_cols))
+    ax.set_xticklabels(table.samples, rotation=90, fontsize=8)
+    ax.set_yticks(range(n_rows))
+    ax.set_yticklabels(table.signatures, fontsize=8)
+    ax.xaxis.set_ticks_position("top")
+    ax.xaxis.set_label_position("top")
+    ax.set_ylabel("Mutational Signatures (SBS)", fontsize=14)
+
+    if show_report:
+        print("ℹ️ Reporting SBS counts per sample above heatmap.")
+        for j, count in enumerate(occurrence_counts):
+            ax.text(j, n_rows, f"{count}", ha="center", va="center", fontsize=8, color="black", rotation=90)
+
+    ax.set_xlim(-0.5, n_cols - 0.5)
+    ax.set_ylim(-0.5, n_rows + (0.5 if show_report else 0))
+
+    if stats is not None:
+        from oncosigntrack.groupstats import overlay_qvalues
+        qvalues = overlay_qvalues(stats)
+        for i, signature in enumerate(table.signatures):
+            if signature in stats.index:
+                q = qvalues[signature]
+                ax.annotate(significance_label(q, stats.at[signature, "Rank_Biserial"]), (1.005, i),
+                            xycoords=("axes fraction", "data"), va="center", fontsize=7,
+                            fontweight="bold" if q < 0.05 else "normal", annotation_clip=False)
+
+    label = "Proportion Value (log10+1)" if log else "Proportion Value"
+    sm = plt.cm.ScalarMappable(cmap=colormap, norm=plt.Normalize(vmin=min_value, vmax=max_value))
+    sm.set_array([])
+    fig.colorbar(sm, ax=ax, orientation="vertical", label=label, pad=0.12 if stats is not None else 0.05)
+
+    fig.tight_layout()
+    heatmap_path = os.path.join(output_dir, "heatmap_samples_with_counts.png")
+    fig.savefig(heatmap_path, dpi=300)
+    plt.close(fig)
+    print(f"✅ Heatmap saved to: {heatmap_path}")
+
+    # --- Circle-size legend as a separate image ---
+    fig_legend, ax_legend = plt.subplots(figsize=(3, 3))
+    handles = []
+    for size in size_values:
+        frac = size / max_value
+        h = ax_legend.scatter([], [], s=frac * cell_size * .5, color=colormap(frac),
+                              alpha=0.8, edgecolors="black", linewidths=0.3)
+        handles.append(h)
+    ax_legend.legend(
+        handles,
+        size_labels,
+        title="Circle Size\n(Value)",
+        frameon=True,
+        loc="center",
+        scatterpoints=1,
+        labelspacing=0.5,
+        handletextpad=0.8,
+        borderpad=0.5,
+        prop={'size': 8},
+        title_fontsize=9
+    )
+    ax_legend.set_axis_off()
+    legend_path = os.path.join(output_dir, "circle_size_legend.png")
+    fig_legend.savefig(legend_path, bbox_inches="tight", dpi=300)
+    plt.close(fig_legend)
+    print(f"✅ Circle size legend saved to: {legend_path}")
+    return heatmap_path
+
+
+def main(args):
+    from oncosigntrack.sparse import read_table
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.input_file))
+    data = prepare_table(read_table(args.input_file), args.threshold, args.sbs, args.exclude, args.max_columns,
+                         args.log)
+
+    if not data.occurrences().any():
+        print("❌ No values above threshold to plot.")
+        return 1
+
+    stats = pd.read_csv(args.stats, index_col=0) if args.stats else None
+    sep = args.sep - 0.5 if args.sep else None
+    plot_circle_heatmap(data, output_dir, args.cell_size * 100.0, sep, args.scheme, args.report == 1, args.log,
+                        stats)
+    return 0
@@ -0,0 +1,221 @@
+"""Mutation clustering (kataegis) and rainfall plots.
+
+Each VCF is read once, keeping only CHROM, POS, REF and ALT of its SNVs
+(the C CSV parser in chunks, no per-record Python). Positions are sorted per
+chromosome and inter-mutation distances (IMD) are plain array differences.
+A cluster is a run of at least ``min_mutations`` consecutive SNVs whose mean
+IMD is at most ``max_mean_distance`` (6 SNVs, 1 kb by default); every window
+of that many SNVs is tested at once and overlapping hits are merged. VCFs are
+processed on a process pool.
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from oncosigntrack.vcf import VcfReader
+
+# Pyrimidine-centred substitution classes of the rainfall plot
+CLASSES = ["C>A", "C>G", "C>T", "T>A", "T>C", "T>G"]
+CLASS_COLORS = ["#1EBFF0", "#050708", "#E62725", "#CBCACB", "#A1CE63", "#EDB6C2"]
+_COMPLEMENT = str.maketrans("ACGT", "TGCA")
+_CLASS_INDEX = {}
+for _index, _name in enumerate(CLASSES):
+    _CLASS_INDEX[_name] = _index
+    _CLASS_INDEX[_name.translate(_COMPLEMENT)] = _index
+
+CLUSTER_COLUMNS = ["Sample", "Chrom", "Start", "End", "Mutations", "Mean_IMD", "APOBEC_Fraction"]
+
+
+def read_snvs(vcf_path, chunksize=1_000_000):
+    """(chromosome names, chromosome codes, positions, class indices, records read) of a VCF's SNVs.
+
+    Chromosome codes follow the order in which chromosomes first appear.
+    """
+    with VcfReader(vcf_path) as reader:
+        n_header = len(reader.header)
+    chromosomes = {}
+    codes, positions, classes = [], [], []
+    records = 0
+    chunks = pd.read_csv(vcf_path, sep="\t", header=None, skiprows=n_header, usecols=[0, 1, 3, 4],
+                         names=["chrom", "pos", "ref", "alt"],
+                         dtype={"chrom": "category", "pos": np.int64, "ref": "category", "alt": "category"},
+                         quoting=csv.QUOTE_NONE, chunksize=chunksize,
+                         compression="gzip" if _is_gzip(vcf_path) else None)
+    for chunk in chunks:
+        records += len(chunk)
+        # classify the few distinct REF x ALT values, then look the records up by category code
+        ref, alt = chunk["ref"].cat, chunk["alt"].cat
+        table = np.array([[_CLASS_INDEX.get(f"{r.upper()}>{a.upper()}", -1) for a in alt.categories]
+                          for r in ref.categories], dtype=np.int8).reshape(len(ref.categories), len(alt.categories))
+        ref_codes, alt_codes = ref.codes.to_numpy(), alt.codes.to_numpy()
+        substitution = np.where((ref_codes >= 0) & (alt_codes >= 0), table[ref_codes, alt_codes], -1)
+        snv = substitution >= 0
+        chrom_codes = chunk["chrom"].cat.codes.to_numpy()[snv]
+        names = chunk["chrom"].cat.categories
+        lookup = np.zeros(len(names), dtype=np.int64)
+        for code in pd.unique(chrom_codes):
+            lookup[code] = chromosomes.setdefault(names[code], len(chromosomes))
+        codes.append(lookup[chrom_codes])
+        positions.append(chunk["pos"].to_numpy()[snv])
+        classes.append(substitution[snv])
+    if not codes:
+        return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8), records
+    return list(chromosomes), np.concatenate(codes), np.concatenate(positions), np.concatenate(classes), records
+
+
+def _is_gzip(path):
+    with open(path, "rb") as handle:
+        return handle.read(2) == b"\x1f\x8b"
+
+
+def intermutation_distances(codes, positions):
+    """Sorts SNVs by (chromosome, position); returns (order, IMD to the previous SNV, NaN at chromosome starts)."""
+    order = np.lexsort((positions, codes))
+    codes, positions = codes[order], positions[order]
+    distances = np.diff(positions, prepend=0).astype(float)
+    starts = np.ones(len(codes), dtype=bool)
+    starts[1:] = codes[1:] != codes[:-1]
+    distances[starts] = np.nan
+    return order, distances
+
+
+def find_clusters(codes, positions, min_mutations=6, max_mean_distance=1000):
+    """(first, last) indices of clustered runs in sorted (chromosome, position) arrays.
+
+    Window i holds SNVs i .. i + min_mutations - 1 and is a hit when they sit on
+    one chromosome and span at most (min_mutations - 1) * max_mean_distance.
+    Neighbouring SNVs joined by a hit window belong to the same cluster.
+    """
+    k = min_mutations
+    if len(positions) < k:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    span = positions[k - 1:] - positions[:1 - k or None]
+    hits = np.flatnonzero((codes[k - 1:] == codes[:1 - k or None]) & (span <= (k - 1) * max_mean_distance))
+    # link j joins SNVs j and j + 1; hit window i sets links i .. i + k - 2
+    links = np.zeros(len(positions), dtype=np.int64)
+    np.add.at(links, hits, 1)
+    np.add.at(links, hits + k - 1, -1)
+    linked = np.cumsum(links)[:-1] > 0
+    edges = np.diff(np.r_[0, linked.astype(np.int8), 0])
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect(vcf_path, min_mutations=6, max_mean_distance=1000):
+    """Per-VCF analysis; returns (sample, chromosome names, sorted codes, positions, classes, IMDs, clusters, records)."""
+    sample = os.path.basename(vcf_path).split(".vcf")[0]
+    chromosomes, codes, positions, classes, records = read_snvs(vcf_path)
+    order, distances = intermutation_distances(codes, positions)
+    codes, positions, classes = codes[order], positions[order], classes[order]
+    first, last = find_clusters(codes, positions, min_mutations, max_mean_distance)
+
+    counts = last - first + 1
+    # C>T and C>G share of the cluster, the APOBEC hallmark of kataegis
+    apobec = np.cumsum(np.r_[0, np.isin(classes, [1, 2])])
+    clusters = pd.DataFrame({
+        "Sample": sample,
+        "Chrom": np.asarray(chromosomes, dtype=object)[codes[first]] if len(first) else [],
+        "Start": positions[first],
+        "End": positions[last],
+        "Mutations": counts,
+        "Mean_IMD": np.round((positions[last] - positions[first]) / np.maximum(counts - 1, 1), 1),
+        "APOBEC_Fraction": np.round((apobec[last + 1] - apobec[first]) / counts, 3),
+    }, columns=CLUSTER_COLUMNS)
+    return sample, chromosomes, codes, positions, classes, distances, clusters, records
+
+
+def rainfall_plot(output_file, sample, chromosomes, codes, positions, classes, distances, clusters, dpi=300):
+    """IMD (log scale) against genomic position, coloured by substitution class; rasterized points."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+
+    # chromosomes laid end to end in file order; the last SNV of each gives its plotted length
+    lengths = np.zeros(len(chromosomes))
+    last = np.r_[np.flatnonzero(np.diff(codes)), len(codes) - 1] if len(codes) else []
+    lengths[codes[last]] = positions[last]
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    x = offsets[codes] + positions
+
+    fig, ax = plt.subplots(figsize=(14, 4.5))
+    shown = ~np.isnan(distances) & (distances > 0)
+    # one single-colour marker layer per class: Agg stamps the markers instead of drawing paths
+    for index, (name, color) in enumerate(zip(CLASSES, CLASS_COLORS)):
+        points = shown & (classes == index)
+        ax.plot(x[points], distances[points], linestyle="none", marker="o", markersize=1.5, markeredgewidth=0,
+                color=color, label=name, rasterized=True)
+    ax.set_yscale("log")
+    if len(clusters):
+        # clusters as one marker layer along the bottom
+        starts = offsets[pd.Index(chromosomes).get_indexer(clusters["Chrom"])] + clusters["Start"].to_numpy()
+        ax.plot(starts, np.full(len(starts), 1.5), linestyle="none", marker="^", markersize=4, color="black",
+                rasterized=True)
+    ax.vlines(offsets[1:], 1, 1e9, colors="lightgrey", linewidth=0.6)
+    ax.set_xticks(offsets + lengths / 2, chromosomes, fontsize=7, rotation=90)
+    ax.set_xlim(0, max(lengths.sum(), 1))
+    ax.set_ylim(1, max(np.nanmax(distances, initial=10) * 2, 10))
+    ax.set_ylabel("Inter-mutation distance (bp)")
+    ax.set_title(f"{sample}: {len(positions)} SNVs, {len(clusters)} cluster(s)")
+    ax.legend(handles=[Patch(color=color, label=name) for name, color in zip(CLASSES, CLASS_COLORS)],
+              ncol=6, loc="upper center", bbox_to_anchor=(0.5, -0.12), fontsize=8, frameon=False)
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=dpi)
+    plt.close(fig)
+    return output_file
+
+
+def kataegis_path(vcf_path, suffix="_kataegis.csv"):
+    """<dir>/<name>_kataegis.csv, next to the VCF's <name>_mutational_signatures.csv."""
+    from oncosigntrack.fitting import contributions_path
+
+    return contributions_path(vcf_path).replace("_mutational_signatures.csv", suffix)
+
+
+def analyze(task):
+    """Worker: detects the clusters of one VCF, writes its table (and plot); returns (summary row, records)."""
+    vcf_path, min_mutations, max_mean_distance, plot, dpi = task
+    sample, chromosomes, codes, positions, classes, distances, clusters, records = detect(
+        vcf_path, min_mutations, max_mean_distance)
+    clusters.to_csv(kataegis_path(vcf_path), index=False)
+    if plot:
+        rainfall_plot(kataegis_path(vcf_path, "_rainfall.png"), sample, chromosomes, codes, positions, classes,
+                      distances, clusters, dpi)
+    summary = {
+        "Sample": sample,
+        "SNVs": len(positions),
+        "Clusters": len(clusters),
+        "Clustered_SNVs": int(clusters["Mutations"].sum()),
+        "Largest_Cluster": int(clusters["Mutations"].max()) if len(clusters) else 0,
+        "Median_IMD": float(np.nanmedian(distances)) if np.isfinite(distances).any() else np.nan,
+        "Kataegis": bool(len(clusters)),
+    }
+    return summary, records
+
+
+def main(args):
+    from oncosigntrack import profiling
+
+    missing = [path for path in args.vcf if not os.path.exists(path)]
+    if missing:
+        print(f"Error: VCF not found: {missing[0]}")
+        return 1
+    tasks = [(path, args.min_mutations, args.max_distance, not args.no_plots, args.dpi) for path in args.vcf]
+    jobs = min(args.jobs or os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        results = list(map(analyze, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(analyze, tasks))
+
+    summary = pd.DataFrame([row for row, _ in results])
+    profiling.add_records(sum(records for _, records in results))
+    for row in summary.itertuples():
+        flag = "⚠️" if row.Kataegis else "ℹ️"
+        print(f"{flag} {row.Sample}: {row.Clusters} cluster(s), {row.Clustered_SNVs}/{row.SNVs} SNVs clustered")
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(args.vcf[0])), "kataegis_summary.csv")
+    summary.to_csv(output, index=False)
+    print(f"✅ Kataegis summary ({len(summary)} samples) saved to: {output}")
+    return 0
@@ -0,0 +1,332 @@
+"""Cohort-derived panel of normals / common-variant index.
+
+For cohorts without a good population resource, variants carried by many
+samples are flagged as likely germline or artifacts. Every (chrom, pos, ref,
+alt) is packed into one 64-bit key: contig index (16 bits), position (32 bits)
+and an allele code (16 bits), so keys sort by position. The allele code is
+exact for single-base substitutions; longer alleles get a hash, so two
+different indels or MNVs at the same position match with a probability of
+about 1 in 65,000. Workers count keys per VCF and spill sorted (key,
+carriers) runs to hash partitions on disk whenever their buffer is full;
+partitions are then merged one at a time, so memory stays bounded for
+thousands of VCFs.
+
+The result is written as a BED (usable by ``filter -b`` and the shell
+filters) and as a binary ``.npz`` index for allele matching with
+``filter --panel``.
+"""
+import glob
+import os
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from oncosigntrack import profiling
+from oncosigntrack.counting import SampleCounter
+from oncosigntrack.reference import _aliases
+from oncosigntrack.vcf import ALT, CHROM, POS, REF, VcfReader
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+# Allele codes 0-24 are the single-base pairs over ACGTN; hashes of longer alleles take the rest
+_BASES = "ACGTN"
+_SNV_CODES = len(_BASES) ** 2
+# Bumped whenever the key layout changes; older .npz panels must be rebuilt
+PANEL_VERSION = 2
+
+
+def allele_hash(ref, alt):
+    """16-bit allele code of a REF/ALT pair: exact for single-base substitutions, a CRC-32 otherwise."""
+    if len(ref) == 1 and len(alt) == 1:
+        r, a = _BASES.find(ref.upper()), _BASES.find(alt.upper())
+        if r >= 0 and a >= 0:
+            return r * len(_BASES) + a
+    return _SNV_CODES + zlib.crc32(f"{ref}>{alt}".encode()) % (0x10000 - _SNV_CODES)
+
+
+def contig_id(contig_index, chrom):
+    """Contig index of a name or its chr/no-chr alias, -1 if absent."""
+    if chrom in contig_index:
+        return contig_index[chrom]
+    return next((contig_index[a] for a in _aliases(chrom) if a in contig_index), -1)
+
+
+def pack_keys(contig_ids, positions, hashes):
+    """64-bit variant keys: contig << 48 | pos << 16 | allele code."""
+    return ((np.asarray(contig_ids, dtype=np.uint64) << np.uint64(48))
+            | (np.asarray(positions, dtype=np.uint64) << np.uint64(16))
+            | np.asarray(hashes, dtype=np.uint64))
+
+
+def unpack_keys(keys):
+    """(contig index, 1-based position) of packed keys."""
+    keys = np.asarray(keys, dtype=np.uint64)
+    positions = (keys >> np.uint64(16)) & np.uint64(0xFFFFFFFF)
+    return (keys >> np.uint64(48)).astype(np.int64), positions.astype(np.int64)
+
+
+def partition_of(keys, partitions):
+    """Hash partition of every key (partitions is a power of two)."""
+    if partitions == 1:
+        return np.zeros(len(keys), dtype=np.int64)
+    return ((keys * _GOLDEN) >> np.uint64(65 - partitions.bit_length())).astype(np.int64)
+
+
+def read_contigs(vcf_paths, genome=None):
+    """Contig names from the reference .fai, or else from the ##contig lines of the VCF headers."""
+    if genome:
+        with open(genome + ".fai", "r") as handle:
+            return [line.split("\t", 1)[0] for line in handle if line.strip()]
+    contigs = {}
+    for path in vcf_paths:
+        with VcfReader(path) as reader:
+            for line in reader.header:
+                if line.startswith("##contig=<ID="):
+                    contigs.setdefault(line[13:].split(",", 1)[0].rstrip(">\n"), None)
+    return list(contigs)
+
+
+def sum_runs(keys, counts):
+    """Sorted unique keys with their summed counts."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=counts, minlength=len(unique)).astype(np.uint32)
+
+
+class KeyCounter:
+    """Buffers (key, carriers) pairs and spills them as sorted runs per hash partition."""
+
+    def __init__(self, spill_dir, task, partitions=16, max_keys=4_000_000):
+        self.spill_dir = spill_dir
+        self.task = task
+        self.partitions = partitions
+        self.max_keys = max_keys
+        self.keys = []
+        self.counts = []
+        self.buffered = 0
+        self.spills = 0
+
+    def add(self, keys, counts):
+        self.keys.append(keys)
+        self.counts.append(counts)
+        self.buffered += len(keys)
+        if self.buffered >= self.max_keys:
+            self.spill()
+
+    def spill(self):
+        if not self.buffered:
+            return
+        keys, counts = sum_runs(np.concatenate(self.keys), np.concatenate(self.counts))
+        part = partition_of(keys, self.partitions)
+        for p in np.unique(part):
+            selected = part == p
+            path = os.path.join(self.spill_dir, f"part{p:03d}_task{self.task:05d}_{self.spills:04d}.npz")
+            np.savez(path, keys=keys[selected], counts=counts[selected])
+        self.spills += 1
+        self.keys, self.counts, self.buffered = [], [], 0
+
+
+def vcf_keys(path, contig_index, batch_size=4096):
+    """(keys, carriers, samples, records, skipped) of one VCF; repeated keys keep their largest carrier count."""
+    keys, weights = [], []
+    records = skipped = 0
+    with VcfReader(path) as reader:
+        n_samples = max(len(reader.samples), 1)
+        samples = SampleCounter(len(reader.samples), batch_size=batch_size)
+        ids, positions, hashes, values = [], [], [], []
+        # contig names resolved once per VCF, aliases included as in PanelIndex
+        lookup = {}
+
+        def flush():
+            if not ids:
+                return
+            carriers = samples.carried(values).sum(axis=1)
+            batch = pack_keys(ids, positions, hashes)
+            keys.append(batch[carriers > 0])
+            weights.append(carriers[carriers > 0])
+            for queue in (ids, positions, hashes, values):
+                queue.clear()
+
+        for fields in reader:
+            records += 1
+            chrom = fields[CHROM]
+            contig = lookup.get(chrom)
+            if contig is None:
+                contig = lookup[chrom] = contig_id(contig_index, chrom)
+            if contig < 0:
+                skipped += 1
+                continue
+            ids.append(contig)
+            positions.append(int(fields[POS]))
+            hashes.append(allele_hash(fields[REF], fields[ALT]))
+            values.append(samples.sample_values(fields))
+            if len(ids) >= batch_size:
+                flush()
+        flush()
+    keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.uint64)
+    weights = np.concatenate(weights) if weights else np.zeros(0, dtype=np.int64)
+    order = np.lexsort((-weights, keys))
+    keys, weights = keys[order], weights[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    return keys[first], weights[first], n_samples, records, skipped
+
+
+def _count_task(task):
+    index, paths, contigs, spill_dir, partitions, max_keys = task
+    contig_index = {name: i for i, name in enumerate(contigs)}
+    counter = KeyCounter(spill_dir, index, partitions, max_keys)
+    n_samples = records = skipped = 0
+    for path in paths:
+        keys, carriers, samples, n_records, n_skipped = vcf_keys(path, contig_index)
+        counter.add(keys, carriers)
+        n_samples += samples
+        records += n_records
+        skipped += n_skipped
+    counter.spill()
+    return n_samples, records, skipped
+
+
+def merge_partitions(spill_dir, partitions, min_samples):
+    """Sums every partition's runs and keeps keys carried by at least `min_samples` samples."""
+    kept_keys, kept_counts = [], []
+    for p in range(partitions):
+        runs = sorted(glob.glob(os.path.join(spill_dir, f"part{p:03d}_*.npz")))
+        if not runs:
+            continue
+        keys, counts = [], []
+        for run in runs:
+            with np.load(run) as stored:
+                keys.append(stored["keys"])
+                counts.append(stored["counts"])
+            os.remove(run)
+        keys, counts = sum_runs(np.concatenate(keys), np.concatenate(counts))
+        recurrent = counts >= min_samples
+        kept_keys.append(keys[recurrent])
+        kept_counts.append(counts[recurrent])
+    if not kept_keys:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint32)
+    keys, counts = np.concatenate(kept_keys), np.concatenate(kept_counts)
+    order = np.argsort(keys)
+    return keys[order], counts[order]
+
+
+def build_panel(vcf_paths, contigs, min_samples=2, min_fraction=None, jobs=None, partitions=16,
+                max_keys=4_000_000, scratch=None):
+    """Counts carriers of every variant key over the cohort; returns (keys, counts, n_samples, min_samples)."""
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(vcf_paths)))
+    chunks = [list(vcf_paths[i::jobs * 4]) for i in range(min(jobs * 4, len(vcf_paths)))]
+    spill_dir = tempfile.mkdtemp(prefix="panel_", dir=scratch)
+    try:
+        tasks = [(i, chunk, contigs, spill_dir, partitions, max_keys) for i, chunk in enumerate(chunks)]
+        if jobs == 1:
+            results = list(map(_count_task, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(_count_task, tasks))
+        n_samples = sum(result[0] for result in results)
+        records = sum(result[1] for result in results)
+        skipped = sum(result[2] for result in results)
+        profiling.add_records(records)
+        if skipped:
+            print(f"⚠️ {skipped} records on contigs outside the contig list were skipped")
+        if min_fraction is not None:
+            min_samples = max(min_samples, int(np.ceil(min_fraction * n_samples)))
+        keys, counts = merge_partitions(spill_dir, partitions, min_samples)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return keys, counts, n_samples, min_samples
+
+
+def write_panel(path, keys, counts, contigs, n_samples, min_samples):
+    """Binary panel index (.npz) read by PanelIndex."""
+    with open(path, "wb") as handle:
+        np.savez(handle, keys=keys, counts=counts, contigs=np.asarray(contigs, dtype=str),
+                 n_samples=n_samples, min_samples=min_samples, version=PANEL_VERSION)
+
+
+def write_bed(path, keys, counts, contigs):
+    """One 1-bp interval per recurrent variant position (0-based, half-open), carriers in column 4."""
+    contig_ids, positions = unpack_keys(keys)
+    names = np.asarray(contigs, dtype=object)[contig_ids]
+    with open(path, "w") as handle:
+        previous = None
+        for name, pos, count in zip(names, positions.tolist(), counts.tolist()):
+            if (name, pos) == previous:
+                continue
+            previous = (name, pos)
+            handle.write(f"{name}\t{pos - 1}\t{pos}\t{count}\n")
+
+
+class PanelIndex:
+    """(chrom, pos, ref, alt) membership test against a panel .npz; exact for SNVs, hashed for longer alleles."""
+
+    def __init__(self, path):
+        with np.load(path) as stored:
+            version = int(stored["version"]) if "version" in stored.files else 1
+            self.keys = stored["keys"]
+            contigs = stored["contigs"].tolist()
+        if version != PANEL_VERSION:
+            raise ValueError(f"{path} was built by an older 'panel'; rebuild it")
+        self.contig_index = {name: i for i, name in enumerate(contigs)}
+
+    def _contig(self, chrom):
+        """Panel contig index of a name or its chr/no-chr alias, -1 if absent."""
+        return contig_id(self.contig_index, chrom)
+
+    def contains(self, chrom, pos, ref, alt):
+        contig = self._contig(chrom)
+        if contig < 0:
+            return False
+        key = pack_keys([contig], [pos], [allele_hash(ref, alt)])[0]
+        i = np.searchsorted(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def contains_many(self, chroms, positions, refs, alts):
+        """Vectorized contains() for arrays of records; returns a boolean mask."""
+        lookup = {chrom: self._contig(chrom) for chrom in set(chroms)}
+        contig_ids = np.array([lookup[chrom] for chrom in chroms], dtype=np.int64)
+        known = contig_ids >= 0
+        hashes = [allele_hash(ref, alt) for ref, alt in zip(refs, alts)]
+        keys = pack_keys(np.where(known, contig_ids, 0), positions, hashes)
+        i = np.minimum(np.searchsorted(self.keys, keys), max(len(self.keys) - 1, 0))
+        return known & (self.keys[i] == keys) if len(self.keys) else np.zeros(len(keys), dtype=bool)
+
+    def contains_record(self, fields):
+        return self.contains(fields[CHROM], int(fields[POS]), fields[REF], fields[ALT])
+
+
+def _vcf_paths(args):
+    paths = list(args.vcf)
+    if args.vcf_list:
+        with open(args.vcf_list, "r") as handle:
+            paths.extend(line.strip() for line in handle if line.strip())
+    return paths
+
+
+def main(args):
+    paths = _vcf_paths(args)
+    if not paths:
+        print("Error: no input VCFs; give them as arguments or with --vcf-list.")
+        return 1
+    if args.partitions < 1 or args.partitions & (args.partitions - 1):
+        print("Error: --partitions must be a power of two.")
+        return 1
+    contigs = read_contigs(paths, args.genome)
+    if not contigs:
+        print("Error: no ##contig lines in the VCF headers; give the reference with -g.")
+        return 1
+    if len(contigs) >= 1 << 16:
+        print(f"Error: {len(contigs)} contigs do not fit the 16-bit contig field.")
+        return 1
+
+    keys, counts, n_samples, min_samples = build_panel(
+        paths, contigs, args.min_samples, args.min_fraction, args.jobs, args.partitions, args.max_keys, args.scratch
+    )
+    prefix = args.output or os.path.join(os.path.dirname(os.path.abspath(paths[0])), "panel_of_normals")
+    write_panel(prefix + ".npz", keys, counts, contigs, n_samples, min_samples)
+    write_bed(prefix + ".bed", keys, counts, contigs)
+    print(f"✅ {len(keys)} variants carried by >= {min_samples} of {n_samples} samples")
+    print(f"✅ Panel saved to: {prefix}.npz and {prefix}.bed")
+    return 0
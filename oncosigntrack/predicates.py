@@ -0,0 +1,207 @@
+"""Record predicates of the filter engine, evaluated as NumPy masks.
+
+A predicate turns a RecordBatch (a columnar view of a few thousand VCF
+records) into a boolean keep-mask. Predicates register themselves in
+PREDICATES with a ``from_args`` constructor; 'filter' builds every predicate
+whose options are set and keeps the records all of them accept, in one
+streaming pass. A new criterion is a new class here plus its CLI option.
+"""
+import numpy as np
+
+from oncosigntrack.counting import format_values
+from oncosigntrack.vcf import ALT, CHROM, FILTER, FORMAT, ID, POS, REF
+
+PREDICATES = {}
+
+
+def predicate(name):
+    """Registers a predicate class; registration order is evaluation order."""
+    def register(cls):
+        cls.name = name
+        PREDICATES[name] = cls
+        return cls
+    return register
+
+
+def build_predicates(args):
+    """Every registered predicate whose options are set in `args`."""
+    built = (cls.from_args(args) for cls in PREDICATES.values())
+    return [p for p in built if p is not None]
+
+
+class RecordBatch:
+    """Columnar view of a list of split VCF records; columns are built on first use."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._columns = {}
+        self._format = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, index):
+        if index not in self._columns:
+            self._columns[index] = np.array([row[index] for row in self.rows], dtype=object)
+        return self._columns[index]
+
+    @property
+    def positions(self):
+        if "pos" not in self._columns:
+            self._columns["pos"] = np.array([int(row[POS]) for row in self.rows], dtype=np.int64)
+        return self._columns["pos"]
+
+    def format_values(self, key):
+        """records x samples array of one FORMAT field ('.' where absent)."""
+        if key not in self._format:
+            n_samples = max(len(self.rows[0]) - 9, 0) if self.rows else 0
+            values = np.full((len(self.rows), n_samples), ".", dtype=object)
+            formats = self.column(FORMAT) if n_samples else np.array([], dtype=object)
+            for layout in np.unique(formats):
+                keys = layout.split(":")
+                if key not in keys:
+                    continue
+                index = keys.index(key)
+                for i in np.flatnonzero(formats == layout):
+                    values[i] = format_values(self.rows[i][9:], index)
+            self._format[key] = values.astype(str)
+        return self._format[key]
+
+    def ad_counts(self):
+        """(ref, alt) AD counts per record and sample; 0 where AD is not a biallelic 'ref,alt'."""
+        parts = np.char.partition(self.format_values("AD"), ",")
+        ref, sep, alt = parts[..., 0], parts[..., 1], parts[..., 2]
+        valid = (sep == ",") & np.char.isdigit(ref) & np.char.isdigit(alt)
+        return np.where(valid, ref, "0").astype(np.int64), np.where(valid, alt, "0").astype(np.int64)
+
+
+@predicate("snv")
+class SnvOnly:
+    """Biallelic single-base substitutions only."""
+
+    @classmethod
+    def from_args(cls, args):
+        return cls() if getattr(args, "snv_only", False) else None
+
+    def mask(self, batch):
+        ref, alt = batch.column(REF).astype(str), batch.column(ALT).astype(str)
+        return (np.char.str_len(ref) == 1) & np.isin(alt, list("ACGT"))
+
+
+@predicate("pass")
+class PassOnly:
+    """FILTER is PASS."""
+
+    @classmethod
+    def from_args(cls, args):
+        return cls() if getattr(args, "pass_only", False) else None
+
+    def mask(self, batch):
+        return batch.column(FILTER) == "PASS"
+
+
+@predicate("novel")
+class NovelId:
+    """ID is '.', i.e. not a known (dbSNP) variant (keep_id_with_dots.sh)."""
+
+    @classmethod
+    def from_args(cls, args):
+        return cls() if getattr(args, "novel", False) else None
+
+    def mask(self, batch):
+        return batch.column(ID) == "."
+
+
+@predicate("regions")
+class InRegions:
+    """Records overlapping a BED of target regions."""
+
+    def __init__(self, bed):
+        self.bed = bed
+
+    @classmethod
+    def from_args(cls, args):
+        if not getattr(args, "regions", None):
+            return None
+        from oncosigntrack.bed import BedIndex
+        return cls(BedIndex.from_file(args.regions))
+
+    def mask(self, batch):
+        starts = batch.positions - 1
+        ends = starts + np.char.str_len(batch.column(REF).astype(str))
+        return self.bed.overlaps_many(batch.column(CHROM), starts, ends)
+
+
+@predicate("bed")
+class OutsideRegions(InRegions):
+    """Records not overlapping a BED of common variants (bedtools subtract -A)."""
+
+    @classmethod
+    def from_args(cls, args):
+        if not getattr(args, "bed_file", None):
+            return None
+        from oncosigntrack.bed import BedIndex
+        return cls(BedIndex.from_file(args.bed_file))
+
+    def mask(self, batch):
+        return ~super().mask(batch)
+
+
+@predicate("panel")
+class NotInPanel:
+    """Records whose exact allele is not in a cohort panel of normals."""
+
+    def __init__(self, panel):
+        self.panel = panel
+
+    @classmethod
+    def from_args(cls, args):
+        if not getattr(args, "panel", None):
+            return None
+        from oncosigntrack.panel import PanelIndex
+        return cls(PanelIndex(args.panel))
+
+    def mask(self, batch):
+        return ~self.panel.contains_many(batch.column(CHROM), batch.positions, batch.column(REF),
+                                         batch.column(ALT))
+
+
+@predicate("depth")
+class MinDepth:
+    """Any sample with at least `depth` AD-supported reads (ref + alt)."""
+
+    def __init__(self, depth):
+        self.depth = depth
+
+    @classmethod
+    def from_args(cls, args):
+        depth = getattr(args, "min_depth", None)
+        return cls(depth) if depth else None
+
+    def mask(self, batch):
+        ref, alt = batch.ad_counts()
+        return ((ref + alt) >= self.depth).any(axis=1)
+
+
+@predicate("af")
+class AlleleFrequency:
+    """Any sample with low < AF <= high, AF from AD (filter_vcf_by_af.sh rule with low = 0)."""
+
+    def __init__(self, low=0.0, high=1.0):
+        self.low = low
+        self.high = high
+
+    @classmethod
+    def from_args(cls, args):
+        high = getattr(args, "allele_frequency", None)
+        low = getattr(args, "min_af", None)
+        if high is None and low is None:
+            return None
+        return cls(float(low) if low is not None else 0.0, float(high) if high is not None else 1.0)
+
+    def mask(self, batch):
+        ref, alt = batch.ad_counts()
+        depth = ref + alt
+        with np.errstate(invalid="ignore", divide="ignore"):
+            af = np.where(depth > 0, alt / depth, np.nan)
+        return ((af > self.low) & (af <= self.high)).any(axis=1)
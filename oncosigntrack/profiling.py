@@ -0,0 +1,218 @@
+"""Per-stage timing, throughput and memory instrumentation.
+
+Each measured stage appends one JSON line to a run report, so the shell
+pipeline can wrap bcftools, bedtools, Rscript and Python invocations for
+every sample and summarize them at the end:
+
+    python3 -m oncosigntrack profile run --report run.jsonl --stage fit \\
+        --sample S1 --input S1.vcf.gz -- Rscript ... S1.vcf.gz
+    python3 -m oncosigntrack profile summary run.jsonl --csv run.csv
+
+Python subcommands are measured in-process with the global
+``--profile-report`` option, and ``--cprofile`` writes a cProfile dump.
+"""
+import csv
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from oncosigntrack.vcf import open_vcf
+
+FIELDS = [
+    "stage", "sample", "wall_seconds", "cpu_seconds", "peak_rss_mb",
+    "input_bytes", "records", "exit_code", "host", "pid", "started", "command",
+]
+
+# Stage being measured in this process; commands report their records to it
+_current = None
+
+
+def add_records(n):
+    """Adds to the records processed by the stage currently being measured."""
+    if _current is not None:
+        _current["records"] += n
+
+
+def input_bytes(paths):
+    """Total size of the existing input files."""
+    return sum(os.path.getsize(path) for path in paths if path and os.path.isfile(path))
+
+
+def count_vcf_records(path):
+    """Number of body lines of a VCF (an extra read; done outside the timed region)."""
+    with open_vcf(path) as handle:
+        return sum(1 for line in handle if line[0] != "#")
+
+
+def _maxrss_mb(usage):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / scale, 2)
+
+
+def _cpu_seconds():
+    # this process plus any subprocesses it has waited for
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _new_record(stage, sample, inputs, command):
+    return {
+        "stage": stage,
+        "sample": sample or "",
+        "wall_seconds": 0.0,
+        "cpu_seconds": 0.0,
+        "peak_rss_mb": 0.0,
+        "input_bytes": input_bytes(inputs),
+        "records": 0,
+        "exit_code": 0,
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "started": time.time(),
+        "command": " ".join(command) if command else "",
+    }
+
+
+def append_record(report_path, record):
+    """Appends one record as a JSON line (a single write, safe for concurrent samples)."""
+    line = json.dumps(record) + "\n"
+    with open(report_path, "a") as handle:
+        handle.write(line)
+
+
+def load_records(report_path):
+    """Reads every record of a JSON-lines run report."""
+    with open(report_path, "r") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+@contextmanager
+def stage(stage_name, sample="", inputs=(), report_path=None):
+    """Measures a Python stage in-process and yields its record.
+
+    Peak RSS is the process high-water mark, so it is exact for one stage
+    per process (the CLI case) and an upper bound otherwise.
+    """
+    global _current
+    record = _new_record(stage_name, sample, inputs, sys.argv)
+    previous, _current = _current, record
+    wall_start = time.perf_counter()
+    cpu_start = _cpu_seconds()
+    try:
+        yield record
+    except SystemExit as e:
+        record["exit_code"] = e.code if isinstance(e.code, int) else 1
+        raise
+    except BaseException:
+        record["exit_code"] = 1
+        raise
+    finally:
+        _current = previous
+        record["wall_seconds"] = round(time.perf_counter() - wall_start, 4)
+        record["cpu_seconds"] = round(_cpu_seconds() - cpu_start, 4)
+        record["peak_rss_mb"] = _maxrss_mb(resource.getrusage(resource.RUSAGE_SELF))
+        if report_path:
+            append_record(report_path, record)
+
+
+def run_command(stage_name, command, sample="", inputs=(), report_path=None,
+                count_records=None, py_spy=None):
+    """Runs an external command and records its wall/CPU time and peak RSS."""
+    record = _new_record(stage_name, sample, inputs, command)
+    if py_spy:
+        if shutil.which("py-spy"):
+            command = ["py-spy", "record", "--subprocesses", "-o", py_spy, "--"] + list(command)
+        else:
+            print("⚠️ py-spy not found on PATH; running without it.", file=sys.stderr)
+
+    wall_start = time.perf_counter()
+    process = subprocess.Popen(command)
+    _, status, usage = os.wait4(process.pid, 0)
+    record["wall_seconds"] = round(time.perf_counter() - wall_start, 4)
+    record["cpu_seconds"] = round(usage.ru_utime + usage.ru_stime, 4)
+    record["peak_rss_mb"] = _maxrss_mb(usage)
+    record["exit_code"] = os.waitstatus_to_exitcode(status)
+
+    if count_records and os.path.isfile(count_records):
+        record["records"] = count_vcf_records(count_records)
+    if report_path:
+        append_record(report_path, record)
+    return record
+
+
+def summarize(records):
+    """Per-stage totals: samples, wall, CPU, max RSS, bytes, records and throughput."""
+    stages = {}
+    for r in records:
+        s = stages.setdefault(r["stage"], {
+            "stage": r["stage"], "runs": 0, "failures": 0, "wall_seconds": 0.0, "max_wall_seconds": 0.0,
+            "cpu_seconds": 0.0, "peak_rss_mb": 0.0, "input_bytes": 0, "records": 0,
+        })
+        s["runs"] += 1
+        s["failures"] += r["exit_code"] != 0
+        s["wall_seconds"] += r["wall_seconds"]
+        s["max_wall_seconds"] = max(s["max_wall_seconds"], r["wall_seconds"])
+        s["cpu_seconds"] += r["cpu_seconds"]
+        s["peak_rss_mb"] = max(s["peak_rss_mb"], r["peak_rss_mb"])
+        s["input_bytes"] += r["input_bytes"]
+        s["records"] += r["records"]
+
+    total_wall = sum(s["wall_seconds"] for s in stages.values()) or 1.0
+    for s in stages.values():
+        wall = s["wall_seconds"]
+        s["share"] = wall / total_wall
+        s["mb_per_second"] = s["input_bytes"] / 1e6 / wall if wall else 0.0
+        s["records_per_second"] = s["records"] / wall if wall else 0.0
+    return sorted(stages.values(), key=lambda s: s["wall_seconds"], reverse=True)
+
+
+def format_summary(summary):
+    """Plain-text table of the per-stage summary."""
+    header = (f"{'Stage':<16}{'Runs':>6}{'Fail':>6}{'Wall s':>10}{'Share':>8}{'Max s':>9}"
+              f"{'CPU s':>10}{'RSS MB':>9}{'MB/s':>9}{'Rec/s':>11}")
+    lines = [header, "-" * len(header)]
+    for s in summary:
+        lines.append(
+            f"{s['stage']:<16}{s['runs']:>6}{s['failures']:>6}{s['wall_seconds']:>10.2f}"
+            f"{s['share']:>8.1%}{s['max_wall_seconds']:>9.2f}{s['cpu_seconds']:>10.2f}"
+            f"{s['peak_rss_mb']:>9.1f}{s['mb_per_second']:>9.2f}{s['records_per_second']:>11.0f}"
+        )
+    return "\n".join(lines)
+
+
+def write_csv(records, csv_path):
+    """Writes the per-stage, per-sample records as CSV."""
+    with open(csv_path, "w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def main(args):
+    if args.action == "run":
+        command = args.command[1:] if args.command[:1] == ["--"] else args.command
+        if not command:
+            print("Error: no command given after --")
+            return 1
+        record = run_command(args.stage, command, args.sample, args.input, args.report,
+                             args.count_records, args.py_spy)
+        return record["exit_code"]
+
+    records = load_records(args.report)
+    summary = summarize(records)
+    print(format_summary(summary))
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"summary": summary, "records": records}, handle, indent=2)
+        print(f"✅ Run report saved to: {args.json}")
+    if args.csv:
+        write_csv(records, args.csv)
+        print(f"✅ Per-sample timings saved to: {args.csv}")
+    return 0
@@ -0,0 +1,114 @@
+"""Per-sample QC metrics gathered while the filters stream a VCF.
+
+The filter engine hands every RecordBatch, its per-predicate masks and the
+final keep-mask to QcMetrics, so the metrics cost no extra read: records
+left after each filter in chain order, the fraction the common-variant BED
+removes on its own, SNV/DBS/indel counts, Ti/Tv, and median depth and AF
+of the kept records. Depth and AF come from the AD of the first sample
+column (the sample the R fitting stage uses), accumulated as histograms.
+``aggregate`` gathers the per-VCF ``<name>_qc.csv`` files into
+``qc_metrics.csv``.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from oncosigntrack.vcf import ALT, REF
+
+# Depths above this share the last histogram bin
+MAX_DEPTH = 10_000
+# AF histogram resolution: medians are exact to 1 / AF_BINS
+AF_BINS = 1000
+TRANSITIONS = ["AG", "GA", "CT", "TC"]
+
+
+class QcMetrics:
+    """Streaming QC counters of one VCF."""
+
+    def __init__(self, predicate_names=()):
+        self.names = list(predicate_names)
+        self.records = 0
+        self.after = np.zeros(len(self.names), dtype=np.int64)
+        self.removed = np.zeros(len(self.names), dtype=np.int64)
+        self.kept = 0
+        self.snvs = self.dbs = self.indels = self.transitions = 0
+        self.depth = np.zeros(MAX_DEPTH + 1, dtype=np.int64)
+        self.af = np.zeros(AF_BINS + 1, dtype=np.int64)
+
+    def observe(self, batch, masks, keep):
+        """Adds one RecordBatch, the mask of each predicate (chain order) and the combined keep-mask."""
+        self.records += len(batch)
+        passed = np.ones(len(batch), dtype=bool)
+        for i, mask in enumerate(masks):
+            passed &= mask
+            self.after[i] += passed.sum()
+            self.removed[i] += (~mask).sum()
+        self.kept += int(keep.sum())
+        if not keep.any():
+            return
+
+        ref, alt = batch.column(REF)[keep].astype(str), batch.column(ALT)[keep].astype(str)
+        ref_length, alt_length = np.char.str_len(ref), np.char.str_len(alt)
+        snv = (ref_length == 1) & np.isin(alt, list("ACGT"))
+        self.snvs += int(snv.sum())
+        self.transitions += int(np.isin(np.char.add(ref[snv], alt[snv]), TRANSITIONS).sum())
+        doublet = (ref_length == 2) & (alt_length == 2)
+        if doublet.any():
+            bases = np.char.add(ref[doublet], alt[doublet]).astype("U4").view("U1").reshape(-1, 4)
+            self.dbs += int(((bases[:, 0] != bases[:, 2]) & (bases[:, 1] != bases[:, 3])).sum())
+        anchor = alt.astype("U1")
+        indel = ((ref_length == 1) != (alt_length == 1)) & (ref.astype("U1") == anchor) & np.isin(anchor, list("ACGT"))
+        self.indels += int((indel & (np.char.find(alt, ",") < 0)).sum())
+
+        if len(batch.rows[0]) > 9:
+            ref_reads, alt_reads = batch.ad_counts()
+            depth = (ref_reads[:, 0] + alt_reads[:, 0])[keep]
+            self.depth += np.bincount(np.minimum(depth, MAX_DEPTH), minlength=MAX_DEPTH + 1)
+            covered = depth > 0
+            af = alt_reads[:, 0][keep][covered] / depth[covered]
+            self.af += np.bincount(np.ceil(af * AF_BINS).astype(np.int64), minlength=AF_BINS + 1)
+
+    @property
+    def transversions(self):
+        return self.snvs - self.transitions
+
+    def row(self, sample):
+        """One row of the QC table."""
+        row = {"Sample": sample, "Records": self.records}
+        for name, after in zip(self.names, self.after):
+            row[f"After_{name}"] = int(after)
+        row["Kept"] = self.kept
+        if "bed" in self.names:
+            removed = self.removed[self.names.index("bed")]
+            row["BED_Removed_Fraction"] = round(removed / self.records, 4) if self.records else np.nan
+        row.update({
+            "SNVs": self.snvs,
+            "DBS": self.dbs,
+            "Indels": self.indels,
+            "Ti_Tv": round(self.transitions / self.transversions, 3) if self.transversions else np.nan,
+            "Median_Depth": _median(self.depth),
+            "Median_AF": _median(self.af) / AF_BINS if self.af.any() else np.nan,
+        })
+        return row
+
+
+def _median(histogram):
+    """Lower median of the values a histogram of non-negative integers counts."""
+    total = histogram.sum()
+    if not total:
+        return np.nan
+    return int(np.searchsorted(np.cumsum(histogram), (total + 1) // 2))
+
+
+def qc_path(vcf_path):
+    """<dir>/<name>_qc.csv, next to <name>_mutational_signatures.csv."""
+    name = re.sub(r"\.vcf(\.gz)?$", "_qc.csv", os.path.basename(vcf_path))
+    return os.path.join(os.path.dirname(vcf_path), name)
+
+
+def write_row(row, vcf_path):
+    path = qc_path(vcf_path)
+    pd.DataFrame([row]).to_csv(path, index=False)
+    return path
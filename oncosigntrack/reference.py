@@ -0,0 +1,64 @@
+"""Reference genome access through a samtools faidx index."""
+
+
+def _aliases(chrom):
+    """Alternative spellings of a contig name (UCSC 'chr1' vs NCBI '1')."""
+    if chrom in ("chrM", "chrMT"):
+        return ["MT", "M"]
+    if chrom in ("MT", "M"):
+        return ["chrM", "chrMT"]
+    if chrom.startswith("chr"):
+        return [chrom[3:]]
+    return ["chr" + chrom]
+
+
+class FastaIndex:
+    """Random access to an indexed FASTA (``<fasta>.fai`` must exist).
+
+    The most recently used chromosome is kept in memory, since VCF records
+    arrive sorted and context lookups then become plain slicing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        with open(path + ".fai", "r") as handle:
+            for line in handle:
+                name, length, offset, line_bases, line_width = line.split("\t")[:5]
+                self.index[name] = (int(length), int(offset), int(line_bases), int(line_width))
+        self.handle = open(path, "rb")
+        self._cached_name = None
+        self._cached_sequence = b""
+
+    def resolve(self, chrom):
+        """Returns the contig name used by the FASTA, or None if it is absent."""
+        if chrom in self.index:
+            return chrom
+        for alias in _aliases(chrom):
+            if alias in self.index:
+                return alias
+        return None
+
+    def sequence(self, chrom):
+        """Returns the full upper-case sequence of a contig as bytes."""
+        name = self.resolve(chrom)
+        if name is None:
+            return None
+        if name != self._cached_name:
+            length, offset, line_bases, line_width = self.index[name]
+            n_lines = (length + line_bases - 1) // line_bases if line_bases else 0
+            self.handle.seek(offset)
+            raw = self.handle.read(length + n_lines * (line_width - line_bases))
+            self._cached_sequence = raw.translate(None, b"\r\n").upper()[:length]
+            self._cached_name = name
+        return self._cached_sequence
+
+    def fetch(self, chrom, start, end):
+        """Returns the 0-based, half-open slice [start, end) of a contig as a string."""
+        sequence = self.sequence(chrom)
+        if sequence is None:
+            return ""
+        return sequence[max(start, 0):end].decode()
+
+    def close(self):
+        self.handle.close()
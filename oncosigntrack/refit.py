@@ -0,0 +1,124 @@
+"""Refitting stored count matrices to one or more reference signature sets.
+
+Counts are written once by 'count', 'catalogs', 'fit' or the R stage
+(``*_sbs96_counts.txt``); trying another COSMIC version or a tissue-specific
+subset then only needs the matrices, not the VCFs. Each reference set is
+fitted to every sample of every matrix in one call.
+"""
+import os
+
+import pandas as pd
+
+from oncosigntrack.aggregate import grouped_table
+from oncosigntrack.catalogs import long_table
+from oncosigntrack.counting import read_matrix
+from oncosigntrack.fitting import fit_to_signatures, load_signatures, strict_fit, strict_report
+
+
+def load_counts(paths):
+    """Concatenates stored count matrices column-wise, prefixing repeated sample names with the file name."""
+    blocks, columns, seen = [], [], set()
+    for path in paths:
+        matrix = read_matrix(path)
+        if blocks and not matrix.index.equals(blocks[0].index):
+            matrix = matrix.reindex(blocks[0].index, fill_value=0)
+        base = os.path.basename(path).split(".")[0]
+        for name in matrix.columns:
+            unique = name if name not in seen else f"{base}_{name}"
+            seen.add(unique)
+            columns.append(unique)
+        blocks.append(matrix)
+    counts = pd.concat(blocks, axis=1)
+    counts.columns = columns
+    return counts.astype(float)
+
+
+def select_signatures(reference, include=None, exclude=None):
+    """Keeps the `include` signatures (all if None) minus the `exclude` ones."""
+    if include:
+        missing = [name for name in include if name not in reference.columns]
+        if missing:
+            raise ValueError(f"signatures not in the reference: {', '.join(missing)}")
+        reference = reference[include]
+    if exclude:
+        reference = reference.drop(columns=[name for name in exclude if name in reference.columns])
+    return reference
+
+
+def refit(counts, references):
+    """Fits every {name: reference} to the channels x samples counts; returns {name: signatures x samples}."""
+    fits = {}
+    for name, reference in references.items():
+        contribution = fit_to_signatures(counts.loc[reference.index].values, reference.values)
+        fits[name] = pd.DataFrame(contribution, index=reference.columns, columns=counts.columns)
+    return fits
+
+
+def strict_refit(counts, references, max_delta=0.004, jobs=None):
+    """Backward-elimination refit of every reference; returns {name: (signatures x samples, strict report)}."""
+    fits = {}
+    for name, reference in references.items():
+        contribution, cosines, full = strict_fit(counts.loc[reference.index].values, reference.values, max_delta, jobs)
+        fit = pd.DataFrame(contribution, index=reference.columns, columns=counts.columns)
+        fits[name] = fit, strict_report(fit, cosines, full)
+    return fits
+
+
+def reference_name(path):
+    """COSMIC_v3.4_SBS_GRCh38.txt -> COSMIC_v3.4_SBS_GRCh38."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def main(args):
+    try:
+        counts = load_counts(args.matrix)
+    except (ImportError, OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    include = [s.strip() for s in args.include.split(",") if s.strip()] if args.include else None
+    exclude = None
+    if args.exclude:
+        from oncosigntrack.heatmap import parse_excludes
+        exclude = parse_excludes(args.exclude)
+
+    references = {}
+    for path in args.signatures:
+        try:
+            reference = load_signatures(path, list(counts.index))
+            references[reference_name(path)] = select_signatures(reference, include, exclude)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+    mode = f"strict refit (max delta {args.max_delta})" if args.strict else "refit"
+    print(f"ℹ️ {mode.capitalize()} of {counts.shape[1]} sample(s) to {len(references)} reference set(s)")
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.matrix[0]))
+    os.makedirs(output_dir, exist_ok=True)
+    if args.strict:
+        fits = strict_refit(counts, references, args.max_delta, args.jobs)
+    else:
+        fits = {name: (fit, None) for name, fit in refit(counts, references).items()}
+    for name, (fit, report) in fits.items():
+        table = long_table(fit)
+        path = os.path.join(output_dir, f"refit_{name}_contributions.csv")
+        table.to_csv(path, index=False)
+        grouped_path = os.path.join(output_dir, f"refit_{name}_group.csv")
+        nonzero = table[table["Contribution"] > 0]
+        grouped_table(nonzero, as_int=not args.keep_float).to_csv(grouped_path, index_label="Signature")
+        print(f"✅ {name}: {fit.shape[0]} signatures, contributions saved to: {path}")
+        print(f"✅ Grouped table saved to: {grouped_path}")
+        if report is not None:
+            report_path = os.path.join(output_dir, f"refit_{name}_strict.csv")
+            report.to_csv(report_path, index=False)
+            print(f"✅ Signatures kept per sample ({report['N_Signatures'].mean():.1f} on average) "
+                  f"saved to: {report_path}")
+
+        if args.per_sample:
+            sample_dir = os.path.join(output_dir, name)
+            os.makedirs(sample_dir, exist_ok=True)
+            for sample, rows in table.groupby("File", sort=False):
+                name_stem = sample.split(".vcf")[0]
+                rows.to_csv(os.path.join(sample_dir, f"{name_stem}_mutational_signatures.csv"), index=False)
+            print(f"✅ {fit.shape[1]} per-sample tables saved to: {sample_dir}")
+    return 0
@@ -0,0 +1,170 @@
+"""Per-sample horizontal bar plots for a whole cohort in one run.
+
+Also the deferred renderer for the fitting stage: after
+``mutational_analysis_single_file.R --no-sample-plots``, point it at the
+results directory and list the samples to draw, by sample name or by the
+filtered file's name; only they are drawn.
+
+Batch form of R_Package_horizontal_mutations_bar_plot.py (File,Signature,
+Contribution tables such as all.csv) and mutagene_horizontal_mutations_bar_plot.py
+(signature, mutations, mutations_low, mutations_high tables). The input is read
+once and split per sample; samples are drawn on a process pool, every worker
+reusing one figure. The bars, the low/high ranges and the top-10 labels of a
+sample are one call each.
+"""
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+# Figure reused by every sample a worker draws
+_figure = None
+
+RANGE_COLUMNS = ["signature", "mutations", "mutations_low", "mutations_high"]
+CONTRIBUTION_COLUMNS = ["File", "Signature", "Contribution"]
+# Names the filters give their outputs (filtering.output_path): AF_<threshold>_, filtered_, _non_common
+_FILTER_PREFIX = re.compile(r"^(?:AF_[^_]+_|filtered_)+")
+
+
+def sample_files(paths):
+    """Input tables; a directory stands for its *_mutational_signatures.csv contribution tables."""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for found in sorted(glob.glob(os.path.join(path, "*_mutational_signatures.csv"))):
+            # skips e.g. af_bins_mutational_signatures.csv, a different layout
+            if list(pd.read_csv(found, nrows=0).columns) == CONTRIBUTION_COLUMNS:
+                files.append(found)
+    return files
+
+
+def sample_name(name):
+    """AF_0.3_S1_non_common or filtered_S1 -> S1: the sample behind a filtered file's name."""
+    return _FILTER_PREFIX.sub("", name).removesuffix("_non_common")
+
+
+def is_wanted(name, wanted):
+    """`wanted` lists sample names (S1) or full filtered names (AF_0.3_S1_non_common)."""
+    return wanted is None or name in wanted or sample_name(name) in wanted
+
+
+def load_samples(paths):
+    """Per-sample (name, signatures, values, low, high) tuples from long tables.
+
+    A table with a 'mutations' column is a MutaGene table: its first column
+    names the sample if it is not 'signature', otherwise the file does.
+    """
+    frames = []
+    for path in paths:
+        header = pd.read_csv(path, sep=None, engine="python", nrows=0).columns
+        if "mutations" in header:
+            table = pd.read_csv(path, sep=None, engine="python")
+            sample = table.iloc[:, 0] if header[0] not in RANGE_COLUMNS else _stem(path)
+            frames.append(pd.DataFrame({
+                "Sample": sample, "Signature": table["signature"], "Value": table["mutations"],
+                "Low": table["mutations_low"], "High": table["mutations_high"],
+            }))
+        else:
+            table = pd.read_csv(path, usecols=[0, 1, 2])
+            table.columns = ["Sample", "Signature", "Value"]
+            table["Value"] = pd.to_numeric(table["Value"], errors="coerce")
+            frames.append(table[table["Value"] > 0].assign(Low=np.nan, High=np.nan))
+    data = pd.concat(frames, ignore_index=True)
+    data = data.sort_values(["Sample", "Value"], ascending=[True, False], kind="stable")
+    samples = []
+    for sample, rows in data.groupby("Sample", sort=False):
+        low, high = rows["Low"].to_numpy(), rows["High"].to_numpy()
+        ranges = None if np.isnan(low).all() else (low, high)
+        samples.append((_stem(str(sample)), rows["Signature"].to_numpy(dtype=str), rows["Value"].to_numpy(), ranges))
+    return samples
+
+
+def _stem(name):
+    """S1.vcf.gz, S1_mutational_signatures.csv or S1.tsv -> S1."""
+    name = os.path.basename(name).split(".vcf")[0]
+    for extension in (".csv", ".tsv", ".txt"):
+        name = name.removesuffix(extension)
+    return name.replace("_mutational_signatures", "")
+
+
+def _init_worker():
+    global _figure
+    _figure = plt.figure(figsize=(10, 5))
+
+
+def draw_sample(task):
+    """Draws one sample's bars (and ranges) on the worker's figure; returns the PNG path."""
+    sample, signatures, values, ranges, output_dir, dpi = task
+    n = len(signatures)
+    _figure.clear()
+    _figure.set_size_inches(10, max(n * 0.5, 1.5))
+    ax = _figure.add_subplot()
+
+    y = np.arange(n)
+    colors = plt.cm.tab20(np.linspace(0, 1, n))
+    bars = ax.barh(y, values, color=colors, edgecolor="black")
+    if ranges is not None:
+        ax.hlines(y, ranges[0], ranges[1], color="red")
+        labels = [f"{v}" for v in values[:10]]
+        total = f"Total Number of Signature Mutations: {int(values.sum())}"
+        xlabel, title, suffix = "Number of Mutations", "Signatures and Mutation Ranges", "signatures_plot"
+    else:
+        labels = [f"{int(v)}" for v in values[:10]]
+        total = f"Total Contribution: {int(values.sum())}"
+        xlabel, title, suffix = "Contribution", "Signatures and Contribution", "contribution_plot"
+    # annotate only the top 10
+    ax.bar_label(bars, labels=labels + [""] * (n - len(labels)), padding=3, fontsize=9)
+
+    ax.legend([bars], [f"Sample: {sample}\n{total}"], loc="upper right", frameon=True, fontsize=10)
+    ax.set_yticks(y, signatures)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("Signatures")
+    ax.set_title(title)
+    _figure.tight_layout()
+
+    output_file = os.path.join(output_dir, f"{sample}_{suffix}.png")
+    _figure.savefig(output_file, dpi=dpi)
+    return output_file
+
+
+def render(samples, output_dir, dpi=300, jobs=None):
+    """Draws every sample on `jobs` processes; returns the written paths."""
+    tasks = [(sample, signatures, values, ranges, output_dir, dpi) for sample, signatures, values, ranges in samples]
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        _init_worker()
+        return list(map(draw_sample, tasks))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        return list(pool.map(draw_sample, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+
+
+def main(args):
+    wanted = {s.strip() for s in args.samples.split(",")} if args.samples else None
+    files = sample_files(args.input_file)
+    if not files:
+        print("❌ No samples to plot.")
+        return 1
+    try:
+        samples = load_samples(files)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    # after loading: a multi-sample table's file name is no sample name
+    samples = [entry for entry in samples if is_wanted(entry[0], wanted)]
+    if not samples:
+        print("❌ No samples to plot.")
+        return 1
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(files[0]))
+    os.makedirs(output_dir, exist_ok=True)
+    paths = render(samples, output_dir, args.dpi, args.jobs)
+    print(f"✅ {len(paths)} sample plot(s) saved to: {output_dir}")
+    return 0
@@ -0,0 +1,347 @@
+"""Warm fitting service for low-latency single-sample turnaround.
+
+``service start`` loads the reference FASTA index, the signature matrix and
+the optional BED / panel-of-normals indexes once and serves HTTP, on
+localhost or on a Unix socket. ``POST /fit`` takes a VCF path (JSON body) or
+the VCF itself (raw upload). Requests that arrive within ``--batch-window``
+of each other are counted and fitted together in one solve, and every
+request gets its contributions back as JSON. ``service submit`` is the
+matching client; ``service status`` queries ``GET /health``.
+"""
+import http.client
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+DEFAULT_PORT = 8765
+
+
+# --- Server ---
+
+class FitRequest:
+    """One VCF waiting for its contributions."""
+
+    def __init__(self, vcf_path, name, af_threshold=None, upload=False):
+        self.vcf_path = vcf_path
+        self.name = name
+        self.af_threshold = af_threshold
+        self.upload = upload
+        self.received = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Fitter:
+    """Resident reference data and the micro-batching loop that serves FitRequests."""
+
+    def __init__(self, genome, signatures_path, bed_file=None, panel_file=None, af_threshold=None,
+                 batch_window=0.05, max_batch=32):
+        from oncosigntrack.bed import BedIndex
+        from oncosigntrack.fitting import load_signatures
+        from oncosigntrack.reference import FastaIndex
+
+        self.fasta = FastaIndex(genome)
+        self.signatures = load_signatures(signatures_path)
+        self.bed = BedIndex.from_file(bed_file) if bed_file else None
+        self.panel = None
+        if panel_file:
+            from oncosigntrack.panel import PanelIndex
+            self.panel = PanelIndex(panel_file)
+        self.af_threshold = af_threshold
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.requests = queue.Queue()
+        self.served = 0
+        self.batches = 0
+        self.started = time.time()
+
+    def keep(self, fields):
+        """False for records in the BED or the panel of normals."""
+        from oncosigntrack.vcf import CHROM, POS, REF
+
+        if self.bed is not None and self.bed.overlaps_record(fields[CHROM], int(fields[POS]), fields[REF]):
+            return False
+        return self.panel is None or not self.panel.contains_record(fields)
+
+    def fit(self, request, timeout=None):
+        """Queues a request and waits for the batch it lands in."""
+        self.requests.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError(f"no result for {request.name} within {timeout} s")
+        if request.error:
+            raise ValueError(request.error)
+        return request.result
+
+    def run(self):
+        """Collects requests for up to batch_window seconds and processes them as one batch."""
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.process(batch)
+
+    def process(self, batch):
+        """Counts every request of the batch, then fits them together; failures end in request.error."""
+        from oncosigntrack.counting import count_samples
+
+        counted = []
+        for request in batch:
+            try:
+                af_threshold = request.af_threshold if request.af_threshold is not None else self.af_threshold
+                counts, names, records = count_samples(request.vcf_path, self.fasta, af_threshold, keep=self.keep)
+                if len(names) == 1:
+                    names = [request.name]
+                counted.append((request, counts, names, records))
+            except Exception as e:
+                request.error = f"{request.name}: {e}"
+                request.done.set()
+            finally:
+                if request.upload:
+                    os.remove(request.vcf_path)
+        if not counted:
+            return
+
+        try:
+            results = self.solve(counted)
+        except Exception as e:
+            # a failed solve fails its batch, not the fitter thread
+            for request, _, _, _ in counted:
+                request.error = f"{request.name}: {e}"
+                request.done.set()
+            return
+        for (request, _, _, _), result in zip(counted, results):
+            request.result = result
+            request.done.set()
+        self.served += len(counted)
+        self.batches += 1
+
+    def solve(self, counted):
+        """One solve for every sample of every counted request; the result of each request."""
+        import numpy as np
+
+        from oncosigntrack.fitting import fit_to_signatures
+        from oncosigntrack.similarity import rowwise_cosine
+
+        basis = self.signatures.values
+        stacked = np.hstack([counts for _, counts, _, _ in counted]).astype(float)
+        contribution = fit_to_signatures(stacked, basis)
+        cosine = rowwise_cosine(stacked.T, (basis @ contribution).T)
+        labels = list(self.signatures.columns)
+
+        results = []
+        column = 0
+        for request, counts, names, records in counted:
+            samples = []
+            for j, name in enumerate(names):
+                samples.append({
+                    "sample": name,
+                    "mutations": int(counts[:, j].sum()),
+                    "reconstruction_cosine": round(float(cosine[column]), 6),
+                    "contributions": dict(zip(labels, contribution[:, column].round(6).tolist())),
+                })
+                column += 1
+            results.append({
+                "file": request.name,
+                "records": records,
+                "batch_size": len(counted),
+                "seconds": round(time.monotonic() - request.received, 4),
+                "samples": samples,
+            })
+        return results
+
+    def health(self):
+        return {
+            "status": "ok",
+            "signatures": len(self.signatures.columns),
+            "bed": self.bed is not None,
+            "panel": self.panel is not None,
+            "served": self.served,
+            "batches": self.batches,
+            "uptime_seconds": round(time.time() - self.started, 1),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "OncoSignTrack"
+
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._reply(200, self.server.fitter.health())
+        else:
+            self._reply(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/fit":
+            self._reply(404, {"error": f"unknown path {self.path}"})
+            return
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            request = self._request(params, body)
+            result = self.server.fitter.fit(request, self.server.request_timeout)
+        except (KeyError, ValueError, OSError, TimeoutError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+        self._reply(200, result)
+
+    def _request(self, params, body):
+        """FitRequest from a JSON {"vcf": path} body or from a raw VCF upload."""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            payload = json.loads(body or b"{}")
+            path = payload["vcf"]
+            if not os.path.isfile(path):
+                raise ValueError(f"{path} does not exist on the server")
+            af = payload.get("af")
+            return FitRequest(path, payload.get("name") or os.path.basename(path),
+                              float(af) if af is not None else None)
+        handle, path = tempfile.mkstemp(suffix=".vcf", prefix="upload_")
+        with os.fdopen(handle, "wb") as upload:
+            upload.write(body)
+        af = params.get("af")
+        return FitRequest(path, params.get("name", "upload.vcf"), float(af) if af else None, upload=True)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(fitter, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, request_timeout=600):
+    """Runs the HTTP server until interrupted."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _UnixServer(socket_path, _Handler)
+        where = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+        where = f"http://{host}:{server.server_address[1]}"
+    server.fitter = fitter
+    server.request_timeout = request_timeout
+    threading.Thread(target=fitter.run, daemon=True).start()
+    signal.signal(signal.SIGTERM, _interrupt)
+    print(f"✅ Serving {len(fitter.signatures.columns)} signatures on {where}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+# --- Client ---
+
+class _UnixConnection(http.client.HTTPConnection):
+    """HTTP over a Unix domain socket."""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def call(args, method, path, body=None, headers=None):
+    """Sends one request to the service; returns (HTTP status, decoded JSON)."""
+    if args.socket:
+        connection = _UnixConnection(args.socket, args.timeout)
+    else:
+        connection = http.client.HTTPConnection(args.host, args.port, timeout=args.timeout)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        connection.close()
+
+
+def submit_one(args, vcf_path):
+    if args.upload:
+        params = {"name": os.path.basename(vcf_path)}
+        if args.allele_frequency is not None:
+            params["af"] = args.allele_frequency
+        with open(vcf_path, "rb") as handle:
+            body = handle.read()
+        return call(args, "POST", f"/fit?{urlencode(params)}", body,
+                    {"Content-Type": "application/octet-stream"})
+    payload = {"vcf": os.path.abspath(vcf_path)}
+    if args.allele_frequency is not None:
+        payload["af"] = args.allele_frequency
+    return call(args, "POST", "/fit", json.dumps(payload), {"Content-Type": "application/json"})
+
+
+def main(args):
+    if args.action == "start":
+        try:
+            fitter = Fitter(args.genome, args.signatures, args.bed_file, args.panel,
+                            float(args.allele_frequency) if args.allele_frequency is not None else None,
+                            args.batch_window, args.max_batch)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            return 1
+        serve(fitter, args.host, args.port, args.socket, args.timeout)
+        return 0
+
+    try:
+        if args.action == "status":
+            status, payload = call(args, "GET", "/health")
+            print(json.dumps(payload, indent=2))
+            return 0 if status == 200 else 1
+
+        # concurrent submissions land in the same server-side batch
+        with ThreadPoolExecutor(max_workers=max(1, len(args.vcf))) as pool:
+            replies = list(pool.map(lambda path: submit_one(args, path), args.vcf))
+    except OSError as e:
+        print(f"Error: cannot reach the service: {e}")
+        return 1
+
+    results = [payload for _, payload in replies]
+    text = json.dumps(results if len(results) > 1 else results[0], indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text + "\n")
+        print(f"✅ {len(results)} result(s) saved to: {args.output}")
+    else:
+        print(text)
+    failed = [payload["error"] for status, payload in replies if status != 200]
+    for error in failed:
+        print(f"❌ {error}")
+    return 1 if failed else 0
@@ -0,0 +1,120 @@
+"""Cosine similarity between signatures or samples of a grouped table.
+
+Combines cosine_similarity_SBSs.py, cosine_similarity_samples.py,
+find_opposite_sbs.py and generate_cosine_sim.py.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def cosine_similarity(matrix):
+    """Compute the cosine similarity between rows of the given (dense or SciPy sparse) matrix."""
+    if hasattr(matrix, "tocsr"):
+        # sparse rows: only the stored non-zeros enter the product
+        matrix = matrix.tocsr().astype(float)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms != 0)
+        unit = matrix.multiply(scale[:, None]).tocsr()
+        return (unit @ unit.T).toarray()
+    norm_matrix = _unit_rows(matrix)
+    return norm_matrix @ norm_matrix.T
+
+
+def cosine_between(left, right):
+    """Cosine similarity between every row of `left` and every row of `right`."""
+    return _unit_rows(left) @ _unit_rows(right).T
+
+
+def rowwise_cosine(left, right):
+    """Cosine similarity of each row of `left` with the same row of `right` (0 for all-zero rows)."""
+    return np.sum(_unit_rows(left) * _unit_rows(right), axis=1)
+
+
+def _unit_rows(matrix):
+    matrix = np.asarray(matrix, dtype=float)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
+
+
+def pair_cosine(vector1, vector2):
+    """Cosine similarity of two vectors (0 when either is all zero)."""
+    magnitude = np.linalg.norm(vector1) * np.linalg.norm(vector2)
+    return float(np.dot(vector1, vector2) / magnitude) if magnitude != 0 else 0.0
+
+
+def similarity_pairs(similarity_df):
+    """Upper-triangle pairs as a Sample1,Sample2,Cosine_Similarity table."""
+    i, j = np.triu_indices(len(similarity_df), k=1)
+    labels = similarity_df.index.to_numpy()
+    return pd.DataFrame({
+        "Sample1": labels[i],
+        "Sample2": labels[j],
+        "Cosine_Similarity": similarity_df.to_numpy()[i, j],
+    })
+
+
+def plot_clustered_heatmap(similarity_df, filename, annotate=False):
+    """Plot and save a Ward-clustered heatmap of the similarity matrix."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    size = 24 if len(similarity_df) > 60 else 12
+    g = sns.clustermap(
+        similarity_df,
+        cmap="coolwarm",
+        method="ward",
+        figsize=(size, size),
+        xticklabels=True,
+        yticklabels=True,
+        annot=annotate,
+        fmt=".2f" if annotate else "",
+        annot_kws={"size": 8} if annotate else None
+    )
+    g.ax_heatmap.set_xticklabels(g.ax_heatmap.get_xmajorticklabels(), rotation=90)
+    g.savefig(filename, dpi=300)
+    plt.close(g.fig)
+    print(f"✅ Clustered heatmap saved as {filename}")
+
+
+def compare_files(file1_path, file2_path):
+    """Cosine similarity between the Contribution columns of two per-sample CSVs."""
+    data1 = pd.read_csv(file1_path).set_index("Signature").sort_index()
+    data2 = pd.read_csv(file2_path).set_index("Signature").sort_index()
+    if not data1.index.equals(data2.index):
+        raise ValueError("Signature sets in the two files do not match.")
+    return pair_cosine(data1["Contribution"].values, data2["Contribution"].values)
+
+
+def main(args):
+    if args.compare:
+        try:
+            print(f"{compare_files(args.input_file, args.compare):.4f}")
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+        return 0
+
+    from oncosigntrack.sparse import read_table
+
+    table = read_table(args.input_file)
+    if args.normalize:
+        # cosine similarity works on L2-normalized rows already
+        print("Data has been normalized using L2 normalization.")
+    similarity_df = table.cosine(args.by)
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.input_file))
+    if args.pairs:
+        pairs_csv = os.path.join(output_dir, f"{args.by[:-1]}_similarity_scores.csv")
+        similarity_pairs(similarity_df).to_csv(pairs_csv, index=False)
+        print(f"Similarity scores saved to: {pairs_csv}")
+    if not args.no_plot:
+        plot_clustered_heatmap(
+            similarity_df,
+            os.path.join(output_dir, f"clustered_cosine_similarity_heatmap_{args.by}.png"),
+            args.annotate
+        )
+    return 0
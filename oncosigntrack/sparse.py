@@ -0,0 +1,157 @@
+"""Sparse signature x sample contribution tables.
+
+Most COSMIC signatures contribute nothing to most samples, so a grouped
+table is kept as a CSR matrix of its non-zero contributions plus the
+signature (row) and sample (column) labels. Exclusions, thresholds,
+occurrence counts, top-N and cosine similarity work on the stored non-zeros;
+``to_frame`` builds the dense group.csv layout only where a file or a plot
+needs it. ``aggregate`` writes the matrix next to group.csv as group.npz.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class SparseTable:
+    """CSR signature x sample matrix with its row and column labels."""
+
+    def __init__(self, matrix, signatures, samples):
+        matrix = sparse.csr_matrix(matrix, dtype=float)
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        self.matrix = matrix
+        self.signatures = np.asarray(signatures, dtype=object)
+        self.samples = np.asarray(samples, dtype=object)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def nnz(self):
+        return self.matrix.nnz
+
+    @classmethod
+    def from_long(cls, data):
+        """Builds the table from File,Signature,Contribution rows; a repeated cell keeps its last value."""
+        rows, signatures = pd.factorize(data["Signature"].astype(str), sort=True)
+        cols, samples = pd.factorize(data["File"].astype(str), sort=True)
+        values = data["Contribution"].to_numpy(dtype=float)
+        cells = rows.astype(np.int64) * len(samples) + cols
+        last = np.flatnonzero(~pd.Series(cells).duplicated(keep="last").to_numpy())
+        matrix = sparse.coo_matrix((values[last], (rows[last], cols[last])), shape=(len(signatures), len(samples)))
+        return cls(matrix, signatures, samples)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """From a dense grouped DataFrame ('X' marks count as 1, blanks as 0)."""
+        frame = frame.replace("X", 1).replace("", 0).astype(float)
+        return cls(frame.to_numpy(), frame.index, frame.columns)
+
+    def to_frame(self, as_int=False):
+        """Dense group.csv layout."""
+        frame = pd.DataFrame(self.matrix.toarray(), index=pd.Index(self.signatures, name="Signature"),
+                             columns=self.samples)
+        return frame.astype(int) if as_int else frame
+
+    def write(self, path):
+        with open(path, "wb") as handle:
+            np.savez(handle, data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+                     shape=np.asarray(self.shape), signatures=self.signatures.astype(str),
+                     samples=self.samples.astype(str))
+
+    # --- Selection ---
+
+    def rows(self, selection):
+        """Table restricted to the signature rows selected by an index array or boolean mask."""
+        return SparseTable(self.matrix[selection], self.signatures[selection], self.samples)
+
+    def columns(self, selection):
+        """Table restricted to the sample columns selected by an index array or boolean mask."""
+        return SparseTable(self.matrix[:, selection], self.signatures, self.samples[selection])
+
+    def drop(self, signatures):
+        return self.rows(~np.isin(self.signatures, list(signatures)))
+
+    def row(self, signature):
+        """Dense values of one signature across all samples."""
+        return self.matrix[int(np.flatnonzero(self.signatures == signature)[0])].toarray().ravel()
+
+    def sort_rows(self):
+        return self.rows(np.argsort(self.signatures.astype(str), kind="stable"))
+
+    def truncate(self):
+        """Integer part of every value, as group.csv stores it."""
+        matrix = self.matrix.copy()
+        matrix.data = np.trunc(matrix.data)
+        return SparseTable(matrix, self.signatures, self.samples)
+
+    def threshold(self, minimum):
+        """Zeroes every value below `minimum`."""
+        matrix = self.matrix.copy()
+        matrix.data[matrix.data < minimum] = 0
+        return SparseTable(matrix, self.signatures, self.samples)
+
+    def nonempty_rows(self):
+        return self.rows(np.diff(self.matrix.indptr) > 0)
+
+    def log10p(self):
+        """log10(value + 1); zeros stay zero."""
+        matrix = self.matrix.copy()
+        matrix.data = np.log10(matrix.data + 1)
+        return SparseTable(matrix, self.signatures, self.samples)
+
+    # --- Summaries ---
+
+    def positive(self):
+        """(row, column, value) arrays of the positive cells, in row-major order."""
+        coo = self.matrix.tocoo()
+        keep = coo.data > 0
+        return coo.row[keep], coo.col[keep], coo.data[keep]
+
+    def occurrences(self, axis=0):
+        """Positive cells per sample (axis=0) or per signature (axis=1)."""
+        rows, cols, _ = self.positive()
+        if axis == 0:
+            return np.bincount(cols, minlength=self.shape[1])
+        return np.bincount(rows, minlength=self.shape[0])
+
+    def top(self, n=10):
+        """Long Sample,Signature,Contribution table of each sample's n largest contributions."""
+        rows, cols, values = self.positive()
+        order = np.lexsort((-values, cols))
+        cols, rows, values = cols[order], rows[order], values[order]
+        starts = np.searchsorted(cols, cols)
+        keep = np.arange(len(cols)) - starts < n
+        return pd.DataFrame({
+            "Sample": self.samples[cols[keep]],
+            "Signature": self.signatures[rows[keep]],
+            "Contribution": values[keep],
+        })
+
+    def cosine(self, by="samples"):
+        """Cosine similarity DataFrame between samples or between signatures."""
+        from oncosigntrack.similarity import cosine_similarity
+
+        matrix, labels = (self.matrix.T.tocsr(), self.samples) if by == "samples" else (self.matrix, self.signatures)
+        return pd.DataFrame(cosine_similarity(matrix), index=labels, columns=labels)
+
+
+def grouped_path(path):
+    """The sparse twin of a grouped table: group.csv -> group.npz."""
+    return os.path.splitext(path)[0] + ".npz"
+
+
+def read_table(path):
+    """Reads a grouped table from .npz or CSV; a CSV's up-to-date .npz twin is preferred."""
+    twin = grouped_path(path)
+    if not path.endswith(".npz") and os.path.exists(twin) and os.path.getmtime(twin) >= os.path.getmtime(path):
+        path = twin
+    if path.endswith(".npz"):
+        with np.load(path) as stored:
+            matrix = sparse.csr_matrix((stored["data"], stored["indices"], stored["indptr"]),
+                                       shape=tuple(stored["shape"]))
+            return SparseTable(matrix, stored["signatures"].tolist(), stored["samples"].tolist())
+    return SparseTable.from_frame(pd.read_csv(path, index_col=0))
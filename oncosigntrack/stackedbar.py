@@ -0,0 +1,144 @@
+"""Paginated 100% stacked bar plots of the cohort (bar_plot_generator.py, sbs_scaled_barplot_10_top.py).
+
+Samples are split into pages of a fixed size instead of one giant canvas.
+Every signature keeps the colour it gets from the cohort-wide tab20b map on
+every page, pages are drawn in parallel worker processes, and the pages can
+also be combined into one multi-page PDF. With ``--top N`` each sample shows
+only its N largest signatures, rescaled to 100% and labelled as in
+sbs_scaled_barplot_10_top.py.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.collections import PolyCollection
+from matplotlib.patches import Patch
+
+
+def percentage_table(data, top=None):
+    """Sample x signature percentages of a File,Signature,Contribution table (each sample sums to 100)."""
+    from oncosigntrack.sparse import SparseTable
+
+    data = data.copy()
+    data.columns = ["File", "Signature", "Contribution"]
+    data["File"] = data["File"].astype(str).str.replace(r"\.vcf\.gz$", "", regex=True)
+    data["Contribution"] = pd.to_numeric(data["Contribution"], errors="coerce")
+    table = SparseTable.from_long(data[data["Contribution"] > 0])
+    if top:
+        table = SparseTable.from_long(table.top(top).rename(columns={"Sample": "File"}))
+    totals = np.asarray(table.matrix.sum(axis=0)).ravel()
+    frame = table.to_frame().T
+    return frame.div(np.where(totals > 0, totals, 1), axis=0) * 100
+
+
+def signature_colors(signatures, colormap="tab20b"):
+    """One colour per signature of the whole cohort, as pandas assigns them for a single figure."""
+    colors = plt.get_cmap(colormap)(np.linspace(0, 1, len(signatures)))
+    return dict(zip(signatures, map(tuple, colors)))
+
+
+def draw_page(task):
+    """Draws one page of samples; returns the PNG path."""
+    values, samples, signatures, colors, title, label_min, path, dpi = task
+    width = max(10.0, 0.3 * len(samples) + 4)
+    fig, ax = plt.subplots(figsize=(width, 10.8))
+    x = np.arange(len(samples))
+    tops = np.cumsum(values, axis=1)
+
+    # every non-empty segment of the page is one rectangle of a single collection
+    rows, cols = np.nonzero(values > 0)
+    left, right = x[rows] - 0.45, x[rows] + 0.45
+    lower, upper = tops[rows, cols] - values[rows, cols], tops[rows, cols]
+    corners = np.stack([np.c_[left, lower], np.c_[left, upper], np.c_[right, upper], np.c_[right, lower]], axis=1)
+    ax.add_collection(PolyCollection(corners, facecolors=[colors[signatures[j]] for j in cols], edgecolors="none"))
+    present = np.flatnonzero(values.any(axis=0))
+    handles = [Patch(color=colors[signatures[j]], label=signatures[j]) for j in present]
+
+    if label_min is not None:
+        # segment labels: signature and percentage, centred on the segment
+        for i, j in zip(*np.nonzero(values > label_min)):
+            ax.text(i, tops[i, j] - values[i, j] / 2, f"{signatures[j]}\n{values[i, j]:.1f}%", ha="center",
+                    va="center", fontsize=8, color="white")
+
+    ax.set_title(title, fontsize=14, pad=20)
+    ax.set_xlabel("Samples", fontsize=12, labelpad=10)
+    ax.set_ylabel("Contribution to Mutations (%)", fontsize=12, labelpad=10)
+    ax.set_xticks(x, samples, rotation=90, fontsize=8, ha="center")
+    ax.set_xlim(-0.5, len(samples) - 0.5)
+    ax.set_ylim(0, 100)
+    ax.legend(handles=handles, title="SBS Signature", bbox_to_anchor=(1.01, 1), loc="upper left", fontsize=8,
+              title_fontsize=9, frameon=False)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return path
+
+
+def render_pages(table, output_dir, stem, title, per_page=50, label_min=None, dpi=300, jobs=None):
+    """Draws the sample x signature percentage table in pages of `per_page` samples; returns the PNG paths."""
+    signatures = list(table.columns)
+    colors = signature_colors(signatures)
+    values = table.to_numpy()
+    samples = table.index.to_numpy(dtype=str)
+    starts = range(0, len(samples), per_page)
+    n_pages = len(starts)
+    tasks = [
+        (values[start:start + per_page], samples[start:start + per_page], signatures, colors,
+         f"{title} (page {page + 1}/{n_pages})" if n_pages > 1 else title, label_min,
+         os.path.join(output_dir, f"{stem}_page{page + 1:03d}.png"), dpi)
+        for page, start in enumerate(starts)
+    ]
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        return list(map(draw_page, tasks))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(draw_page, tasks))
+
+
+def combine_pdf(paths, pdf_path, dpi=300):
+    """Writes the rendered pages, in order, into one multi-page PDF."""
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with PdfPages(pdf_path) as pdf:
+        for path in paths:
+            image = plt.imread(path)
+            fig = plt.figure(figsize=(image.shape[1] / dpi, image.shape[0] / dpi), dpi=dpi)
+            fig.figimage(image, resize=False)
+            pdf.savefig(fig, dpi=dpi)
+            plt.close(fig)
+    return pdf_path
+
+
+def main(args):
+    try:
+        data = pd.read_csv(args.input_file, usecols=[0, 1, 2])
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    table = percentage_table(data, args.top)
+    if table.empty:
+        print("❌ No contributions to plot.")
+        return 1
+
+    if args.top:
+        stem = f"top_{args.top}_sbs_with_percentages"
+        title = f"Scaled Contribution of Top {args.top} SBS Signatures per Sample (100% Scaled)"
+        label_min = 5.0 if args.label_min is None else args.label_min
+    else:
+        stem = "sbs_stacked_percentage_barplot"
+        title = "Scaled Contribution of Each SBS Signature per Sample"
+        label_min = args.label_min
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.input_file))
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"ℹ️ {len(table)} samples, {table.shape[1]} signatures, {args.per_page} samples per page")
+    paths = render_pages(table, output_dir, stem, title, args.per_page, label_min, args.dpi, args.jobs)
+    print(f"✅ {len(paths)} page(s) saved to: {output_dir}")
+    if args.pdf:
+        pdf_path = combine_pdf(paths, os.path.join(output_dir, f"{stem}.pdf"), args.dpi)
+        print(f"✅ Combined PDF saved to: {pdf_path}")
+    return 0
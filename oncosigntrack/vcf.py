@@ -0,0 +1,111 @@
+"""Streaming VCF reading and BGZF writing using only the standard library."""
+import gzip
+import struct
+import zlib
+
+# Column positions of a VCF body line
+CHROM, POS, ID, REF, ALT, QUAL, FILTER, INFO, FORMAT = range(9)
+
+
+def open_vcf(path):
+    """Opens a plain, gzip or bgzip compressed VCF for text reading."""
+    with open(path, "rb") as handle:
+        magic = handle.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rt")
+    return open(path, "r")
+
+
+class VcfReader:
+    """Reads the header once and yields body records as lists of fields."""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = open_vcf(path)
+        self.header = []
+        self.samples = []
+        for line in self.handle:
+            self.header.append(line)
+            if line.startswith("#CHROM"):
+                self.samples = line.rstrip("\n").split("\t")[9:]
+                break
+
+    def __iter__(self):
+        for line in self.handle:
+            if line[0] != "#":
+                yield line.rstrip("\n").split("\t")
+
+    def close(self):
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def sample_afs(fields):
+    """Returns the AD-derived alt allele frequency of every sample column.
+
+    Mirrors the awk rule in filter_vcf_by_af.sh: only biallelic ``ref,alt``
+    AD values with a non-zero depth give an AF; anything else gives None.
+    """
+    n_samples = max(len(fields) - 9, 0)
+    try:
+        ad_index = fields[FORMAT].split(":").index("AD")
+    except (IndexError, ValueError):
+        return [None] * n_samples
+
+    afs = []
+    for sample in fields[9:]:
+        values = sample.split(":")
+        af = None
+        if ad_index < len(values):
+            counts = values[ad_index].split(",")
+            if len(counts) == 2 and counts[0].isdigit() and counts[1].isdigit():
+                ref_count, alt_count = int(counts[0]), int(counts[1])
+                if ref_count + alt_count > 0:
+                    af = alt_count / (ref_count + alt_count)
+        afs.append(af)
+    return afs
+
+
+class BgzfWriter:
+    """Writes BGZF blocks so outputs stay readable by bcftools, tabix and R."""
+
+    BLOCK_SIZE = 0xff00  # uncompressed bytes per block, as in htslib
+    EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+    def __init__(self, path, level=6):
+        self.handle = open(path, "wb")
+        self.level = level
+        self.buffer = bytearray()
+
+    def write(self, text):
+        self.buffer += text.encode()
+        while len(self.buffer) >= self.BLOCK_SIZE:
+            self._write_block(bytes(self.buffer[:self.BLOCK_SIZE]))
+            del self.buffer[:self.BLOCK_SIZE]
+
+    def _write_block(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        payload = compressor.compress(data) + compressor.flush()
+        header = struct.pack(
+            "<4BI2BH2BHH",
+            0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, ord("B"), ord("C"), 2, len(payload) + 25
+        )
+        self.handle.write(header + payload + struct.pack("<II", zlib.crc32(data), len(data)))
+
+    def close(self):
+        if self.buffer:
+            self._write_block(bytes(self.buffer))
+            self.buffer.clear()
+        self.handle.write(self.EOF_BLOCK)
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
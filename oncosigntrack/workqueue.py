@@ -0,0 +1,337 @@
+"""Work queue on a shared filesystem for spreading a cohort over many nodes.
+
+A queue is a directory that every worker can reach:
+
+    queue.json           per-sample command templates, reduce commands, limits
+    pending/<task>.json  tasks waiting for a worker
+    running/<task>.json  claimed tasks; the owning worker touches the file as a heartbeat
+    done/ failed/        finished tasks with their timings
+    logs/<task>.log      output of the task's commands
+    workers/<id>.json    last heartbeat of every worker
+
+Claiming is an atomic rename from pending/ to running/, so exactly one worker
+wins a task without any lock server. A running task whose heartbeat is older
+than the timeout belongs to a dead worker and is renamed back to pending/ by
+whichever worker notices first. Once nothing is pending or running, the
+first worker to create reduce.lock runs the reduce commands (aggregation and
+plots) exactly once.
+"""
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+QUEUE_FILE = "queue.json"
+STATES = ["pending", "running", "done", "failed"]
+
+
+def _path(queue_dir, *parts):
+    return os.path.join(queue_dir, *parts)
+
+
+def _read_json(path):
+    with open(path, "r") as handle:
+        return json.load(handle)
+
+
+def _write_json(path, data):
+    """Writes next to the target and renames, so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as handle:
+        json.dump(data, handle, indent=2)
+    os.replace(tmp_path, path)
+
+
+def fs_now(queue_dir):
+    """Current time as seen by the shared filesystem (immune to clock skew between nodes)."""
+    probe = _path(queue_dir, "workers", f".clock.{socket.gethostname()}.{os.getpid()}")
+    with open(probe, "w"):
+        pass
+    now = os.stat(probe).st_mtime
+    os.unlink(probe)
+    return now
+
+
+def task_name(vcf_path):
+    return os.path.basename(vcf_path).split(".vcf")[0]
+
+
+def init_queue(queue_dir, inputs, commands, reduce_commands=(), max_attempts=3):
+    """Creates the queue directory with one pending task per input."""
+    if os.path.exists(_path(queue_dir, QUEUE_FILE)):
+        raise ValueError(f"{queue_dir} already holds a queue")
+    for sub in STATES + ["logs", "workers"]:
+        os.makedirs(_path(queue_dir, sub), exist_ok=True)
+    _write_json(_path(queue_dir, QUEUE_FILE), {
+        "commands": list(commands),
+        "reduce": list(reduce_commands),
+        "max_attempts": max_attempts,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "tasks": len(inputs),
+    })
+    for i, vcf_path in enumerate(inputs, start=1):
+        task_id = f"{i:06d}_{task_name(vcf_path)}"
+        _write_json(_path(queue_dir, "pending", f"{task_id}.json"),
+                    {"id": task_id, "input": os.path.abspath(vcf_path), "attempts": 0})
+
+
+def counts(queue_dir):
+    """Number of tasks in each state."""
+    return {state: sum(1 for name in os.listdir(_path(queue_dir, state)) if name.endswith(".json"))
+            for state in STATES}
+
+
+def claim(queue_dir, worker_id, max_attempts=3):
+    """Atomically moves the first pending task to running/; returns it or None.
+
+    Tasks that already used up `max_attempts` (e.g. after repeated stale
+    requeues) are moved to failed/ instead.
+    """
+    for name in sorted(os.listdir(_path(queue_dir, "pending"))):
+        if not name.endswith(".json"):
+            continue
+        pending_path = _path(queue_dir, "pending", name)
+        running_path = _path(queue_dir, "running", name)
+        try:
+            # rename keeps the mtime, often older than --timeout: without the touch,
+            # requeue_stale elsewhere could send the task back before it is rewritten
+            os.utime(pending_path)
+            os.rename(pending_path, running_path)
+        except FileNotFoundError:
+            continue  # another worker was faster
+        task = _read_json(running_path)
+        if task["attempts"] >= max_attempts:
+            os.rename(running_path, _path(queue_dir, "failed", name))
+            continue
+        task.update(attempts=task["attempts"] + 1, worker=worker_id, claimed=time.time())
+        _write_json(running_path, task)
+        return task
+    return None
+
+
+def requeue_stale(queue_dir, timeout):
+    """Moves running tasks without a heartbeat for `timeout` seconds back to pending/."""
+    now = fs_now(queue_dir)
+    requeued = []
+    for name in os.listdir(_path(queue_dir, "running")):
+        running_path = _path(queue_dir, "running", name)
+        try:
+            if not name.endswith(".json") or now - os.stat(running_path).st_mtime < timeout:
+                continue
+            os.rename(running_path, _path(queue_dir, "pending", name))
+        except FileNotFoundError:
+            continue  # finished or requeued meanwhile
+        requeued.append(name[:-5])
+    return requeued
+
+
+def requeue_failed(queue_dir):
+    """Moves failed tasks back to pending/ with a fresh attempt budget."""
+    names = [name for name in os.listdir(_path(queue_dir, "failed")) if name.endswith(".json")]
+    for name in names:
+        task = _read_json(_path(queue_dir, "failed", name))
+        task["attempts"] = 0
+        _write_json(_path(queue_dir, "pending", name), task)
+        os.unlink(_path(queue_dir, "failed", name))
+    return len(names)
+
+
+class Heartbeat(threading.Thread):
+    """Touches the running task file (and the worker file) every `interval` seconds."""
+
+    def __init__(self, queue_dir, worker_id, interval):
+        super().__init__(daemon=True)
+        self.queue_dir = queue_dir
+        self.worker_id = worker_id
+        self.interval = interval
+        self.task_path = None
+        self.stopped = threading.Event()
+
+    def beat(self):
+        if self.task_path:
+            try:
+                os.utime(self.task_path)
+            except FileNotFoundError:
+                pass
+        _write_json(_path(self.queue_dir, "workers", f"{self.worker_id}.json"), {
+            "host": socket.gethostname(), "pid": os.getpid(),
+            "task": os.path.basename(self.task_path)[:-5] if self.task_path else None,
+        })
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.beat()
+
+
+def render(template, task):
+    """Fills {input}, {name} and {dir} of a command template (shell-quoted)."""
+    return template.format(input=shlex.quote(task["input"]), name=shlex.quote(task_name(task["input"])),
+                           dir=shlex.quote(os.path.dirname(task["input"])))
+
+
+def run_commands(commands, log_path, fields=None):
+    """Runs shell commands in order, appending to a log; returns the first non-zero exit code (or 0)."""
+    with open(log_path, "a") as log:
+        for command in commands:
+            command = render(command, fields) if fields else command
+            log.write(f"$ {command}\n")
+            log.flush()
+            code = subprocess.run(["bash", "-c", command], stdout=log, stderr=subprocess.STDOUT).returncode
+            if code != 0:
+                log.write(f"exit code {code}\n")
+                return code
+    return 0
+
+
+def execute(queue_dir, config, task, heartbeat):
+    """Runs one claimed task and moves it to done/, pending/ (retry) or failed/."""
+    name = f"{task['id']}.json"
+    running_path = _path(queue_dir, "running", name)
+    heartbeat.task_path = running_path
+    heartbeat.beat()
+
+    start = time.time()
+    code = run_commands(config["commands"], _path(queue_dir, "logs", f"{task['id']}.log"), task)
+    task.update(exit_code=code, seconds=round(time.time() - start, 3), host=socket.gethostname())
+    heartbeat.task_path = None
+
+    if code == 0:
+        state = "done"
+    elif task["attempts"] < config["max_attempts"]:
+        state = "pending"
+    else:
+        state = "failed"
+    try:
+        os.rename(running_path, _path(queue_dir, state, name))
+    except FileNotFoundError:
+        # requeued as stale while finishing; the retry will redo it
+        return "lost"
+    _write_json(_path(queue_dir, state, name), task)
+    return state
+
+
+def reduce(queue_dir, config, force=False):
+    """Runs the reduce commands once; returns their exit code, or None if another worker owns them."""
+    lock = _path(queue_dir, "reduce.lock")
+    if force and os.path.isdir(lock):
+        os.rmdir(lock)
+    try:
+        os.mkdir(lock)
+    except FileExistsError:
+        return None
+    print(f"ℹ️ Running reduce step ({len(config['reduce'])} command(s))")
+    code = run_commands(config["reduce"], _path(queue_dir, "logs", "reduce.log"))
+    _write_json(_path(queue_dir, "reduce.json"), {"exit_code": code, "host": socket.gethostname(),
+                                                  "finished": time.strftime("%Y-%m-%dT%H:%M:%S")})
+    return code
+
+
+def work(queue_dir, worker_id, heartbeat_interval=30.0, timeout=300.0, poll=10.0, max_tasks=None,
+         run_reduce=True):
+    """Claims and runs tasks until none are pending or running anywhere.
+
+    Returns (tasks run, exit code of the reduce step if this worker ran it, else 0).
+    """
+    config = _read_json(_path(queue_dir, QUEUE_FILE))
+    heartbeat = Heartbeat(queue_dir, worker_id, heartbeat_interval)
+    heartbeat.start()
+    finished = 0
+    try:
+        while max_tasks is None or finished < max_tasks:
+            for task_id in requeue_stale(queue_dir, timeout):
+                print(f"⚠️ Requeued stale task {task_id}")
+            task = claim(queue_dir, worker_id, config["max_attempts"])
+            if task is None:
+                state = counts(queue_dir)
+                if state["pending"] == 0 and state["running"] == 0:
+                    break
+                time.sleep(poll)  # tasks still running elsewhere may come back
+                continue
+            print(f"[{worker_id}] {task['id']} (attempt {task['attempts']})")
+            state = execute(queue_dir, config, task, heartbeat)
+            print(f"[{worker_id}] {task['id']} -> {state}")
+            finished += 1
+    finally:
+        heartbeat.stopped.set()
+
+    state = counts(queue_dir)
+    code = 0
+    if run_reduce and config["reduce"] and state["pending"] == state["running"] == state["failed"] == 0:
+        code = reduce(queue_dir, config) or 0
+    return finished, code
+
+
+def print_status(queue_dir, timeout):
+    state = counts(queue_dir)
+    total = sum(state.values())
+    print("  ".join(f"{name}={state[name]}" for name in STATES) + f"  total={total}")
+    now = fs_now(queue_dir)
+    for name in sorted(os.listdir(_path(queue_dir, "running"))):
+        if name.endswith(".json"):
+            age = now - os.stat(_path(queue_dir, "running", name)).st_mtime
+            task = _read_json(_path(queue_dir, "running", name))
+            flag = "  ⚠️ stale" if age >= timeout else ""
+            print(f"  running {name[:-5]} on {task.get('worker')} (heartbeat {age:.0f}s ago){flag}")
+    if os.path.exists(_path(queue_dir, "reduce.json")):
+        print(f"  reduce: exit code {_read_json(_path(queue_dir, 'reduce.json'))['exit_code']}")
+
+
+def _spawn_local(args):
+    """Starts `--processes` worker processes on this node and waits for them."""
+    command = [sys.executable, "-m", "oncosigntrack", "queue", "worker", args.queue_dir,
+               "--heartbeat", str(args.heartbeat), "--timeout", str(args.timeout), "--poll", str(args.poll)]
+    if args.max_tasks is not None:
+        command += ["--max-tasks", str(args.max_tasks)]
+    if args.no_reduce:
+        command.append("--no-reduce")
+    prefix = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    workers = [subprocess.Popen(command + ["--worker-id", f"{prefix}-{i}"]) for i in range(args.processes)]
+    return max(worker.wait() for worker in workers)
+
+
+def main(args):
+    if args.action == "init":
+        try:
+            init_queue(args.queue_dir, args.inputs, args.command, args.reduce, args.max_attempts)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+        print(f"✅ Queue with {len(args.inputs)} task(s) created in: {args.queue_dir}")
+        return 0
+
+    if not os.path.exists(_path(args.queue_dir, QUEUE_FILE)):
+        print(f"❌ No queue found in {args.queue_dir}")
+        return 1
+
+    if args.action == "worker":
+        if args.processes > 1:
+            return _spawn_local(args)
+        worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        finished, code = work(args.queue_dir, worker_id, args.heartbeat, args.timeout, args.poll,
+                              args.max_tasks, not args.no_reduce)
+        print(f"✅ Worker {worker_id} finished {finished} task(s)")
+        if code:
+            print(f"❌ Reduce step failed with exit code {code} (see logs/reduce.log)")
+        return code
+    if args.action == "status":
+        print_status(args.queue_dir, args.timeout)
+        return 0
+    if args.action == "requeue":
+        moved = requeue_failed(args.queue_dir) if args.failed else len(requeue_stale(args.queue_dir, args.timeout))
+        print(f"✅ Requeued {moved} task(s)")
+        return 0
+
+    # reduce
+    state = counts(args.queue_dir)
+    if (state["pending"] or state["running"]) and not args.force:
+        print(f"❌ {state['pending']} pending and {state['running']} running task(s); use --force to reduce anyway")
+        return 1
+    code = reduce(args.queue_dir, _read_json(_path(args.queue_dir, QUEUE_FILE)), args.force)
+    if code is None:
+        print("ℹ️ Reduce step already started by another worker (use --force to rerun).")
+        return 0
+    return code